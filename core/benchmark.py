@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+# Running the script directly (python benchmark.py), rather than as a module of the
+# package (python -m core.benchmark), requires its package to be importable
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+from .common import configure_logging, parse_flag
+from .fake_server import FakeAPIServer
+from .main import create_gcp_client
+from .pipeline import AsyncGCPClient, BatchRunner
+from .transport import DEFAULT_POOL_MAXSIZE
+
+# Default number of projects provisioned at each concurrency level
+DEFAULT_PROJECTS = 50
+
+# Default concurrency levels (numbers of concurrently provisioned projects)
+DEFAULT_CONCURRENCY = "1,4,16"
+
+# Default rate limits of the benchmarked client - high enough not to throttle the
+# local server, so the measured throughput is the one of the pipelines themselves
+DEFAULT_RATE_LIMITS = (
+    "crm.mutation=1000000,crm.read=1000000,"
+    "firebase.mutation=1000000,firebase.read=1000000"
+)
+
+# Default tolerated decrease of the throughput against a baseline (in percent)
+DEFAULT_TOLERANCE = 10.0
+
+# Available command line arguments - keys: argument names; values: argument help descriptions
+ARGUMENTS = dict(
+    projects="Number of projects provisioned at each concurrency level. "
+    f"Defaults to {DEFAULT_PROJECTS}.",
+    concurrency="Comma-separated concurrency levels (numbers of concurrently "
+    "provisioned projects) to be benchmarked. "
+    f"Defaults to {DEFAULT_CONCURRENCY}.",
+    engine="Concurrency engine used for provisioning of the projects "
+    "(threads/asyncio). "
+    "Defaults to threads.",
+    latency="Average latency (in seconds) added to each response of the simulated "
+    "API, varying by +/-50%%. "
+    "Defaults to 0.05.",
+    operation_delay="Time (in seconds) for which a long-running operation of the "
+    "simulated API stays in progress. "
+    "Defaults to 0.5.",
+    consistency_delay="Time (in seconds) for which a resource created by the "
+    "simulated API is not visible yet. "
+    "Defaults to 0.",
+    error_rate="Share of the requests failing with a transient error (429/503), "
+    "between 0 and 1. "
+    "Defaults to 0.",
+    seed="Seed of the random generator used for latency and error injection. "
+    "Defaults to 0, so the runs are comparable.",
+    rate_limits="Client-side rate limits, in the format of the --rate_limits "
+    "option of main.py. "
+    "Defaults to limits which never throttle the simulated API.",
+    trace_memory="Whether to measure peak memory (true/false). Tracing slows down "
+    "allocations, so throughput measured with it is lower. "
+    "Defaults to true.",
+    output="Path of the JSON file the results are saved to. "
+    "Example: path/to/results.json",
+    baseline="Path of the results of a previous benchmark to compare against. "
+    "Example: path/to/baseline.json",
+    tolerance="Tolerated decrease of the throughput against the baseline (in "
+    "percent) - the benchmark fails if it is exceeded at any concurrency level. "
+    f"Defaults to {DEFAULT_TOLERANCE}.",
+    log_level="Minimum level of the logged messages of the script. "
+    "Defaults to ERROR.",
+)
+
+
+def benchmark_entries(count, concurrency, download_path):
+    """
+    Creates manifest entries of the benchmarked projects - each with a single
+    Android and a single iOS application.
+
+    :param count: Number of projects
+    :type count: int
+    :param concurrency: Concurrency level, making the project IDs unique per level
+    :type concurrency: int
+    :param download_path: Directory the configuration artifacts are saved to
+    :type download_path: str
+    :return: Manifest entries
+    :rtype: list
+    """
+
+    entries = []
+
+    for i in range(count):
+        project_path = os.path.join(download_path, str(i))
+        os.makedirs(project_path)
+
+        entries.append(
+            dict(
+                gcp_project_id=f"bench-c{concurrency}-{i:05d}",
+                android_package=f"com.bench.app{i}",
+                android_config_path=project_path + os.sep,
+                ios_bundle_id=f"com.bench.app{i}",
+                ios_config_path=project_path + os.sep,
+            )
+        )
+
+    return entries
+
+
+def run_level(profile, projects, concurrency, engine, rate_limits, trace_memory):
+    """
+    Provisions the projects at a single concurrency level against a fresh
+    simulated API and measures the run.
+
+    :param profile: Latency/error profile of the simulated API (FakeAPIServer
+        keyword arguments)
+    :type profile: dict
+    :param projects: Number of provisioned projects
+    :type projects: int
+    :param concurrency: Number of concurrently provisioned projects
+    :type concurrency: int
+    :param engine: Concurrency engine (threads/asyncio)
+    :type engine: str
+    :param rate_limits: Client-side rate limits (in the format of --rate_limits)
+    :type rate_limits: str
+    :param trace_memory: Whether to measure peak memory
+    :type trace_memory: bool
+    :return: Measurements of the run
+    :rtype: dict
+    """
+
+    server = FakeAPIServer(**profile)
+    server.start()
+
+    download_path = tempfile.mkdtemp(prefix="gcp-benchmark-")
+    entries = benchmark_entries(projects, concurrency, download_path)
+
+    gcp_client = create_gcp_client(
+        dict(
+            crm_base_url=server.crm_base_url,
+            firebase_base_url=server.firebase_base_url,
+            access_token="benchmark",
+            max_workers=concurrency,
+            rate_limits=rate_limits,
+        ),
+        None,
+    )
+
+    if trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    async_client = None
+
+    try:
+        if engine == "asyncio":
+            async_client = AsyncGCPClient(
+                gcp_client=gcp_client,
+                max_concurrency=concurrency,
+                max_http_workers=max(DEFAULT_POOL_MAXSIZE, concurrency),
+            )
+            results = asyncio.run(async_client.run(entries))
+        else:
+            runner = BatchRunner(gcp_client=gcp_client, max_workers=concurrency)
+            results = runner.run(entries)
+
+        elapsed = time.perf_counter() - started
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+        if async_client:
+            async_client.close()
+
+        gcp_client.close()
+        server.stop()
+        shutil.rmtree(download_path, ignore_errors=True)
+
+    summary = gcp_client.instrumentation.summary()
+    succeeded = sum(1 for r in results if r["status"] == "succeeded")
+
+    return dict(
+        concurrency=concurrency,
+        projects=projects,
+        succeeded=succeeded,
+        failed=projects - succeeded,
+        elapsed_seconds=round(elapsed, 3),
+        projects_per_minute=round(succeeded / elapsed * 60, 2),
+        api_calls_per_project=round(
+            sum(c["count"] for c in summary["calls"].values()) / projects, 2
+        ),
+        http_requests_per_project=round(server.stats["requests"] / projects, 2),
+        retries=sum(c["retries"] for c in summary["calls"].values()),
+        peak_memory_mb=(
+            round(peak_memory / 1024 / 1024, 2) if peak_memory is not None else None
+        ),
+        steps=summary["steps"],
+        calls=summary["calls"],
+    )
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares the throughput and latency of each concurrency level against a
+    baseline and prints the differences.
+
+    :param results: Results of the current benchmark
+    :type results: dict
+    :param baseline: Results of a previous benchmark
+    :type baseline: dict
+    :param tolerance: Tolerated decrease of the throughput (in percent)
+    :type tolerance: float
+    :return: Concurrency levels whose throughput has decreased beyond the tolerance
+    :rtype: list
+    """
+
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+
+    for level in results["levels"]:
+        previous = baseline_levels.get(level["concurrency"])
+
+        if not previous or not previous["projects_per_minute"]:
+            continue
+
+        change = (
+            level["projects_per_minute"] / previous["projects_per_minute"] - 1
+        ) * 100
+
+        p95, previous_p95 = (
+            lvl["steps"].get("provision_project", {}).get("p95")
+            for lvl in (level, previous)
+        )
+
+        print(
+            f"Concurrency {level['concurrency']}: {level['projects_per_minute']} "
+            f"projects/min ({change:+.1f}% against the baseline), "
+            f"p95 of a project {p95}s (baseline {previous_p95}s)"
+        )
+
+        if change < -tolerance:
+            regressions.append(level["concurrency"])
+
+    return regressions
+
+
+def print_results(results):
+    """
+    Prints the measurements of all the concurrency levels as a table.
+
+    :param results: Results of the benchmark
+    :type results: dict
+    """
+
+    print(
+        f"{'concurrency':>11} {'projects/min':>12} {'p50 s':>7} {'p95 s':>7} "
+        f"{'p99 s':>7} {'calls/project':>13} {'requests/project':>16} "
+        f"{'peak MB':>8} {'failed':>6}"
+    )
+
+    for level in results["levels"]:
+        project = level["steps"].get("provision_project", {})
+
+        print(
+            f"{level['concurrency']:>11} {level['projects_per_minute']:>12} "
+            f"{project.get('p50', '-'):>7} {project.get('p95', '-'):>7} "
+            f"{project.get('p99', '-'):>7} {level['api_calls_per_project']:>13} "
+            f"{level['http_requests_per_project']:>16} "
+            f"{level['peak_memory_mb'] if level['peak_memory_mb'] is not None else '-':>8} "
+            f"{level['failed']:>6}"
+        )
+
+    for level in results["levels"]:
+        print(f"\nConcurrency {level['concurrency']} - latency of the steps (s):")
+
+        for name, stats in level["steps"].items():
+            print(
+                f"  {name:<24} p50={stats['p50']} p95={stats['p95']} "
+                f"p99={stats['p99']} max={stats['max']}"
+            )
+
+
+def main():
+    """
+    Runs the benchmark at all the concurrency levels, prints and saves the
+    results, and compares them against the optional baseline.
+    """
+
+    parser = ArgumentParser()
+
+    for argument, description in ARGUMENTS.items():
+        parser.add_argument(f"--{argument}", help=description)
+
+    args = parser.parse_args()
+
+    try:
+        concurrency_levels = [
+            int(c) for c in (args.concurrency or DEFAULT_CONCURRENCY).split(",")
+        ]
+    except ValueError:
+        parser.error(f"--concurrency must be a list of integers: {args.concurrency}")
+
+    if any(c < 1 for c in concurrency_levels):
+        parser.error(f"--concurrency levels must be at least 1: {args.concurrency}")
+
+    if args.projects and int(args.projects) < 1:
+        parser.error(f"--projects must be at least 1: {args.projects}")
+
+    configure_logging(args.log_level or "ERROR")
+
+    profile = dict(
+        latency=float(args.latency or 0.05),
+        operation_delay=float(args.operation_delay or 0.5),
+        consistency_delay=float(args.consistency_delay or 0),
+        error_rate=float(args.error_rate or 0),
+        seed=int(args.seed or 0),
+    )
+    projects = int(args.projects or DEFAULT_PROJECTS)
+    engine = args.engine or "threads"
+    trace_memory = parse_flag(args.trace_memory, default=True)
+
+    results = dict(
+        started_at=datetime.now(timezone.utc).isoformat(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        engine=engine,
+        trace_memory=trace_memory,
+        profile=profile,
+        levels=[],
+    )
+
+    for concurrency in concurrency_levels:
+        print(
+            f"Provisioning {projects} projects with concurrency {concurrency} ...",
+            file=sys.stderr,
+        )
+
+        results["levels"].append(
+            run_level(
+                profile,
+                projects,
+                concurrency,
+                engine,
+                args.rate_limits or DEFAULT_RATE_LIMITS,
+                trace_memory,
+            )
+        )
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+
+        regressions = compare(
+            results, baseline, float(args.tolerance or DEFAULT_TOLERANCE)
+        )
+
+        if regressions:
+            print(
+                "Throughput has decreased beyond the tolerance at concurrency: "
+                + ", ".join(str(c) for c in regressions)
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import logging
+import logging.handlers
+import queue
+import re
+from enum import Enum
+
+# Log message configuration (applied by configure_logging)
+LOG_FORMAT = "gcp-automated-setup - %(levelname)s - %(asctime)s - %(message)s"
+LOG_DATE_FORMAT = "%d-%b-%y %H:%M:%S"
+DEFAULT_LOG_LEVEL = "INFO"
+
+# Headers whose values must never appear in logs
+SENSITIVE_HEADERS = {"authorization", "proxy-authorization", "cookie", "x-goog-api-key"}
+
+# Credentials (bearer tokens, OAuth secrets) which are masked in any log message
+SECRET_PATTERN = re.compile(
+    r"(Bearer\s+|[\"']?(?:access_token|refresh_token|client_secret)[\"']?\s*[:=]\s*[\"']?)"
+    r"[^\s\"'&,}]+",
+    re.IGNORECASE,
+)
+
+# Default number of project pipelines executed concurrently in batch mode
+DEFAULT_MAX_WORKERS = 8
+
+
+class ApplicationType(Enum):
+    """
+    Enumerates types of applications to be added to Firebase.
+    """
+
+    ANDROID, IOS = range(2)
+
+
+class OperationError(Exception):
+    """
+    Raised when a long-running operation finishes with an error.
+    """
+
+
+class OperationTimeoutError(OperationError):
+    """
+    Raised when a long-running operation or a resource being set-up is not
+    completed before the polling deadline.
+    """
+
+
+class APICallError(Exception):
+    """
+    Raised when an API call has failed - no response was received or its status
+    code is neither successful nor accepted by the caller.
+    """
+
+    def __init__(self, description, response=None):
+        """
+        Initializes error of a failed API call.
+
+        :param description: Description of the API call
+        :type description: str
+        :param response: HTTP Response object, None if no response was received
+        :type response: requests.Response
+        """
+
+        self.response = response
+        self.status_code = response.status_code if response is not None else None
+
+        super().__init__(
+            f"{description} has failed: "
+            + (
+                f"{response.status_code} {response.text}"
+                if response is not None
+                else "no response"
+            )
+        )
+
+
+def check_response(response, description, accepted=()):
+    """
+    Checks that an API call has succeeded.
+
+    :param response: HTTP Response object returned by the API call
+    :type response: requests.Response
+    :param description: Description of the API call (for errors)
+    :type description: str
+    :param accepted: Unsuccessful status codes accepted by the caller, e.g. 409
+        for a resource which already exists
+    :type accepted: tuple
+    :return: The checked response
+    :rtype: requests.Response
+    :raises APICallError: If the API call has failed
+    """
+
+    if response is None or not (response.ok or response.status_code in accepted):
+        raise APICallError(description, response)
+
+    return response
+
+
+class RedactedHeaders:
+    """
+    Represents HTTP headers prepared for logging - values of the sensitive headers
+    (e.g. Authorization) are masked. Masking is deferred until the headers are
+    actually formatted, i.e. never happens for suppressed messages.
+    """
+
+    def __init__(self, headers):
+        """
+        Initializes headers prepared for logging.
+
+        :param headers: HTTP headers (name: value)
+        :type headers: dict
+        """
+
+        self.headers = headers
+
+    def __str__(self):
+        """
+        Formats the headers with the sensitive values masked.
+
+        :return: Headers with the sensitive values masked
+        :rtype: str
+        """
+
+        return str(
+            {
+                name: "<redacted>" if name.lower() in SENSITIVE_HEADERS else value
+                for name, value in self.headers.items()
+            }
+        )
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Represents a log filter masking credentials (bearer tokens, OAuth secrets)
+    which appear in a log message, e.g. within an exception message.
+    """
+
+    def filter(self, record):
+        """
+        Masks credentials in the message of a log record.
+
+        :param record: Log record
+        :type record: logging.LogRecord
+        :return: Always True, as no record is discarded
+        :rtype: bool
+        """
+
+        message = record.getMessage()
+        redacted = SECRET_PATTERN.sub(r"\1<redacted>", message)
+
+        if redacted != message:
+            record.msg, record.args = redacted, None
+
+        return True
+
+
+def parse_flag(value, default=False):
+    """
+    Parses a boolean command line option (true/false, yes/no, 1/0).
+
+    :param value: Raw value of the option
+    :type value: str
+    :param default: Value used when the option is not specified
+    :type default: bool
+    :return: Parsed value of the option
+    :rtype: bool
+    """
+
+    if value is None:
+        return default
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value).strip().lower() in ("true", "yes", "1", "on")
+
+
+def configure_logging(level=None, use_queue=False):
+    """
+    Configures the root logger - minimum level of the messages, their format and
+    masking of credentials. Messages can be handed over to a queue and written by
+    a background thread, so logging I/O never blocks the pipelines.
+
+    :param level: Minimum level of the messages (defaults to INFO)
+    :type level: str
+    :param use_queue: Whether to write the messages by a background thread
+    :type use_queue: bool
+    :return: Started listener writing the queued messages (to be stopped at the
+        end of the run), or None if the queue is not used
+    :rtype: logging.handlers.QueueListener
+    :raises ValueError: If the level is unknown
+    """
+
+    level = (level or DEFAULT_LOG_LEVEL).upper()
+
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(
+            f"Unknown log level {level}, expected one of: DEBUG, INFO, WARNING, ERROR"
+        )
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+    handler.addFilter(RedactingFilter())
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+
+    for existing_handler in list(root_logger.handlers):
+        root_logger.removeHandler(existing_handler)
+
+    if not use_queue:
+        root_logger.addHandler(handler)
+        return None
+
+    # Unbounded queue, so putting a message never blocks the logging thread
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+
+    return listener
@@ -0,0 +1,1003 @@
+import base64
+import json
+import logging
+import plistlib
+import random
+import re
+import threading
+import time
+import uuid
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Path prefixes of the emulated APIs - the base URLs to be used by the script are
+# http://<host>:<port>/crm/v3 and http://<host>:<port>/firebase/v1beta1
+CRM_PREFIX = "/crm/v3"
+FIREBASE_PREFIX = "/firebase/v1beta1"
+
+# Default (and maximum) number of items per page of the list APIs
+DEFAULT_PAGE_SIZE = 100
+
+# Available command line arguments - keys: argument names; values: argument help descriptions
+ARGUMENTS = dict(
+    host="Host on which the server listens. Defaults to 127.0.0.1.",
+    port="Port on which the server listens. Defaults to 8080.",
+    latency="Average latency (in seconds) added to each response, varying by +/-50%%. "
+    "Defaults to 0.",
+    operation_delay="Time (in seconds) for which a long-running operation stays "
+    "in progress. "
+    "Defaults to 0.",
+    consistency_delay="Time (in seconds) for which a created resource is not "
+    "visible yet (fetching it fails with 404/403, listing omits it). "
+    "Defaults to 0.",
+    error_rate="Share of the requests failing with a transient error (429/503), "
+    "between 0 and 1. "
+    "Defaults to 0.",
+    seed="Seed of the random generator used for latency and error injection.",
+)
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """
+    Represents a local stand-in for the Cloud Resource Manager (v3) and Firebase
+    Management (v1beta1) APIs used by the script - creation and listing of GCP
+    projects, addition of Firebase, creation and listing of Android/iOS
+    applications, download of their configuration artifacts and long-running
+    operations. Latency, duration of the operations, eventual consistency of the
+    created resources and transient errors are configurable, so the script can
+    be load tested offline. Any bearer token is accepted.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        operation_delay=0.0,
+        consistency_delay=0.0,
+        error_rate=0.0,
+        seed=None,
+    ):
+        """
+        Initializes the server with an empty state (and binds its port).
+
+        :param host: Host on which the server listens
+        :type host: str
+        :param port: Port on which the server listens (0 for any free port)
+        :type port: int
+        :param latency: Average latency (in seconds) added to each response
+        :type latency: float
+        :param operation_delay: Time (in seconds) for which a long-running
+            operation stays in progress
+        :type operation_delay: float
+        :param consistency_delay: Time (in seconds) for which a created resource
+            is not visible yet
+        :type consistency_delay: float
+        :param error_rate: Share of the requests failing with a transient error
+        :type error_rate: float
+        :param seed: Seed of the random generator (optional)
+        :type seed: int
+        """
+
+        super().__init__((host, port), FakeAPIHandler)
+
+        self.latency = latency
+        self.operation_delay = operation_delay
+        self.consistency_delay = consistency_delay
+        self.error_rate = error_rate
+
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.projects = {}
+        self.firebase_projects = {}
+        self.apps = {}
+        self.certificates = {}
+        self.tags = {}
+        self.operations = {}
+        self.stats = dict(requests=0, injected_errors=0)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """
+        Fetches base URL of the server.
+
+        :return: Base URL (http://<host>:<port>)
+        :rtype: str
+        """
+
+        host, port = self.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    @property
+    def crm_base_url(self):
+        """
+        Fetches base URL of the emulated Cloud Resource Manager API.
+
+        :return: Base URL of the Cloud Resource Manager API
+        :rtype: str
+        """
+
+        return f"{self.base_url}{CRM_PREFIX}"
+
+    @property
+    def firebase_base_url(self):
+        """
+        Fetches base URL of the emulated Firebase Management API.
+
+        :return: Base URL of the Firebase Management API
+        :rtype: str
+        """
+
+        return f"{self.base_url}{FIREBASE_PREFIX}"
+
+    def start(self):
+        """
+        Starts serving the requests in a background thread.
+
+        :return: The started server
+        :rtype: FakeAPIServer
+        """
+
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        Stops serving the requests and closes the server.
+        """
+
+        self.shutdown()
+        self.server_close()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def visible(self, resource):
+        """
+        Checks whether a created resource is already visible (eventual consistency).
+
+        :param resource: Stored resource
+        :type resource: dict
+        :return: Whether the resource is visible
+        :rtype: bool
+        """
+
+        return time.monotonic() - resource["created_at"] >= self.consistency_delay
+
+    def create_operation(self, prefix, response):
+        """
+        Starts a long-running operation, done after the operation delay.
+
+        :param prefix: Prefix of the operation name (e.g. cp for CRM projects)
+        :type prefix: str
+        :param response: Result of the operation, once done
+        :type response: dict
+        :return: The operation, as returned by the API
+        :rtype: dict
+        """
+
+        name = f"operations/{prefix}.{uuid.uuid4().hex}"
+
+        with self.lock:
+            self.operations[name] = dict(
+                done_at=time.monotonic() + self.operation_delay,
+                response=response,
+            )
+
+        return self.get_operation(name)
+
+    def get_operation(self, name):
+        """
+        Fetches state of a long-running operation.
+
+        :param name: Name of the operation
+        :type name: str
+        :return: The operation, as returned by the API, or None if not found
+        :rtype: dict
+        """
+
+        with self.lock:
+            operation = self.operations.get(name)
+
+        if operation is None:
+            return None
+
+        if time.monotonic() < operation["done_at"]:
+            return dict(name=name, done=False)
+
+        return dict(name=name, done=True, response=operation["response"])
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    """
+    Represents a handler of a single request sent to the FakeAPIServer.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # Routes - HTTP method, path pattern (without the API prefix) and handler name
+    ROUTES = [
+        ("POST", CRM_PREFIX, r"/projects", "create_project"),
+        ("GET", CRM_PREFIX, r"/projects:search", "search_projects"),
+        ("DELETE", CRM_PREFIX, r"/projects/(?P<project_id>[^/:]+)", "delete_project"),
+        ("GET", CRM_PREFIX, r"/(?P<name>operations/.+)", "get_operation"),
+        ("GET", FIREBASE_PREFIX, r"/(?P<name>operations/.+)", "get_operation"),
+        ("GET", FIREBASE_PREFIX, r"/projects", "list_firebase_projects"),
+        ("GET", FIREBASE_PREFIX, r"/availableProjects", "list_available_projects"),
+        (
+            "POST",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/:]+):addFirebase",
+            "add_firebase",
+        ),
+        (
+            "GET",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/:]+):searchApps",
+            "search_apps",
+        ),
+        (
+            "POST",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/:]+)/defaultLocation:finalize",
+            "finalize_location",
+        ),
+        ("GET", FIREBASE_PREFIX, r"/projects/(?P<project_id>[^/:]+)", "get_project"),
+        (
+            "POST",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/(?P<platform>android|ios)Apps",
+            "create_app",
+        ),
+        (
+            "POST",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/(?P<platform>android|ios)Apps"
+            r"/(?P<app_id>[^/]+):remove",
+            "remove_app",
+        ),
+        (
+            "POST",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/androidApps/(?P<app_id>[^/]+)/sha",
+            "create_certificate",
+        ),
+        (
+            "GET",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/androidApps/(?P<app_id>[^/]+)/sha",
+            "list_certificates",
+        ),
+        (
+            "GET",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/(?P<platform>android|ios)Apps",
+            "list_apps",
+        ),
+        (
+            "GET",
+            FIREBASE_PREFIX,
+            r"/projects/(?P<project_id>[^/]+)/(?P<platform>android|ios)Apps"
+            r"/(?P<app_id>[^/]+)/config",
+            "get_config",
+        ),
+    ]
+
+    def log_message(self, format, *args):
+        """
+        Logs a handled request (at the debug level).
+        """
+
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, body=None, headers=None):
+        """
+        Sends a JSON response.
+
+        :param status: HTTP status code
+        :type status: int
+        :param body: Response body (optional)
+        :type body: dict
+        :param headers: Additional HTTP headers (optional)
+        :type headers: dict
+        """
+
+        content = json.dumps(body if body is not None else {}).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_error(self, status, message):
+        """
+        Sends an error response in the format of the Google APIs.
+
+        :param status: HTTP status code
+        :type status: int
+        :param message: Error message
+        :type message: str
+        """
+
+        self._send(status, dict(error=dict(code=status, message=message)))
+
+    def _page(self, items, items_key):
+        """
+        Sends a single page of listed items, according to the pageSize and
+        pageToken query parameters.
+
+        :param items: All the listed items
+        :type items: list
+        :param items_key: Key of the listed items within the page
+        :type items_key: str
+        """
+
+        page_size = min(
+            int(self.query.get("pageSize", [DEFAULT_PAGE_SIZE])[0]),
+            DEFAULT_PAGE_SIZE,
+        )
+        offset = int(self.query.get("pageToken", ["0"])[0])
+        page = {items_key: items[offset : offset + page_size]}
+
+        if offset + page_size < len(items):
+            page["nextPageToken"] = str(offset + page_size)
+
+        self._send(200, page)
+
+    def _handle(self, method):
+        """
+        Handles a request - adds latency, injects errors and routes the request.
+
+        :param method: HTTP method name
+        :type method: str
+        """
+
+        server = self.server
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
+
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.stats["requests"] += 1
+            delay = server.latency * server.random.uniform(0.5, 1.5)
+            failed = server.random.random() < server.error_rate
+
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            with server.lock:
+                server.stats["injected_errors"] += 1
+
+            if server.random.random() < 0.5:
+                self._send_error(429, "Quota exceeded")
+            else:
+                self._send_error(503, "The service is currently unavailable")
+
+            return
+
+        for route_method, prefix, pattern, handler in self.ROUTES:
+            if route_method != method or not url.path.startswith(prefix):
+                continue
+
+            match = re.fullmatch(pattern, url.path[len(prefix) :])
+
+            if match:
+                getattr(self, handler)(**match.groupdict())
+                return
+
+        self._send_error(404, f"Unknown resource {url.path}")
+
+    def do_GET(self):
+        """
+        Handles a GET request.
+        """
+
+        self._handle("GET")
+
+    def do_POST(self):
+        """
+        Handles a POST request.
+        """
+
+        self._handle("POST")
+
+    def do_DELETE(self):
+        """
+        Handles a DELETE request.
+        """
+
+        self._handle("DELETE")
+
+    def create_project(self):
+        """
+        Creates a GCP project (projects.create).
+        """
+
+        server = self.server
+        project_id = self.body.get("projectId")
+
+        with server.lock:
+            if project_id in server.projects:
+                return self._send_error(409, f"Project {project_id} already exists")
+
+            project = dict(
+                name=f"projects/{len(server.projects) + 1}",
+                projectId=project_id,
+                displayName=self.body.get("displayName", project_id),
+                labels=self.body.get("labels", {}),
+                state="ACTIVE",
+            )
+
+            if self.body.get("parent"):
+                project["parent"] = self.body["parent"]
+
+            # Tags are input only, they are kept aside of the returned resource
+            server.tags[project_id] = dict(self.body.get("tags", {}))
+            server.projects[project_id] = dict(
+                resource=project, created_at=time.monotonic()
+            )
+
+        self._send(200, server.create_operation("cp", project))
+
+    @staticmethod
+    def _matches(project, query):
+        """
+        Checks whether a GCP project matches a search query - supported are
+        space-separated terms field:value (fields id, displayName, state and
+        labels.<key>), the value optionally ending with the * wildcard, and
+        alternatives of such terms separated by OR.
+
+        :param project: GCP project, as returned by the API
+        :type project: dict
+        :param query: Search query
+        :type query: str
+        :return: Whether the project matches all the terms of any alternative
+        :rtype: bool
+        """
+
+        return any(
+            FakeAPIHandler._matches_terms(project, alternative)
+            for alternative in query.split(" OR ")
+        )
+
+    @staticmethod
+    def _matches_terms(project, terms):
+        """
+        Checks whether a GCP project matches all the space-separated terms.
+
+        :param project: GCP project, as returned by the API
+        :type project: dict
+        :param terms: Space-separated terms field:value
+        :type terms: str
+        :return: Whether the project matches all the terms
+        :rtype: bool
+        """
+
+        for term in terms.split():
+            field, _, value = term.partition(":")
+
+            if field.startswith("labels."):
+                actual = project.get("labels", {}).get(field[len("labels.") :])
+            else:
+                actual = project.get("projectId" if field == "id" else field)
+
+            if actual is None:
+                return False
+
+            if value.endswith("*"):
+                if not actual.startswith(value[:-1]):
+                    return False
+            elif actual != value:
+                return False
+
+        return True
+
+    def search_projects(self):
+        """
+        Lists the GCP projects (projects.search), optionally matching the query.
+        """
+
+        query = self.query.get("query", [""])[0]
+
+        with self.server.lock:
+            projects = list(self.server.projects.values())
+
+        self._page(
+            [
+                p["resource"]
+                for p in projects
+                if self.server.visible(p) and self._matches(p["resource"], query)
+            ],
+            "projects",
+        )
+
+    def delete_project(self, project_id):
+        """
+        Marks a GCP project for deletion (projects.delete) - its Firebase project
+        and applications are removed along with it.
+
+        :param project_id: GCP project ID
+        :type project_id: str
+        """
+
+        server = self.server
+
+        with server.lock:
+            project = server.projects.get(project_id)
+
+            # Missing projects are reported as inaccessible, as by the actual API
+            if project is None or project["resource"]["state"] != "ACTIVE":
+                return self._send_error(403, f"Permission denied on {project_id}")
+
+            project["resource"]["state"] = "DELETE_REQUESTED"
+            server.firebase_projects.pop(project_id, None)
+
+            for app_id, app in list(server.apps.items()):
+                if app["resource"]["projectId"] == project_id:
+                    del server.apps[app_id]
+
+        self._send(200, server.create_operation("cp", project["resource"]))
+
+    def get_operation(self, name):
+        """
+        Fetches state of a long-running operation (operations.get).
+
+        :param name: Name of the operation
+        :type name: str
+        """
+
+        operation = self.server.get_operation(name)
+
+        if operation is None:
+            return self._send_error(404, f"Operation {name} not found")
+
+        self._send(200, operation)
+
+    def add_firebase(self, project_id):
+        """
+        Adds Firebase to a GCP project (projects.addFirebase).
+
+        :param project_id: GCP project ID
+        :type project_id: str
+        """
+
+        server = self.server
+
+        with server.lock:
+            project = server.projects.get(project_id)
+
+            if project is None:
+                return self._send_error(404, f"Project {project_id} not found")
+
+            # A freshly created project is not visible to Firebase yet
+            if not server.visible(project):
+                return self._send_error(403, f"Permission denied on {project_id}")
+
+            if project_id in server.firebase_projects:
+                return self._send_error(409, f"Firebase project {project_id} exists")
+
+            firebase_project = dict(
+                name=f"projects/{project_id}",
+                projectId=project_id,
+                displayName=project["resource"]["displayName"],
+                state="ACTIVE",
+            )
+            server.firebase_projects[project_id] = dict(
+                resource=firebase_project, created_at=time.monotonic()
+            )
+
+        self._send(200, server.create_operation("workflows", firebase_project))
+
+    def finalize_location(self, project_id):
+        """
+        Sets the default location of a Firebase project (defaultLocation.finalize).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        """
+
+        server = self.server
+
+        with server.lock:
+            project = server.firebase_projects.get(project_id)
+
+            if project is None or not server.visible(project):
+                return self._send_error(404, f"Firebase project {project_id} not found")
+
+            resources = project["resource"].setdefault("resources", {})
+
+            if resources.get("locationId"):
+                return self._send_error(
+                    409, f"Default location of {project_id} is already set"
+                )
+
+            resources["locationId"] = self.body.get("locationId")
+
+        self._send(200, server.create_operation("workflows", {}))
+
+    def list_firebase_projects(self):
+        """
+        Lists the Firebase projects (projects.list).
+        """
+
+        with self.server.lock:
+            projects = list(self.server.firebase_projects.values())
+
+        self._page(
+            [p["resource"] for p in projects if self.server.visible(p)],
+            "results",
+        )
+
+    def list_available_projects(self):
+        """
+        Lists the GCP projects to which Firebase can be added (availableProjects.list).
+        """
+
+        with self.server.lock:
+            projects = [
+                p
+                for project_id, p in self.server.projects.items()
+                if project_id not in self.server.firebase_projects
+            ]
+
+        self._page(
+            [
+                dict(
+                    project=f"projects/{p['resource']['projectId']}",
+                    displayName=p["resource"]["displayName"],
+                )
+                for p in projects
+                if self.server.visible(p)
+            ],
+            "projectInfo",
+        )
+
+    def get_project(self, project_id):
+        """
+        Fetches a Firebase project (projects.get).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        """
+
+        project = self._firebase_project(project_id)
+
+        if project is None:
+            return self._send_error(404, f"Firebase project {project_id} not found")
+
+        self._send(200, project["resource"])
+
+    def _firebase_project(self, project_id):
+        """
+        Fetches a visible Firebase project.
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :return: Firebase project, or None if it does not exist or is not visible yet
+        :rtype: dict
+        """
+
+        with self.server.lock:
+            project = self.server.firebase_projects.get(project_id)
+
+        return project if project and self.server.visible(project) else None
+
+    def _apps(self, project_id, platform=None):
+        """
+        Fetches the visible applications of a Firebase project.
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param platform: Platform of the applications (android, ios), or None for
+            all the platforms
+        :type platform: str
+        :return: Applications, as returned by the API
+        :rtype: list
+        """
+
+        with self.server.lock:
+            apps = list(self.server.apps.values())
+
+        return [
+            a["resource"]
+            for a in apps
+            if a["resource"]["projectId"] == project_id
+            and (platform is None or a["platform"] == platform)
+            and self.server.visible(a)
+        ]
+
+    def create_app(self, project_id, platform):
+        """
+        Creates an Android/iOS application (androidApps.create / iosApps.create).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param platform: Platform of the application (android, ios)
+        :type platform: str
+        """
+
+        server = self.server
+
+        with server.lock:
+            project = server.firebase_projects.get(project_id)
+
+            if project is None or not server.visible(project):
+                return self._send_error(404, f"Firebase project {project_id} not found")
+
+            key = "packageName" if platform == "android" else "bundleId"
+            namespace = self.body.get(key)
+
+            # Package names / bundle IDs are unique within a project, as by the
+            # actual API
+            for other in server.apps.values():
+                resource = other["resource"]
+
+                if (
+                    resource["projectId"] == project_id
+                    and other["platform"] == platform
+                    and resource.get(key) == namespace
+                ):
+                    return self._send_error(
+                        409, f"Application {namespace} already exists"
+                    )
+
+            number = len(server.apps) + 1
+            app_id = f"1:{number:012d}:{platform}:{uuid.uuid4().hex[:16]}"
+            app = dict(
+                name=f"projects/{project_id}/{platform}Apps/{app_id}",
+                appId=app_id,
+                projectId=project_id,
+                displayName=self.body.get("displayName"),
+            )
+
+            if platform == "android":
+                app["packageName"] = self.body.get("packageName")
+            else:
+                app["bundleId"] = self.body.get("bundleId")
+                app["appStoreId"] = self.body.get("appStoreId")
+
+            server.apps[app_id] = dict(
+                resource=app, platform=platform, created_at=time.monotonic()
+            )
+
+        self._send(200, server.create_operation("workflows", app))
+
+    def remove_app(self, project_id, platform, app_id):
+        """
+        Removes an Android/iOS application (androidApps.remove / iosApps.remove).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param platform: Platform of the application (android, ios)
+        :type platform: str
+        :param app_id: Application ID
+        :type app_id: str
+        """
+
+        server = self.server
+
+        with server.lock:
+            app = server.apps.get(app_id)
+
+            if app is not None and app["resource"]["projectId"] == project_id:
+                del server.apps[app_id]
+            else:
+                app = None
+
+        if app is None:
+            if not self.body.get("allowMissing"):
+                return self._send_error(404, f"Application {app_id} not found")
+
+            return self._send(200, server.create_operation("workflows", {}))
+
+        self._send(
+            200,
+            server.create_operation(
+                "workflows", dict(app["resource"], state="DELETED")
+            ),
+        )
+
+    def create_certificate(self, project_id, app_id):
+        """
+        Adds a SHA certificate to an Android application (androidApps.sha.create).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        """
+
+        server = self.server
+        sha_hash = self.body.get("shaHash")
+
+        with server.lock:
+            app = server.apps.get(app_id)
+
+            if app is None or not server.visible(app):
+                return self._send_error(404, f"Application {app_id} not found")
+
+            certificates = server.certificates.setdefault(app_id, {})
+
+            if sha_hash in certificates:
+                return self._send_error(409, f"Certificate {sha_hash} already exists")
+
+            certificate = dict(
+                name=f"projects/{project_id}/androidApps/{app_id}/sha/{uuid.uuid4().hex}",
+                shaHash=sha_hash,
+                certType=self.body.get("certType"),
+            )
+            certificates[sha_hash] = certificate
+
+        self._send(200, certificate)
+
+    def list_certificates(self, project_id, app_id):
+        """
+        Lists the SHA certificates of an Android application (androidApps.sha.list).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        """
+
+        with self.server.lock:
+            certificates = list(self.server.certificates.get(app_id, {}).values())
+
+        self._send(200, dict(certificates=certificates))
+
+    def list_apps(self, project_id, platform):
+        """
+        Lists the Android/iOS applications of a Firebase project
+        (androidApps.list / iosApps.list).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param platform: Platform of the applications (android, ios)
+        :type platform: str
+        """
+
+        if self._firebase_project(project_id) is None:
+            return self._send_error(404, f"Firebase project {project_id} not found")
+
+        self._page(self._apps(project_id, platform), "apps")
+
+    def search_apps(self, project_id):
+        """
+        Lists all the applications of a Firebase project (projects.searchApps).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        """
+
+        if self._firebase_project(project_id) is None:
+            return self._send_error(404, f"Firebase project {project_id} not found")
+
+        self._page(
+            [
+                dict(
+                    name=app["name"],
+                    appId=app["appId"],
+                    displayName=app.get("displayName"),
+                    platform="ANDROID" if "packageName" in app else "IOS",
+                    namespace=app.get("packageName") or app.get("bundleId"),
+                )
+                for app in self._apps(project_id)
+            ],
+            "apps",
+        )
+
+    def get_config(self, project_id, platform, app_id):
+        """
+        Fetches configuration artifact of an Android/iOS application
+        (androidApps.getConfig / iosApps.getConfig).
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param platform: Platform of the application (android, ios)
+        :type platform: str
+        :param app_id: Application ID
+        :type app_id: str
+        """
+
+        with self.server.lock:
+            app = self.server.apps.get(app_id)
+
+        if app is None or not self.server.visible(app):
+            return self._send_error(404, f"Application {app_id} not found")
+
+        resource = app["resource"]
+
+        if platform == "android":
+            filename = "google-services.json"
+            content = json.dumps(
+                dict(
+                    project_info=dict(project_id=project_id),
+                    client=[
+                        dict(
+                            client_info=dict(
+                                mobilesdk_app_id=app_id,
+                                android_client_info=dict(
+                                    package_name=resource["packageName"]
+                                ),
+                            )
+                        )
+                    ],
+                    configuration_version="1",
+                )
+            ).encode("utf-8")
+        else:
+            filename = "GoogleService-Info.plist"
+            content = plistlib.dumps(
+                dict(
+                    BUNDLE_ID=resource["bundleId"],
+                    GOOGLE_APP_ID=app_id,
+                    PROJECT_ID=project_id,
+                    PLIST_VERSION="1",
+                )
+            )
+
+        self._send(
+            200,
+            dict(
+                configFilename=filename,
+                configFileContents=base64.b64encode(content).decode("ascii"),
+            ),
+        )
+
+
+def main():
+    """
+    Runs the server in the foreground, until interrupted.
+    """
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="fake-server - %(levelname)s - %(asctime)s - %(message)s",
+        datefmt="%d-%b-%y %H:%M:%S",
+    )
+
+    parser = ArgumentParser()
+
+    for argument, description in ARGUMENTS.items():
+        parser.add_argument(f"--{argument}", help=description)
+
+    args = parser.parse_args()
+
+    server = FakeAPIServer(
+        host=args.host or "127.0.0.1",
+        port=int(args.port or 8080),
+        latency=float(args.latency or 0),
+        operation_delay=float(args.operation_delay or 0),
+        consistency_delay=float(args.consistency_delay or 0),
+        error_rate=float(args.error_rate or 0),
+        seed=int(args.seed) if args.seed else None,
+    )
+
+    logging.info("Cloud Resource Manager API: %s", server.crm_base_url)
+    logging.info("Firebase Management API: %s", server.firebase_base_url)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Handled %s requests", server.stats["requests"])
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,585 @@
+import collections
+import contextlib
+import contextvars
+import csv
+import datetime
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import sys
+import time
+
+# Event stream - maximum number of buffered events (further ones are dropped until
+# the buffer drains), maximum number of events delivered at once, and timeout (in
+# seconds) of a single delivery to the HTTP endpoint
+DEFAULT_EVENT_QUEUE_SIZE = 10000
+EVENT_BATCH_SIZE = 500
+EVENT_POST_TIMEOUT = 5.0
+
+# Maximum number of the most recent spans kept by a long-running server (serve mode)
+DEFAULT_SERVE_MAX_SPANS = 10000
+
+# Latency histograms - upper bound (in seconds) of the lowest bucket, and number of
+# buckets per doubling of the latency (each bucket is ~4.4% wider than the previous)
+HISTOGRAM_MIN_LATENCY = 0.0001
+HISTOGRAM_BUCKETS_PER_DOUBLING = 16
+
+
+# Span of the currently executed pipeline step (if any), which becomes the parent of
+# the spans of the API calls performed within the step
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class LatencyHistogram:
+    """
+    Represents aggregated measurements of a single API call or pipeline step -
+    counters and a histogram of the latencies with logarithmic buckets, so its
+    size does not grow with the number of measurements. Percentiles are the upper
+    bounds of the buckets (capped by the maximum latency).
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty histogram.
+        """
+
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = collections.Counter()
+
+    def add(self, span):
+        """
+        Adds a finished span.
+
+        :param span: Finished span
+        :type span: dict
+        """
+
+        latency = span["latency"]
+
+        self.count += 1
+        self.errors += 1 if span["error"] else 0
+        self.retries += span.get("retries", 0)
+        self.bytes_received += span.get("bytes_received", 0)
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.buckets[
+            max(
+                math.ceil(
+                    math.log2(
+                        max(latency, HISTOGRAM_MIN_LATENCY) / HISTOGRAM_MIN_LATENCY
+                    )
+                    * HISTOGRAM_BUCKETS_PER_DOUBLING
+                ),
+                0,
+            )
+        ] += 1
+
+    def percentile(self, p):
+        """
+        Calculates a percentile of the latencies (nearest-rank method).
+
+        :param p: Percentile (0-100)
+        :type p: float
+        :return: Percentile of the latencies, or None if there are no measurements
+        :rtype: float
+        """
+
+        if not self.count:
+            return None
+
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+
+            if seen >= rank:
+                break
+
+        upper_bound = HISTOGRAM_MIN_LATENCY * 2 ** (
+            bucket / HISTOGRAM_BUCKETS_PER_DOUBLING
+        )
+
+        return min(upper_bound, self.max)
+
+
+class EventStream:
+    """
+    Represents a stream of structured progress events of a run (step transitions,
+    saved configuration artifacts), appended as JSON Lines into a file or the
+    standard output and/or POSTed in batches to an HTTP endpoint. Events are
+    buffered by a bounded queue and delivered by a background thread, so emitting
+    an event never blocks the pipelines - when the queue is full, events are
+    dropped (and counted) instead.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, path=None, url=None, max_queued=DEFAULT_EVENT_QUEUE_SIZE):
+        """
+        Initializes event stream and starts its delivery thread.
+
+        :param path: Path of the file the events are appended to, or - for the
+            standard output (optional)
+        :type path: str
+        :param url: URL of the HTTP endpoint the events are POSTed to (optional)
+        :type url: str
+        :param max_queued: Maximum number of buffered events
+        :type max_queued: int
+        """
+
+        self.url = url
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._file = None
+        self._session = None
+
+        if path:
+            self._file = (
+                sys.stdout if path == "-" else open(path, "a", encoding="utf-8")
+            )
+
+        if url:
+            import requests
+
+            self._session = requests.Session()
+
+        self._thread = threading.Thread(
+            target=self._deliver, name="event-stream", daemon=True
+        )
+        self._thread.start()
+
+    def emit(self, event, **fields):
+        """
+        Emits a single event, without blocking.
+
+        :param event: Type of the event (e.g. step_completed)
+        :type event: str
+        :param fields: Fields of the event (e.g. project_id, step)
+        :type fields: dict
+        """
+
+        record = dict(
+            event=event,
+            timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **fields,
+        )
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _deliver(self):
+        """
+        Delivers the buffered events in batches, until the stream is closed.
+        """
+
+        closed = False
+
+        while not closed:
+            batch = [self._queue.get()]
+
+            while len(batch) < EVENT_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closed = any(e is self._CLOSE for e in batch)
+            lines = "".join(
+                json.dumps(e, ensure_ascii=False) + "\n"
+                for e in batch
+                if e is not self._CLOSE
+            )
+
+            if not lines:
+                continue
+
+            if self._file:
+                self._file.write(lines)
+                self._file.flush()
+
+            if self._session:
+                try:
+                    self._session.post(
+                        self.url,
+                        data=lines.encode("utf-8"),
+                        headers={"Content-Type": "application/x-ndjson"},
+                        timeout=EVENT_POST_TIMEOUT,
+                    ).raise_for_status()
+                except Exception as err:
+                    logging.warning(
+                        "Delivery of %s events to %s has failed: %s",
+                        lines.count("\n"),
+                        self.url,
+                        err,
+                    )
+
+    def close(self):
+        """
+        Delivers the remaining buffered events and stops the delivery thread.
+        """
+
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+
+        if self.dropped:
+            logging.warning(
+                "%s progress events were dropped, as the buffer was full", self.dropped
+            )
+
+        if self._file and self._file is not sys.stdout:
+            self._file.close()
+
+        if self._session:
+            self._session.close()
+
+
+class Instrumentation:
+    """
+    Represents a thread-safe collector of latency measurements of all the API
+    calls (latency, attempts, status code, transferred bytes) and pipeline steps
+    (latency, outcome) of a run. Measurements are summarized as histograms
+    (p50/p95/p99), saved as a JSON/CSV report, or exported as spans in the
+    OpenTelemetry (OTLP/JSON) format. The histograms are aggregated as the
+    measurements come, while the individual spans can be capped to the most
+    recent ones, so a long-running process does not keep all of them in memory.
+    """
+
+    def __init__(self, events=None, max_spans=None):
+        """
+        Initializes an empty instrumentation.
+
+        :param events: Stream of the progress events, to which transitions of the
+            pipeline steps are emitted (optional)
+        :type events: EventStream
+        :param max_spans: Maximum number of the most recent spans kept for the
+            report and the exported spans (unlimited by default)
+        :type max_spans: int
+        """
+
+        self._lock = threading.Lock()
+        self.spans = collections.deque(maxlen=max_spans)
+        self.histograms = {}
+        self._trace_ids = {}
+        self.events = events
+
+    def _start_trace(self, project_id):
+        """
+        Fetches (or creates) ID of the trace grouping the spans of a single project,
+        when a top-level step of the project starts.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :return: Trace ID (32 hexadecimal characters)
+        :rtype: str
+        """
+
+        with self._lock:
+            trace = self._trace_ids.setdefault(project_id, [os.urandom(16).hex(), 0])
+            trace[1] += 1
+
+            return trace[0]
+
+    def _end_trace(self, project_id):
+        """
+        Forgets ID of the trace of a single project once all its top-level steps
+        have finished, so IDs of the finished projects are not kept.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        """
+
+        with self._lock:
+            trace = self._trace_ids[project_id]
+            trace[1] -= 1
+
+            if not trace[1]:
+                del self._trace_ids[project_id]
+
+    def _add(self, span):
+        """
+        Adds a finished span.
+
+        :param span: Finished span
+        :type span: dict
+        """
+
+        with self._lock:
+            self.spans.append(span)
+            self.histograms.setdefault(
+                (span["kind"], span["name"]), LatencyHistogram()
+            ).add(span)
+
+    def reset(self):
+        """
+        Discards all the measurements.
+        """
+
+        with self._lock:
+            self.spans.clear()
+            self.histograms.clear()
+
+    def record_call(self, name, latency, status, attempts, bytes_sent, bytes_received):
+        """
+        Records a finished API call, as a child of the current pipeline step.
+
+        :param name: Name of the API call (e.g. crm.projects.create)
+        :type name: str
+        :param latency: Latency of the call including the retries (in seconds)
+        :type latency: float
+        :param status: Status code of the last response (None if not received)
+        :type status: int
+        :param attempts: Number of attempts
+        :type attempts: int
+        :param bytes_sent: Size of the request body
+        :type bytes_sent: int
+        :param bytes_received: Size of the last response body
+        :type bytes_received: int
+        """
+
+        parent = _current_span.get()
+        end = time.time()
+
+        self._add(
+            dict(
+                kind="call",
+                name=name,
+                project_id=parent["project_id"] if parent else None,
+                trace_id=parent["trace_id"] if parent else os.urandom(16).hex(),
+                span_id=os.urandom(8).hex(),
+                parent_span_id=parent["span_id"] if parent else None,
+                start=end - latency,
+                end=end,
+                latency=latency,
+                status=status,
+                attempts=attempts,
+                retries=attempts - 1,
+                bytes_sent=bytes_sent,
+                bytes_received=bytes_received,
+                error=status is None or status >= 400,
+            )
+        )
+
+    @contextlib.contextmanager
+    def step(self, project_id, name):
+        """
+        Measures a single step of a project pipeline (as a context manager).
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param name: Name of the step (e.g. create_project)
+        :type name: str
+        """
+
+        parent = _current_span.get()
+        span = dict(
+            kind="step",
+            name=name,
+            project_id=project_id,
+            trace_id=(
+                parent["trace_id"]
+                if parent and parent["project_id"] == project_id
+                else self._start_trace(project_id)
+            ),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent["span_id"] if parent else None,
+            start=time.time(),
+            error=False,
+        )
+
+        token = _current_span.set(span)
+        started = time.monotonic()
+        error = None
+
+        if self.events:
+            self.events.emit("step_started", project_id=project_id, step=name)
+
+        try:
+            yield span
+        except BaseException as err:
+            span["error"] = True
+            error = err
+            raise
+        finally:
+            _current_span.reset(token)
+            span["latency"] = time.monotonic() - started
+            span["end"] = span["start"] + span["latency"]
+            self._add(span)
+
+            if not (parent and parent["project_id"] == project_id):
+                self._end_trace(project_id)
+
+            if self.events:
+                self.events.emit(
+                    "step_failed" if span["error"] else "step_completed",
+                    project_id=project_id,
+                    step=name,
+                    duration_seconds=round(span["latency"], 3),
+                    **({"error": repr(error)} if span["error"] else {}),
+                )
+
+    def summary(self):
+        """
+        Summarizes latencies of the API calls and pipeline steps, grouped by name.
+
+        :return: Summary per kind and name (count, errors, retries, bytes, mean,
+            p50, p95, p99 and max latency in seconds)
+        :rtype: dict
+        """
+
+        summary = dict(calls={}, steps={})
+
+        with self._lock:
+            for (kind, name), histogram in sorted(self.histograms.items()):
+                summary[f"{kind}s"][name] = dict(
+                    count=histogram.count,
+                    errors=histogram.errors,
+                    retries=histogram.retries,
+                    bytes_received=histogram.bytes_received,
+                    mean=round(histogram.total / histogram.count, 4),
+                    p50=round(histogram.percentile(50), 4),
+                    p95=round(histogram.percentile(95), 4),
+                    p99=round(histogram.percentile(99), 4),
+                    max=round(histogram.max, 4),
+                )
+
+        return summary
+
+    def log_summary(self):
+        """
+        Logs latency percentiles of the pipeline steps and API calls.
+        """
+
+        for kind, groups in self.summary().items():
+            for name, stats in groups.items():
+                logging.info(
+                    "%s %s: count=%s errors=%s retries=%s p50=%ss p95=%ss p99=%ss",
+                    kind[:-1].capitalize(),
+                    name,
+                    stats["count"],
+                    stats["errors"],
+                    stats["retries"],
+                    stats["p50"],
+                    stats["p95"],
+                    stats["p99"],
+                )
+
+    def write_report(self, report_file):
+        """
+        Saves the measurements locally - a summary together with all the measured
+        spans as JSON, or a single row per span if the file has a .csv extension.
+
+        :param report_file: Path of the report file (.json or .csv)
+        :type report_file: str
+        """
+
+        with self._lock:
+            spans = list(self.spans)
+
+        if report_file.endswith(".csv"):
+            fields = [
+                "kind",
+                "name",
+                "project_id",
+                "start",
+                "latency",
+                "status",
+                "attempts",
+                "retries",
+                "bytes_sent",
+                "bytes_received",
+                "error",
+            ]
+
+            with open(report_file, "w", newline="", encoding="utf-8") as outfile:
+                writer = csv.DictWriter(
+                    outfile, fieldnames=fields, extrasaction="ignore"
+                )
+                writer.writeheader()
+                writer.writerows(spans)
+        else:
+            with open(report_file, "w", encoding="utf-8") as outfile:
+                json.dump(dict(summary=self.summary(), spans=spans), outfile, indent=4)
+
+        logging.info("Metrics report saved as %s", report_file)
+
+    def write_spans(self, spans_file):
+        """
+        Exports the measured spans in the OpenTelemetry Protocol JSON format
+        (ExportTraceServiceRequest), e.g. for an OpenTelemetry collector.
+
+        :param spans_file: Path of the exported file
+        :type spans_file: str
+        """
+
+        with self._lock:
+            spans = list(self.spans)
+
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return dict(key=key, value=dict(boolValue=value))
+
+            if isinstance(value, int):
+                return dict(key=key, value=dict(intValue=str(value)))
+
+            return dict(key=key, value=dict(stringValue=str(value)))
+
+        otlp_spans = []
+
+        for span in spans:
+            attributes = {
+                k: span[k]
+                for k in (
+                    "project_id",
+                    "status",
+                    "attempts",
+                    "bytes_sent",
+                    "bytes_received",
+                )
+                if span.get(k) is not None
+            }
+
+            otlp_spans.append(
+                dict(
+                    traceId=span["trace_id"],
+                    spanId=span["span_id"],
+                    parentSpanId=span["parent_span_id"] or "",
+                    name=span["name"],
+                    kind=3 if span["kind"] == "call" else 1,  # CLIENT / INTERNAL
+                    startTimeUnixNano=str(int(span["start"] * 1e9)),
+                    endTimeUnixNano=str(int(span["end"] * 1e9)),
+                    attributes=[attribute(k, v) for k, v in attributes.items()],
+                    status=dict(code=2 if span["error"] else 1),  # ERROR / OK
+                )
+            )
+
+        export = dict(
+            resourceSpans=[
+                dict(
+                    resource=dict(
+                        attributes=[attribute("service.name", "gcp-automated-setup")]
+                    ),
+                    scopeSpans=[
+                        dict(scope=dict(name="gcp-automated-setup"), spans=otlp_spans)
+                    ],
+                )
+            ]
+        )
+
+        with open(spans_file, "w", encoding="utf-8") as outfile:
+            json.dump(export, outfile)
+
+        logging.info("Spans exported as %s", spans_file)
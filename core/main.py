@@ -1,40 +1,62 @@
-import base64
 import json
 import logging
 import os
-import plistlib
 import sys
-import time
+import zlib
 from argparse import ArgumentParser
-from enum import Enum
-
-import requests
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from requests.adapters import HTTPAdapter, Retry
-
-# Basic log message configuration
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="gcp-automated-setup - %(levelname)s - %(asctime)s - %(message)s",
-    datefmt="%d-%b-%y %H:%M:%S",
+from concurrent.futures import ProcessPoolExecutor
+
+# Running the script directly (python main.py), rather than as a module of the
+# package (python -m core.main), requires its package to be importable
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+# The HTTP and auth libraries (requests, google-auth, google-auth-oauthlib), asyncio
+# and email.utils are imported lazily by the code paths which need them, so runs which
+# send no request (--help, validation, plan mode) start fast
+from .common import DEFAULT_MAX_WORKERS, APICallError, configure_logging, parse_flag
+from .retry import DEFAULT_POLL_DEADLINE, DEFAULT_RETRY_BUDGET, RateLimiter, RetryPolicy
+from .instrumentation import (
+    DEFAULT_EVENT_QUEUE_SIZE,
+    DEFAULT_SERVE_MAX_SPANS,
+    EventStream,
+)
+from .transport import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_READ_TIMEOUT,
+    FIREBASE_BASE_URL,
+    GCP_CRM_BASE_URL,
+    GCPClient,
+)
+from .manifest import load_manifest, shard_entries, validate_manifest
+from .state import (
+    DEFAULT_ARTIFACT_CACHE_MAX_SIZE,
+    DEFAULT_ARTIFACT_CACHE_TTL,
+    ArtifactCache,
+    ResourceIndex,
+    StateStore,
+)
+from .pipeline import (
+    AsyncGCPClient,
+    BatchRunner,
+    JobServer,
+    export_app_configurations,
+    fetch_project_configs,
+    plan_project,
+    print_plan,
+    provision_project,
+    teardown_project,
+    teardown_targets,
+    write_report,
 )
-
-# Base URLs used for each of the GCP/Firebase API calls
-GCP_CRM_BASE_URL = "https://cloudresourcemanager.googleapis.com/v3"
-FIREBASE_BASE_URL = "https://firebase.googleapis.com/v1beta1"
-
-# Path for writing/reading of the GCP access/refresh token info
-TOKEN_PATH = "token.json"
-
-# If modifying these scopes, delete the file token.json.
-SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
 
 # Available command line arguments - keys: argument names; values: argument help descriptions
 ARGUMENTS = dict(
-    auth="Path to the credentials.json file obtained from Google Cloud Platform. "
-    "Required if not using an external config file.",
+    auth="Path to the credentials.json file obtained from Google Cloud Platform - "
+    "OAuth client secrets, authorized user or service account key. "
+    "If not specified, Application Default Credentials are used.",
     gcp_project_id="The unique, user-assigned id of the project. "
     "It must be 6 to 30 lowercase ASCII letters, digits, or hyphens. "
     "It must start with a letter. "
@@ -74,13 +96,164 @@ ARGUMENTS = dict(
     "arguments will be automatically omitted.",
 )
 
+# Available command line options which are not a part of the project configuration
+# and are therefore kept even when an external config file is used
+OPTIONS = dict(
+    manifest="Path to a manifest file describing multiple projects to be provisioned "
+    "concurrently. Must be either a JSON list or a JSON Lines file, where each entry "
+    "accepts the same keys as an external configuration file. "
+    "Example: path/to/manifest.jsonl",
+    max_workers="Maximum number of project pipelines executed concurrently when "
+    "using a manifest. "
+    "Defaults to 8.",
+    state_file="Path to a local SQLite file recording the completed steps, operation "
+    "names, application IDs and configuration artifact checksums of each project. "
+    "Reruns with the same file skip completed steps and resume in-flight operations. "
+    "Example: path/to/state.db",
+    preflight="Whether to discover already existing GCP projects, Firebase projects "
+    "and applications with a few paginated list calls before provisioning the "
+    "projects from a manifest, so only the missing steps get executed (true/false). "
+    "Defaults to false.",
+    report_file="Path for the JSON report containing the result of each provisioned "
+    "project when using a manifest. "
+    "Example: path/to/report.json",
+    processes="Number of worker processes the projects from a manifest are "
+    "partitioned across, each with its own GCP client. "
+    "Defaults to 1.",
+    process_credentials="Comma-separated paths to the credentials files used by the "
+    "worker processes (round-robin), so each of them has its own token and quota. "
+    "Defaults to the credentials of the run. "
+    "Example: path/to/sa-1.json,path/to/sa-2.json",
+    shard_index="Index (starting with 0) of the shard of the manifest provisioned "
+    "by this run, when the manifest is partitioned across several hosts. "
+    "Defaults to 0.",
+    shard_count="Number of shards the manifest is partitioned into - each project "
+    "belongs to a single shard, based on a hash of its ID. "
+    "Defaults to 1.",
+    merge_reports="Comma-separated paths (or glob patterns) of the reports of the "
+    "individual shards, merged into a single report saved as report_file. "
+    "Example: path/to/report-*.json",
+    pool_maxsize="Maximum number of HTTP connections kept alive per API host and "
+    "shared by all the API calls. "
+    "Defaults to 16 or to the value of max_workers, whichever is greater.",
+    mode="Mode of the run - provision (the whole workflow), fetch-config "
+    "(only download of the configuration artifacts of the already existing "
+    "applications), export (download of the configuration artifacts of all the "
+    "applications within the projects), plan (printing of the API calls of the "
+    "workflow, without sending any request), serve (a long-running server "
+    "executing provisioning jobs read from the standard input or a local socket) "
+    "or teardown (deletion of the projects, or removal of their applications). "
+    "Defaults to provision.",
+    projects="Comma-separated IDs of the Firebase projects whose applications are "
+    "exported in export mode. "
+    "Defaults to the projects of the manifest or configuration file, or to all the "
+    "accessible Firebase projects. "
+    "Example: my-project-1,my-project-2",
+    export_path="Path of the directory (or a .zip archive) into which the "
+    "configuration artifacts are exported in export mode. "
+    "Example: path/to/export.zip",
+    teardown_scope="What is torn down in teardown mode - project (deletion of the "
+    "whole GCP projects) or apps (removal of the Firebase applications listed by the "
+    "configuration, or of all of them if none is listed). "
+    "Defaults to project.",
+    project_prefix="Prefix of the IDs of the GCP projects torn down in teardown "
+    "mode, when the projects are not specified otherwise. "
+    "Example: load-test-",
+    project_labels="Comma-separated labels of the GCP projects torn down in "
+    "teardown mode, when the projects are not specified otherwise. "
+    "Example: env=test,owner=load-tests",
+    confirm="Whether the teardown is actually performed (true/false) - otherwise "
+    "the projects which would be torn down are only listed. "
+    "Defaults to false.",
+    socket="Path of a Unix domain socket on which the jobs are accepted in serve "
+    "mode, instead of the standard input. "
+    "Example: /tmp/gcp-automation.sock",
+    engine="Concurrency engine used for provisioning of the projects from a manifest "
+    "(threads/asyncio). "
+    "Defaults to threads.",
+    rate_limits="Client-side rate limits (requests per minute) per API family "
+    "(crm, firebase) and method class (mutation, read), lowered automatically when "
+    "the API responds with 429. "
+    "Defaults to crm.mutation=60,crm.read=600,firebase.mutation=60,firebase.read=600. "
+    "Example: firebase.mutation=30,firebase.read=300",
+    retry_budget="Maximum time (in seconds) spent retrying a single API call which "
+    "has failed with a transient error. "
+    "Defaults to 120.",
+    poll_deadline="Maximum time (in seconds) spent waiting for a single long-running "
+    "operation or resource to be completed. "
+    "Defaults to 600.",
+    keep_alive="Whether HTTP connections are kept alive and reused between API calls "
+    "(true/false). "
+    "Defaults to true.",
+    connect_timeout="Maximum time (in seconds) spent establishing a connection to "
+    "the API. "
+    f"Defaults to {DEFAULT_CONNECT_TIMEOUT:g}.",
+    read_timeout="Maximum time (in seconds) spent waiting for the response of a single "
+    "HTTP request, before it is retried (if possible). "
+    f"Defaults to {DEFAULT_READ_TIMEOUT:g}.",
+    raw_artifacts="Whether configuration artifacts are saved exactly as provided "
+    "by Firebase, instead of being reformatted (indented JSON, re-serialized plist) "
+    "(true/false). "
+    "Defaults to false.",
+    validate_artifacts="Whether configuration artifacts are checked to be valid "
+    "JSON (Android) or plist (iOS) before being saved (true/false). "
+    "Defaults to false.",
+    artifact_cache="Path to a local directory caching the downloaded configuration "
+    "artifacts, so repeated downloads within the TTL need no API calls. "
+    "Example: path/to/cache",
+    artifact_cache_ttl="Time (in seconds) for which a cached configuration artifact "
+    "is used without checking the remote one. "
+    "Defaults to 3600.",
+    artifact_cache_max_size="Maximum total size (in MB) of the cached configuration "
+    "artifacts, the least recently used ones are evicted. "
+    "Defaults to 100.",
+    crm_base_url="Base URL of the Cloud Resource Manager API, e.g. of a local API "
+    "emulator (fake_server.py). "
+    "Defaults to https://cloudresourcemanager.googleapis.com/v3.",
+    firebase_base_url="Base URL of the Firebase Management API, e.g. of a local API "
+    "emulator (fake_server.py). "
+    "Defaults to https://firebase.googleapis.com/v1beta1.",
+    access_token="Static access token used instead of the credentials, e.g. with a "
+    "local API emulator (any value is accepted by fake_server.py).",
+    log_level="Minimum level of the logged messages (DEBUG/INFO/WARNING/ERROR). "
+    "DEBUG additionally logs every HTTP request, with credentials redacted. "
+    "Defaults to INFO.",
+    log_queue="Whether log messages are handed over to a queue and written by a "
+    "background thread, so logging I/O never blocks the pipelines (true/false). "
+    "Defaults to false.",
+    events="Path of a file into which progress events (step transitions, saved "
+    "configuration artifacts) are appended as JSON Lines, or - for the standard "
+    "output. "
+    "Example: path/to/events.jsonl",
+    events_url="URL of an HTTP endpoint to which batches of progress events are "
+    "POSTed as JSON Lines. "
+    "Example: http://localhost:8000/events",
+    events_queue_size="Maximum number of progress events buffered for delivery - "
+    "events are dropped instead of blocking the pipelines when it is exceeded. "
+    "Defaults to 10000.",
+    metrics_report="Path for the report containing latency percentiles of the "
+    "pipeline steps and API calls together with all the individual measurements "
+    "(.json, or .csv for a single row per measurement). "
+    "Example: path/to/metrics.json",
+    spans_file="Path for the measured pipeline steps and API calls exported as "
+    "OpenTelemetry spans (OTLP/JSON). "
+    "Example: path/to/spans.json",
+    max_spans="Maximum number of the most recent measurements kept for the metrics "
+    "report and spans (latency percentiles always cover all of them). "
+    f"Defaults to unlimited, or to {DEFAULT_SERVE_MAX_SPANS} in serve mode.",
+)
 
-class ApplicationType(Enum):
-    """
-    Enumerates types of applications to be added to Firebase.
-    """
+# Modes of a run - the whole provisioning workflow, only download of the
+# configuration artifacts of the already existing applications, export of the
+# configuration artifacts of all the applications within the projects,
+# printing of the planned workflow without sending any request, a long-running
+# server executing provisioning jobs, or deletion of the projects (or removal of
+# their applications)
+MODES = ("provision", "fetch-config", "export", "plan", "serve", "teardown")
 
-    ANDROID, IOS = range(2)
+# Scopes of a teardown - deletion of whole GCP projects, or removal of the Firebase
+# applications only
+TEARDOWN_SCOPES = ("project", "apps")
 
 
 class CommandLineClient:
@@ -91,10 +264,12 @@ class CommandLineClient:
 
     def _set_arguments(self):
         """
-        Sets arguments provided by global ARGUMENTS dictionary to argument parser.
+        Sets arguments provided by global ARGUMENTS and OPTIONS dictionaries to
+        argument parser.
         """
 
         [self.parser.add_argument(f"--{a}", help=h) for a, h in ARGUMENTS.items()]
+        [self.parser.add_argument(f"--{a}", help=h) for a, h in OPTIONS.items()]
 
     def __init__(self):
         """
@@ -116,26 +291,37 @@ class CommandLineClient:
         """
 
         args = vars(self.parser.parse_args())
+        options = {o: args.get(o) for o in OPTIONS}
 
-        # If external configuration file is used, other args are redundant
+        # If external configuration file or manifest is used, other args are redundant
         config_file = args.get("config_file")
-
-        if config_file:
-            logging.info(f"Using an external configuration file: {config_file}")
-            args = {"config_file": config_file}
+        manifest = args.get("manifest")
+
+        if manifest:
+            logging.info("Using a manifest of multiple projects: %s", manifest)
+            args = {"auth": args.get("auth"), **options}
+        elif (
+            options.get("mode") in ("export", "serve") or options.get("merge_reports")
+        ) and not config_file:
+            args = {"auth": args.get("auth"), **options}
+        elif options.get("mode") == "teardown" and not config_file:
+            # Project configuration is optional, the projects may be found by filters
+            pass
+        elif config_file:
+            logging.info("Using an external configuration file: %s", config_file)
+            args = {"config_file": config_file, **options}
         else:
             logging.info("Using command line arguments for project configuration")
 
             # If using command line arguments, required ones must be set
             if not all(
                 [
-                    args.get("auth"),
                     args.get("gcp_project_id"),
                     args.get("android_package"),
                 ]
             ):
                 logging.warning(
-                    "You need to specify --auth, --gcp_project_id and --android_package "
+                    "You need to specify --gcp_project_id and --android_package "
                     "arguments if not using an external configuration file"
                 )
                 sys.exit(1)
@@ -158,462 +344,763 @@ class CommandLineClient:
         return {argument: value for argument, value in args.items()}
 
 
-class GCPClient:
+def run_plan(arguments, state_store=None):
     """
-    Represents a client for communication with Google Cloud Platform and Firebase APIs.
-
-    Currently supported operations:
-        * Authorization / Authentication
-        * Creation of a Google Cloud Platform project
-        * Addition of Firebase to an existing Google Cloud Platform project
-        * Addition of Android application to an existing Firebase project
-        * Addition of iOS application to an existing Firebase project
-        * Download of configuration artifact associated with an existing Android application
-        * Download of configuration artifact associated with an existing iOS application
+    Plans and prints the automated workflow for a single project or for all the
+    projects of a manifest, without sending any request (unless pre-flight
+    discovery is requested).
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param state_store: State store of the previous runs (optional)
+    :type state_store: StateStore
+    :return: Planned steps per project ID
+    :rtype: dict
     """
 
-    def _obtain_credentials(self, credentials_file):
-        """
-        Obtains access and refresh token information from Google Cloud Platform
-        based on provided credentials (in a form of JSON file).
+    entries = (
+        load_manifest(arguments["manifest"])
+        if arguments.get("manifest")
+        else [arguments]
+    )
+    resource_index = None
+
+    if parse_flag(arguments.get("preflight")):
+        gcp_client = create_gcp_client(arguments, arguments.get("auth"))
+        resource_index = ResourceIndex.discover(
+            gcp_client,
+            [e.get("gcp_project_id") for e in entries],
+            max_workers=int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS),
+        )
+        gcp_client.close()
+
+    plans = {}
+
+    for entry in entries:
+        project_id = entry.get("gcp_project_id")
+        plans[project_id] = plan_project(
+            entry,
+            crm_base_url=arguments.get("crm_base_url") or GCP_CRM_BASE_URL,
+            firebase_base_url=arguments.get("firebase_base_url") or FIREBASE_BASE_URL,
+            state_store=state_store,
+            resource_index=resource_index,
+        )
+        print_plan(project_id, plans[project_id])
 
-        The code is based on the official Google Cloud Platform documentation.
-        Reference: https://developers.google.com/docs/api/quickstart/python
+    return plans
 
-        :param credentials_file: Path to the credentials JSON file obtained from GCP
-        :type credentials_file: str
-        """
 
-        credentials = None
+def create_gcp_client(arguments, credentials_file):
+    """
+    Creates a GCP client configured with the options of the current run.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param credentials_file: Path to the credentials JSON file obtained from GCP
+    :type credentials_file: str
+    :return: Configured GCP client
+    :rtype: GCPClient
+    """
 
-        # The file token.json stores the user's access and refresh tokens, and is
-        # created automatically when the authorization flow completes for the first
-        # time.
-        if os.path.exists(TOKEN_PATH):
-            credentials = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    max_workers = int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS)
 
-        # If there are no (valid) credentials available, let the user log in.
-        if not credentials or not credentials.valid:
-            if credentials and credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    credentials_file,
-                    SCOPES,
-                )
+    artifact_cache = None
 
-                credentials = flow.run_local_server(port=0)
+    if arguments.get("artifact_cache"):
+        max_size = arguments.get("artifact_cache_max_size")
 
-            # Save the credentials for the next run
-            with open(TOKEN_PATH, "w") as token:
-                token.write(credentials.to_json())
+        artifact_cache = ArtifactCache(
+            cache_dir=arguments["artifact_cache"],
+            ttl=float(
+                arguments.get("artifact_cache_ttl") or DEFAULT_ARTIFACT_CACHE_TTL
+            ),
+            max_size=(
+                int(float(max_size) * 1024 * 1024)
+                if max_size
+                else DEFAULT_ARTIFACT_CACHE_MAX_SIZE
+            ),
+        )
 
-        self.credentials = credentials
+    return GCPClient(
+        credentials_file=credentials_file,
+        pool_maxsize=int(
+            arguments.get("pool_maxsize") or max(DEFAULT_POOL_MAXSIZE, max_workers)
+        ),
+        keep_alive=parse_flag(arguments.get("keep_alive"), default=True),
+        connect_timeout=float(
+            arguments.get("connect_timeout") or DEFAULT_CONNECT_TIMEOUT
+        ),
+        read_timeout=float(arguments.get("read_timeout") or DEFAULT_READ_TIMEOUT),
+        poll_deadline=float(arguments.get("poll_deadline") or DEFAULT_POLL_DEADLINE),
+        retry_policy=RetryPolicy(
+            budget=float(arguments.get("retry_budget") or DEFAULT_RETRY_BUDGET),
+        ),
+        rate_limits=RateLimiter.parse(arguments.get("rate_limits")),
+        raw_artifacts=parse_flag(arguments.get("raw_artifacts")),
+        validate_artifacts=parse_flag(arguments.get("validate_artifacts")),
+        artifact_cache=artifact_cache,
+        crm_base_url=arguments.get("crm_base_url") or GCP_CRM_BASE_URL,
+        firebase_base_url=arguments.get("firebase_base_url") or FIREBASE_BASE_URL,
+        access_token=arguments.get("access_token"),
+        events=(
+            EventStream(
+                path=arguments.get("events"),
+                url=arguments.get("events_url"),
+                max_queued=int(
+                    arguments.get("events_queue_size") or DEFAULT_EVENT_QUEUE_SIZE
+                ),
+            )
+            if arguments.get("events") or arguments.get("events_url")
+            else None
+        ),
+        max_spans=(int(arguments["max_spans"]) if arguments.get("max_spans") else None),
+    )
 
-    def __init__(self, credentials_file):
-        """
-        Initializes Google Cloud Platform client by setting the access / refresh
-        token info based on the provided credentials obtained from Google Cloud Platform
-        in a form of a JSON file.
 
-        :param credentials_file: Path to the credentials JSON file obtained from GCP
-        :type credentials_file: str
-        """
+def write_metrics(gcp_client, arguments):
+    """
+    Logs latency percentiles of the pipeline steps and API calls of a run and
+    saves the optional metrics report and spans.
 
-        self._obtain_credentials(credentials_file)
+    :param gcp_client: Client used for all the GCP/Firebase API calls of the run
+    :type gcp_client: GCPClient
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    """
 
-    def _execute_api_call(self, url, method, query_params=None, body=None):
-        """
-        Performs an HTTP request to the specified URL based on provided HTTP
-        method name and (optionally) query parameters and/or request body.
-
-        :param url: Target URL
-        :type url: str
-        :param method: HTTP method name (POST, GET, PUT, etc.)
-        :type method: str
-        :param query_params: Query parameters
-        :type query_params: dict
-        :param body: Request body
-        :type body: dict
-        :return: HTTP Response
-        :rtype: requests.Response
-        """
+    instrumentation = gcp_client.instrumentation
+    instrumentation.log_summary()
 
-        # Each request sent to Google Cloud Platform / Firebase API requires
-        # auth (bearer token) and content-type headers
-        headers = {
-            "Authorization": f"Bearer {self.credentials.token}",
-            "Content-Type": "application/json",
-        }
+    if arguments.get("metrics_report"):
+        instrumentation.write_report(arguments["metrics_report"])
 
-        # Consequence of the specified Content-Type header (application/json)
-        body = json.dumps(body) if body else None
+    if arguments.get("spans_file"):
+        instrumentation.write_spans(arguments["spans_file"])
 
-        try:
-            logging.debug(
-                f"Performing HTTP request:\n"
-                f"Headers: {headers}\n"
-                f"URL: {url}\n"
-                f"Query parameters: {query_params}\n"
-                f"Request body: {body}\n"
-                f"..."
-            )
 
-            # Opens up a session with maximum of 10 retries and increases waiting
-            # time for each retry automatically
-            s = requests.Session()
+def suffixed_path(path, suffix):
+    """
+    Inserts a suffix in front of the extension of a file path, e.g. a path of the
+    file written by a single worker process.
+
+    :param path: File path
+    :type path: str
+    :param suffix: Suffix, e.g. process-1
+    :type suffix: str
+    :return: Suffixed path, e.g. path/to/metrics.process-1.json
+    :rtype: str
+    """
 
-            retries = Retry(
-                total=10,
-                backoff_factor=1,
-                status_forcelist=[400, 403, 404, 500, 502, 503, 504],
-                method_whitelist=False,  # Needs to be set to False, so it retries for POST also
-            )
+    root, extension = os.path.splitext(path)
 
-            # Binds the retry-mechanism to API calls sent to URLs starting with HTTPS
-            s.mount("https://", HTTPAdapter(max_retries=retries))
+    return f"{root}.{suffix}{extension}"
 
-            return s.request(
-                method=method,
-                url=url,
-                params=query_params,
-                data=body,
-                headers=headers,
-            )
-        except requests.exceptions.RequestException as err:
-            logging.warning(
-                f"HTTP request:\n"
-                f"Headers: {headers}\n"
-                f"URL: {url}\n"
-                f"Query parameters: {query_params}\n"
-                f"Request body: {body}\n"
-                f"has failed"
+
+def _run_process(arguments, entries, process_index):
+    """
+    Provisions a part of the manifest entries within a worker process - with its
+    own GCP client, state store connection and (optionally) credentials.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param entries: Manifest entries provisioned by the process
+    :type entries: list
+    :param process_index: Index of the worker process (starting with 0)
+    :type process_index: int
+    :return: Results of the project pipelines, in manifest order
+    :rtype: list
+    """
+
+    configure_logging(arguments.get("log_level"))
+
+    arguments = dict(arguments, report_file=None)
+
+    # Files written per process must not be overwritten by the other processes
+    # (the state file is shared, as SQLite serializes the writes of the processes)
+    for option in ("metrics_report", "spans_file", "events"):
+        if arguments.get(option) and arguments[option] != "-":
+            arguments[option] = suffixed_path(
+                arguments[option], f"process-{process_index}"
             )
-            logging.exception(err)
 
-    def create_gcp_project(self, gcp_project_id, project_name=None):
-        """
-        Creates a new Google Cloud Platform project configured with the
-        help of the provided keyword arguments.
-
-        Reference:
-        https://cloud.google.com/resource-manager/reference/rest/v3/projects/create
-
-        :param gcp_project_id: Google Cloud Platform project ID
-        :type gcp_project_id: str
-        :param project_name: Google Cloud Platform project name (optional)
-        :type project_name: str
-        :return: HTTP Response object
-        :rtype: requests.Response
-        """
+    credentials_files = [
+        c.strip()
+        for c in (arguments.get("process_credentials") or "").split(",")
+        if c.strip()
+    ]
+
+    if credentials_files:
+        arguments["auth"] = credentials_files[process_index % len(credentials_files)]
+
+    state_file = arguments.get("state_file")
+    state_store = StateStore(state_file) if state_file else None
+
+    try:
+        return run_batch(arguments, state_store, entries=entries)
+    finally:
+        if state_store:
+            state_store.close()
+
+
+def run_sharded(arguments):
+    """
+    Provisions the projects of a manifest (or of its shard) by several worker
+    processes, each provisioning a deterministic part of the projects with its
+    own GCP client, and saves a single report of all of them. Projects of a worker
+    process which has failed (e.g. crashed) are reported as failed.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :return: Results of all the project pipelines, in manifest order
+    :rtype: list
+    """
+
+    import multiprocessing
+
+    shard_count = int(arguments.get("shard_count") or 1)
+    entries = shard_entries(
+        load_manifest(arguments["manifest"]),
+        int(arguments.get("shard_index") or 0),
+        shard_count,
+    )
+    processes = int(arguments.get("processes") or 1)
+
+    # Projects of the shard are partitioned further by the same hash, divided by
+    # the number of shards (its remainder is the same for all of them)
+    partitions = [[] for _ in range(processes)]
+
+    for entry in entries:
+        crc = zlib.crc32(entry["gcp_project_id"].encode("utf-8"))
+        partitions[(crc // shard_count) % processes].append(entry)
+
+    logging.info(
+        "Provisioning %s projects by %s worker processes (%s)",
+        len(entries),
+        processes,
+        ", ".join(str(len(p)) for p in partitions),
+    )
+
+    # Spawned processes do not inherit locks held by the threads of this process
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(_run_process, arguments, partition, i): partition
+            for i, partition in enumerate(partitions)
+            if partition
+        }
+        results_by_project = {}
+
+        for future, partition in futures.items():
+            try:
+                process_results = future.result()
+            except Exception as err:
+                logging.exception(
+                    "Worker process provisioning %s projects has failed",
+                    len(partition),
+                )
+                process_results = [
+                    dict(
+                        gcp_project_id=e["gcp_project_id"],
+                        status="failed",
+                        error=repr(err),
+                    )
+                    for e in partition
+                ]
+
+            results_by_project.update((r["gcp_project_id"], r) for r in process_results)
+
+    results = [results_by_project[e["gcp_project_id"]] for e in entries]
+
+    report_file = arguments.get("report_file")
 
-        body = dict(projectId=gcp_project_id)
+    if report_file:
+        write_report(results, report_file)
 
-        if project_name:
-            body["displayName"] = project_name
+    return results
 
-        logging.info(f"Creating Google Cloud Platform project: {body} ...")
 
-        return self._execute_api_call(
-            url=f"{GCP_CRM_BASE_URL}/projects",
-            method="post",
-            body=body,
+def merge_reports(report_patterns, report_file):
+    """
+    Merges the reports of the individual shards (e.g. saved by several hosts)
+    into a single report.
+
+    :param report_patterns: Comma-separated paths or glob patterns of the reports
+    :type report_patterns: str
+    :param report_file: Path of the merged report
+    :type report_file: str
+    :return: Results of all the merged reports
+    :rtype: list
+    """
+
+    import glob
+
+    paths = sorted(
+        {
+            path
+            for pattern in report_patterns.split(",")
+            if pattern.strip()
+            for path in glob.glob(pattern.strip())
+        }
+        - {os.path.abspath(report_file), report_file}
+    )
+    results = []
+    items_key = "projects"
+
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+
+        items_key = "apps" if "apps" in report else "projects"
+        results.extend(report[items_key])
+
+    logging.info("Merging %s reports with %s results", len(paths), len(results))
+    write_report(results, report_file, items_key=items_key)
+
+    return results
+
+
+def run_batch(arguments, state_store=None, entries=None):
+    """
+    Provisions all the projects described by a manifest (or by its shard) with a
+    single shared GCP client and saves the optional report.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param state_store: State store making the pipelines resumable (optional)
+    :type state_store: StateStore
+    :param entries: Manifest entries to be provisioned (defaults to the entries of
+        the shard of the manifest file)
+    :type entries: list
+    :return: Results of all the project pipelines, in manifest order
+    :rtype: list
+    """
+
+    if entries is None:
+        entries = shard_entries(
+            load_manifest(arguments.get("manifest")),
+            int(arguments.get("shard_index") or 0),
+            int(arguments.get("shard_count") or 1),
         )
 
-    def add_firebase_to_gcp_project(self, gcp_project_id):
-        """
-        Adds Firebase functionality to an existing Google Cloud Platform project,
-        i.e. creates a new Firebase project and binds it with an existing Google
-        Cloud Platform project based on the provided project ID.
+    # A single client (and its credentials) is shared by all the pipelines
+    credentials_file = arguments.get("auth") or next(
+        (e.get("auth") for e in entries if e.get("auth")),
+        None,
+    )
 
-        Reference:
-        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/addFirebase
+    gcp_client = create_gcp_client(arguments, credentials_file)
 
-        :param gcp_project_id: Google Cloud Platform project ID
-        :type gcp_project_id: str
-        :return: HTTP Response object
-        :rtype: requests.Response
-        """
+    max_workers = int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS)
+    resource_index = None
+
+    if parse_flag(arguments.get("preflight")):
+        resource_index = ResourceIndex.discover(
+            gcp_client,
+            [e.get("gcp_project_id") for e in entries],
+            max_workers=max_workers,
+        )
+
+        plan = resource_index.plan(entries)
 
         logging.info(
-            f"Adding Firebase functionality to a Google Cloud "
-            f"Platform project {gcp_project_id} ..."
+            "Pre-flight plan: %s missing steps, %s projects already provisioned",
+            sum(len(steps) for steps in plan.values()),
+            sum(1 for steps in plan.values() if not steps),
         )
 
-        return self._execute_api_call(
-            url=f"{FIREBASE_BASE_URL}/projects/{gcp_project_id}:addFirebase",
-            method="post",
-            body={},
+    if arguments.get("mode") == "fetch-config":
+        runner = BatchRunner(
+            gcp_client=gcp_client,
+            max_workers=max_workers,
+            resource_index=resource_index,
+            pipeline=fetch_project_configs,
         )
+        results = runner.run(entries)
+    elif arguments.get("engine") == "asyncio":
+        import asyncio
+
+        async_client = AsyncGCPClient(
+            gcp_client=gcp_client,
+            max_concurrency=max_workers,
+            max_http_workers=max(DEFAULT_POOL_MAXSIZE, max_workers),
+            state_store=state_store,
+            resource_index=resource_index,
+        )
+        results = asyncio.run(async_client.run(entries))
+        async_client.close()
+    else:
+        runner = BatchRunner(
+            gcp_client=gcp_client,
+            max_workers=max_workers,
+            state_store=state_store,
+            resource_index=resource_index,
+        )
+        results = runner.run(entries)
 
-    def _fetch_firebase_project(self, fb_project_id):
-        """
-        Fetches a Firebase project with the specified ID.
+    logging.info("HTTP connection statistics: %s", gcp_client.connection_stats())
+    write_metrics(gcp_client, arguments)
+    gcp_client.close()
 
-        Reference:
-        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/get
+    report_file = arguments.get("report_file")
 
-        :param fb_project_id: Firebase project ID
-        :type fb_project_id: str
-        :return: HTTP Response object
-        :rtype: requests.Response
-        """
+    if report_file:
+        write_report(results, report_file)
 
-        logging.info(f"Fetching info for the Firebase project {fb_project_id} ...")
+    return results
 
-        return self._execute_api_call(
-            url=f"{FIREBASE_BASE_URL}/projects/{fb_project_id}",
-            method="get",
-        )
 
-    def add_app_to_firebase_project(
-        self,
-        fb_project_id,
-        package_name,
-        app_name=None,
-        store_id=None,
-        app_type=ApplicationType.ANDROID,
-    ):
-        """
-        Adds an Android/iOS application to an existing Firebase project.
-
-        References:
-            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/create
-            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/create
-
-        :param fb_project_id: Firebase project ID
-        :type fb_project_id: str
-        :param package_name: Android package name / iOS bundle ID
-        :type package_name: str
-        :param app_name: Name of the Android/iOS application (optional)
-        :type app_name: str
-        :param store_id: ID of the App Store (optional)
-        :type store_id: str
-        :param app_type: Type of application (Android, iOS)
-        :type app_type: ApplicationType
-        :return: Application ID
-        :rtype: str
-        """
+def run_export(arguments):
+    """
+    Exports configuration artifacts of all the applications within the projects
+    specified by the options, manifest or configuration file (or within all the
+    accessible Firebase projects), and saves the optional report.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :return: Result of each exported application
+    :rtype: list
+    """
 
-        fb_seconds = 1
+    export_path = arguments.get("export_path")
 
-        # A conditional-waiting mechanism which ensures that the previously
-        # created Firebase project is completely set-up, else applications
-        # cannot be added to it
-        while True:
-            fb_project = self._fetch_firebase_project(fb_project_id).json()
+    if not export_path:
+        logging.warning("You need to specify --export_path argument in export mode")
+        sys.exit(1)
 
-            if (
-                fb_project
-                and fb_project.get("projectId") == fb_project_id
-                and fb_project.get("state") == "ACTIVE"
-            ):
-                break
+    if arguments.get("projects"):
+        project_ids = [p.strip() for p in arguments["projects"].split(",") if p.strip()]
+    elif arguments.get("manifest"):
+        project_ids = [
+            e["gcp_project_id"] for e in load_manifest(arguments["manifest"])
+        ]
+    elif arguments.get("gcp_project_id"):
+        project_ids = [arguments["gcp_project_id"]]
+    else:
+        project_ids = None
+
+    gcp_client = create_gcp_client(arguments, arguments.get("auth"))
 
-            time.sleep(fb_seconds)
-            fb_seconds = fb_seconds + 1
+    if project_ids is None:
+        try:
+            project_ids = [
+                p["projectId"]
+                for p in gcp_client.list_firebase_projects(raise_on_error=True)
+            ]
+        except APICallError as err:
+            logging.warning("%s", err)
+            gcp_client.close()
+            sys.exit(1)
+
+    results = export_app_configurations(
+        gcp_client,
+        project_ids,
+        export_path,
+        max_workers=int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS),
+    )
 
-        target_url = f"{FIREBASE_BASE_URL}/projects/{fb_project_id}"
+    logging.info("HTTP connection statistics: %s", gcp_client.connection_stats())
+    write_metrics(gcp_client, arguments)
+    gcp_client.close()
 
-        # Handle the URL and body parts according to type of the application to be added
-        if app_type == ApplicationType.ANDROID:
-            target_url = target_url + "/androidApps"
-            body = dict(packageName=package_name)
-        else:
-            target_url = target_url + "/iosApps"
-            body = dict(bundleId=package_name)
+    report_file = arguments.get("report_file")
 
-            if store_id:
-                body["appStoreId"] = store_id
+    if report_file:
+        write_report(results, report_file, items_key="apps")
 
-        if app_name:
-            body["displayName"] = app_name
+    return results
 
-        logging.info(
-            f"Adding {app_type.name} application {body} to the Firebase project {fb_project_id} ..."
+
+def run_teardown(arguments, state_store=None):
+    """
+    Tears down the projects specified by the options, manifest or configuration
+    file (or matching the filters) concurrently and saves the optional report.
+    Without confirmation, the projects are only listed.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param state_store: State store of the provisioning runs (optional)
+    :type state_store: StateStore
+    :return: Results of the teardown of each project
+    :rtype: list
+    """
+
+    scope = arguments.get("teardown_scope") or "project"
+
+    if scope not in TEARDOWN_SCOPES:
+        logging.warning(
+            "Unknown teardown scope %s, expected one of: %s",
+            scope,
+            ", ".join(TEARDOWN_SCOPES),
         )
+        sys.exit(1)
 
-        self._execute_api_call(url=target_url, method="post", body=body)
+    gcp_client = create_gcp_client(arguments, arguments.get("auth"))
 
-        # A conditional-waiting mechanism which ensures that the previously
-        # created application is completely set-up, so its ID can be properly fetched
-        apps = None
-        apps_seconds = 0
+    try:
+        entries = [
+            {**e, "teardown_scope": scope}
+            for e in teardown_targets(gcp_client, arguments)
+        ]
+    except ValueError as err:
+        logging.warning("%s", err)
+        gcp_client.close()
+        sys.exit(1)
 
-        while not apps:
-            time.sleep(apps_seconds)
+    if not parse_flag(arguments.get("confirm")):
+        action = "deleted" if scope == "project" else "stripped of applications"
+        print(f"{len(entries)} projects would be {action}:")
 
-            apps = self._fetch_apps_of_firebase_project(
-                fb_project_id=fb_project_id,
-                app_type=app_type,
-            ).json()
+        for entry in entries:
+            print(f"  {entry['gcp_project_id']}")
 
-            apps_seconds = apps_seconds + 1
+        logging.info("Nothing has been torn down, use --confirm true to proceed")
+        gcp_client.close()
 
-        # Fetch application ID as the ID of the first application of the
-        # given application type within the specified Firebase project
-        first_app = apps.get("apps")[0]
-        app_id = first_app.get("appId")
+        return []
 
-        return app_id
+    runner = BatchRunner(
+        gcp_client=gcp_client,
+        max_workers=int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS),
+        state_store=state_store,
+        pipeline=teardown_project,
+    )
+    results = runner.run(entries)
 
-    def _fetch_apps_of_firebase_project(
-        self,
-        fb_project_id,
-        app_type=ApplicationType.ANDROID,
-    ):
-        """
-        Fetches all the Android or iOS applications within a Firebase project
-        with specified ID.
-
-        References:
-        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/list
-        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/list
-
-        :param fb_project_id: Firebase project ID
-        :type fb_project_id: str
-        :param app_type: Type of applications to be fetched (Android, iOS)
-        :type app_type: ApplicationType
-        :return: HTTP Response object
-        :rtype: requests.Response
-        """
+    logging.info("HTTP connection statistics: %s", gcp_client.connection_stats())
+    write_metrics(gcp_client, arguments)
+    gcp_client.close()
 
-        logging.info(
-            f"Fetching {app_type} applications within the Firebase project {fb_project_id} ..."
-        )
+    log_teardown_summary(results)
 
-        return self._execute_api_call(
-            url=f"{FIREBASE_BASE_URL}/projects/{fb_project_id}/{app_type.name.lower()}Apps",
-            method="get",
-        )
+    report_file = arguments.get("report_file")
 
-    def download_app_configuration(
-        self,
-        fb_project_id,
-        app_id,
-        app_type=ApplicationType.ANDROID,
-        path=None,
-    ):
-        """
-        Downloads locally configuration file for Android/iOS application.
-
-        References:
-            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/getConfig
-            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/getConfig
-
-        :param fb_project_id: Firebase project ID
-        :type fb_project_id: str
-        :param app_id: Application ID
-        :type app_id: str
-        :param app_type: Type of application (Android, iOS)
-        :type app_type: ApplicationType
-        :param path: Path marking where the configuration file will be downloaded
-        :type path: str
-        """
+    if report_file:
+        write_report(results, report_file)
 
-        # Handle the empty paths and paths ending/not ending with slash ('/')
-        path = path if path else ""
-        path = path if (path.endswith("/") or path == "") else f"{path}/"
+    return results
 
-        url_part = "androidApps" if app_type == ApplicationType.ANDROID else "iosApps"
 
-        logging.info(
-            f"Fetching configuration info for {app_type.name.lower()} "
-            f"application {app_id} ..."
-        )
+def log_teardown_summary(results):
+    """
+    Logs a summary of the teardown - the number of torn down and skipped projects,
+    and each of the skipped projects and of the projects and applications which
+    could not be torn down.
 
-        r = self._execute_api_call(
-            url=f"{FIREBASE_BASE_URL}/projects/{fb_project_id}/{url_part}/{app_id}/config",
-            method="get",
-        ).json()
+    :param results: Results of the teardown of each project
+    :type results: list
+    """
 
-        logging.info(
-            f"Decoding configuration info for {app_type.name.lower()} "
-            f"application {app_id} ..."
-        )
+    failed = [r for r in results if r.get("status") == "failed"]
+    skipped = [r for r in results if r.get("status") == "skipped"]
 
-        # Decode the Base64-encoded content of the configuration artifact
-        decoded_config = base64.b64decode(r.get("configFileContents")).decode("utf8")
+    logging.info(
+        "Teardown summary: %s of %s projects torn down, %s skipped, %s failed",
+        len(results) - len(failed) - len(skipped),
+        len(results),
+        len(skipped),
+        len(failed),
+    )
 
-        # Use the file name and extension provided with response from API
-        file_path = f"{path}{r.get('configFilename')}"
+    for result in skipped:
+        logging.warning(
+            "Teardown of the project %s has been skipped: %s",
+            result.get("gcp_project_id"),
+            result.get("error"),
+        )
 
-        logging.info(
-            f"Saving configuration info for {app_type.name.lower()} "
-            f"application {app_id} to {file_path} ..."
+    for result in failed:
+        logging.warning(
+            "Teardown of the project %s has failed: %s",
+            result.get("gcp_project_id"),
+            result.get("error"),
         )
 
-        # Save configuration artifact locally according to type of the application
-        if app_type == ApplicationType.ANDROID:
-            with open(file_path, "w", encoding="utf-8") as outfile:
-                decoded_json = json.loads(decoded_config)
-                json.dump(decoded_json, outfile, ensure_ascii=False, indent=4)
+        for app in result.get("failed_apps", []):
+            logging.warning(
+                "  %s application %s (%s) could not be removed: %s",
+                app["app_type"],
+                app["package_name"],
+                app["app_id"],
+                app["error"],
+            )
+
+
+def run_serve(arguments, state_store=None):
+    """
+    Runs a long-running server executing provisioning jobs read from the standard
+    input (until its end) or accepted on a Unix domain socket (until interrupted),
+    with a single shared GCP client.
+
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :param state_store: State store making the jobs resumable (optional)
+    :type state_store: StateStore
+    """
+
+    # Measurements of the served jobs are capped, so the memory of the server
+    # does not grow with each job
+    arguments = dict(
+        arguments, max_spans=arguments.get("max_spans") or DEFAULT_SERVE_MAX_SPANS
+    )
+    gcp_client = create_gcp_client(arguments, arguments.get("auth"))
+    job_server = JobServer(
+        gcp_client,
+        max_workers=int(arguments.get("max_workers") or DEFAULT_MAX_WORKERS),
+        state_store=state_store,
+    )
+
+    try:
+        if arguments.get("socket"):
+            job_server.serve_socket(arguments["socket"])
         else:
-            with open(file_path, "wb") as outfile:
-                decoded_plist = plistlib.loads(str.encode(decoded_config))
-                plistlib.dump(decoded_plist, outfile)
+            logging.info("Reading jobs from the standard input ...")
+            job_server.serve_stream(sys.stdin, sys.stdout)
+    finally:
+        job_server.close()
+        write_metrics(gcp_client, arguments)
+        gcp_client.close()
 
-        logging.info(
-            f"Configuration info for {app_type.name.lower()} "
-            f"application {app_id} saved as {file_path}"
-        )
 
+def main():
+    """
+    Runs the automated workflow for a single project or, if a manifest is
+    provided, for all the projects described by the manifest.
+    """
 
-# Automated workflow in 6 steps (2 of them are optional)
+    # Preliminary configuration, until the options of the run are known
+    configure_logging()
 
-if __name__ == "__main__":
     command_line_client = CommandLineClient()
     arguments = command_line_client.fetch_args()
 
     configuration_file = arguments.get("config_file")
 
     if configuration_file:
+        # Options specified through command line take precedence over the file
+        options = {o: v for o, v in arguments.items() if o in OPTIONS and v}
+
         with open(configuration_file) as f:
-            arguments = json.load(f)
+            arguments = {**json.load(f), **options}
 
-    gcp_client = GCPClient(credentials_file=arguments.get("auth"))
+    try:
+        log_listener = configure_logging(
+            arguments.get("log_level"),
+            use_queue=parse_flag(arguments.get("log_queue")),
+        )
+    except ValueError as err:
+        logging.warning("%s", err)
+        sys.exit(1)
 
-    project_id = arguments.get("gcp_project_id")
+    if arguments.get("mode") and arguments["mode"] not in MODES:
+        logging.warning(
+            "Unknown mode %s, expected one of: %s", arguments["mode"], ", ".join(MODES)
+        )
+        sys.exit(1)
 
-    # Step 1: Create a GCP project
-    gcp_client.create_gcp_project(
-        gcp_project_id=project_id,
-        project_name=arguments.get("gcp_project_name"),
-    )
+    shard_index = int(arguments.get("shard_index") or 0)
+    shard_count = int(arguments.get("shard_count") or 1)
 
-    # Step 2: Add Firebase to the created GCP project
-    gcp_client.add_firebase_to_gcp_project(gcp_project_id=project_id)
+    if not 0 <= shard_index < shard_count:
+        logging.warning(
+            "Shard index %s is out of range, expected 0 to %s",
+            shard_index,
+            shard_count - 1,
+        )
+        sys.exit(1)
 
-    # Step 3: Configure an Android app in the Firebase project
-    android_app_id = gcp_client.add_app_to_firebase_project(
-        fb_project_id=project_id,
-        package_name=arguments.get("android_package"),
-        app_name=arguments.get("android_app_name"),
-    )
+    try:
+        RateLimiter.parse(arguments.get("rate_limits"))
+    except ValueError as err:
+        logging.warning("Rate limits %s are invalid: %s", arguments["rate_limits"], err)
+        sys.exit(1)
 
-    # Step 4: Download the Android app configuration and store it locally as a JSON file
-    gcp_client.download_app_configuration(
-        fb_project_id=project_id,
-        app_id=android_app_id,
-        path=arguments.get("android_config_path"),
-    )
+    if arguments.get("merge_reports"):
+        if not arguments.get("report_file"):
+            logging.warning("You need to specify --report_file to merge the reports")
+            sys.exit(1)
 
-    ios_bundle_id = arguments.get("ios_bundle_id")
+        merge_reports(arguments["merge_reports"], arguments["report_file"])
+        return
 
-    if ios_bundle_id:
-        # Step 5 (optional): Configure an iOS app in the Firebase project
-        ios_app_id = gcp_client.add_app_to_firebase_project(
-            fb_project_id=project_id,
-            package_name=ios_bundle_id,
-            app_name=arguments.get("ios_app_name"),
-            store_id=arguments.get("app_store_id"),
-            app_type=ApplicationType.IOS,
-        )
+    if arguments.get("mode") not in ("export", "serve", "teardown"):
+        try:
+            entries = (
+                load_manifest(arguments["manifest"])
+                if arguments.get("manifest")
+                else [arguments]
+            )
+        except ValueError as err:
+            logging.warning("Manifest %s is invalid: %s", arguments["manifest"], err)
+            sys.exit(1)
+
+        errors = validate_manifest(entries)
+
+        if errors:
+            for error in errors:
+                logging.warning(error)
 
-        # Step 6 (optional): Download the iOS configuration and store it locally as a JSON file
-        gcp_client.download_app_configuration(
-            fb_project_id=project_id,
-            app_id=ios_app_id,
-            app_type=ApplicationType.IOS,
-            path=arguments.get("ios_config_path"),
+            logging.warning(
+                "Found %s errors in the project configuration, no API call was made",
+                len(errors),
+            )
+            sys.exit(1)
+
+    state_file = arguments.get("state_file")
+    state_store = StateStore(state_file) if state_file else None
+
+    try:
+        if arguments.get("mode") == "plan":
+            run_plan(arguments, state_store)
+            return
+
+        if arguments.get("mode") == "serve":
+            run_serve(arguments, state_store)
+            return
+
+        if arguments.get("mode") == "teardown":
+            results = run_teardown(arguments, state_store)
+            sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
+
+        if arguments.get("mode") == "export":
+            results = run_export(arguments)
+            sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
+
+        if arguments.get("manifest"):
+            if int(arguments.get("processes") or 1) > 1:
+                results = run_sharded(arguments)
+            else:
+                results = run_batch(arguments, state_store)
+
+            sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
+
+        gcp_client = create_gcp_client(arguments, arguments.get("auth"))
+
+        pipeline = (
+            fetch_project_configs
+            if arguments.get("mode") == "fetch-config"
+            else provision_project
         )
+
+        try:
+            with gcp_client.instrumentation.step(
+                arguments.get("gcp_project_id"), pipeline.__name__
+            ):
+                pipeline(gcp_client, arguments, state_store)
+
+            logging.info(
+                "HTTP connection statistics: %s", gcp_client.connection_stats()
+            )
+            write_metrics(gcp_client, arguments)
+        finally:
+            gcp_client.close()
+    finally:
+        if state_store:
+            state_store.close()
+
+        if log_listener:
+            log_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
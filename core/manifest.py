@@ -0,0 +1,551 @@
+import json
+import re
+import zlib
+
+from .common import ApplicationType
+
+# Validation rules of the project configuration, enforcing the rules described by
+# ARGUMENTS and the keys of the configuration file - keys: argument names;
+# values: (compiled pattern, description of the rule)
+CONFIGURATION_RULES = dict(
+    gcp_project_id=(
+        re.compile(r"[a-z][a-z0-9-]{4,28}[a-z0-9]"),
+        "6 to 30 lowercase ASCII letters, digits or hyphens, starting with a letter "
+        "and not ending with a hyphen",
+    ),
+    gcp_project_name=(
+        re.compile(r"[a-zA-Z0-9'\" !-]{4,30}"),
+        "4 to 30 letters, numbers, hyphens, single-quotes, double-quotes, spaces or "
+        "exclamation points",
+    ),
+    android_package=(
+        re.compile(r"[a-zA-Z][a-zA-Z0-9_]*(\.[a-zA-Z][a-zA-Z0-9_]*)+"),
+        "at least two dot-separated segments of letters, digits or underscores, "
+        "each starting with a letter",
+    ),
+    ios_bundle_id=(
+        re.compile(r"[a-zA-Z0-9-]+(\.[a-zA-Z0-9-]+)*"),
+        "dot-separated segments of letters, digits or hyphens",
+    ),
+    app_store_id=(re.compile(r"[0-9]+"), "digits only"),
+    parent=(
+        re.compile(r"(folders|organizations)/[0-9]+"),
+        "folders/<folder ID> or organizations/<organization ID>",
+    ),
+    default_location=(
+        re.compile(r"[a-z][a-z0-9-]*[a-z0-9]"),
+        "a location ID of lowercase letters, digits or hyphens, e.g. us-central",
+    ),
+)
+
+# Validation rules of the labels of a project - (rule of the keys, rule of the values)
+LABEL_RULES = (
+    (
+        re.compile(r"[a-z][a-z0-9_-]{0,62}"),
+        "1 to 63 lowercase letters, digits, underscores or hyphens, starting with "
+        "a letter",
+    ),
+    (
+        re.compile(r"[a-z0-9_-]{0,63}"),
+        "up to 63 lowercase letters, digits, underscores or hyphens",
+    ),
+)
+
+# Validation rule of the SHA certificate fingerprints of the Android applications
+SHA_CERTIFICATE_RULE = (
+    re.compile(r"([0-9a-fA-F]{2}:?){19}(([0-9a-fA-F]{2}:?){12})?[0-9a-fA-F]{2}"),
+    "a SHA-1 or SHA-256 fingerprint of 40 or 64 hexadecimal digits, optionally "
+    "colon-separated",
+)
+
+# Keys of the project configuration holding objects which are merged, rather than
+# replaced, when inherited from the defaults and templates of a manifest
+MERGED_KEYS = ("labels", "tags")
+
+# Validation rules of the applications listed within the android_apps and ios_apps
+# lists - keys: list names; values: (key of the package name, rules of the keys)
+APP_LIST_RULES = dict(
+    android_apps=("package", dict(package=CONFIGURATION_RULES["android_package"])),
+    ios_apps=(
+        "bundle_id",
+        dict(
+            bundle_id=CONFIGURATION_RULES["ios_bundle_id"],
+            app_store_id=CONFIGURATION_RULES["app_store_id"],
+        ),
+    ),
+)
+
+
+def app_step(app, prefix):
+    """
+    Builds name of a state store step associated with a single application.
+
+    :param app: Application as returned by collect_apps
+    :type app: dict
+    :param prefix: Prefix of the step (app, config)
+    :type prefix: str
+    :return: Name of the step, e.g. app:android:com.test.app
+    :rtype: str
+    """
+
+    return f"{prefix}:{app['app_type'].name.lower()}:{app['package_name']}"
+
+
+def certificate_step(app, sha_hash):
+    """
+    Builds name of a state store step adding a single SHA certificate to an
+    Android application.
+
+    :param app: Application as returned by collect_apps
+    :type app: dict
+    :param sha_hash: SHA-1 or SHA-256 certificate fingerprint
+    :type sha_hash: str
+    :return: Name of the step, e.g. sha:android:com.test.app:AB:CD:...:EF
+    :rtype: str
+    """
+
+    return f"{app_step(app, 'sha')}:{sha_hash}"
+
+
+def merge_configurations(*configurations):
+    """
+    Merges project configurations, the later ones taking precedence. Objects
+    under MERGED_KEYS (labels, tags) are merged key by key, other values are
+    replaced.
+
+    :param configurations: Project configurations (argument: value)
+    :type configurations: dict
+    :return: Merged project configuration
+    :rtype: dict
+    """
+
+    merged = {}
+
+    for configuration in configurations:
+        for key, value in configuration.items():
+            if key in MERGED_KEYS and isinstance(merged.get(key), dict):
+                merged[key] = {**merged[key], **(value or {})}
+            else:
+                merged[key] = value
+
+    return merged
+
+
+def resolve_templates(document):
+    """
+    Resolves entries of a templated manifest - a JSON object with the entries
+    under "projects", optional "defaults" applied to all of them, and optional
+    named "templates" applied to the entries referencing them by "template".
+    A template can extend another one by "extends". Each entry is the merge of
+    the defaults, its template chain (the most basic template first) and its
+    own keys.
+
+    :param document: Templated manifest
+    :type document: dict
+    :return: Manifest entries (each having the keys of a configuration file)
+    :rtype: list
+    :raises ValueError: If a template is unknown or extends itself
+    """
+
+    defaults = document.get("defaults") or {}
+    templates = document.get("templates") or {}
+    resolved = {}
+
+    def resolve(name, chain=()):
+        if name in chain:
+            raise ValueError(
+                f"template {name!r} extends itself: {' -> '.join(chain + (name,))}"
+            )
+
+        if name not in templates:
+            raise ValueError(f"template {name!r} is not defined")
+
+        if name not in resolved:
+            template = dict(templates[name])
+            base = template.pop("extends", None)
+            resolved[name] = merge_configurations(
+                resolve(base, chain + (name,)) if base else {}, template
+            )
+
+        return resolved[name]
+
+    entries = []
+
+    for entry in document.get("projects") or []:
+        if not isinstance(entry, dict):
+            entries.append(entry)
+            continue
+
+        entry = dict(entry)
+        template = entry.pop("template", None)
+
+        entries.append(
+            merge_configurations(defaults, resolve(template) if template else {}, entry)
+        )
+
+    return entries
+
+
+def load_manifest(manifest_file):
+    """
+    Loads entries of a manifest describing multiple projects. The manifest is
+    either a JSON list of configuration objects, a templated manifest (see
+    resolve_templates) or a JSON Lines file with a single configuration object
+    per line.
+
+    :param manifest_file: Path to the manifest file
+    :type manifest_file: str
+    :return: Manifest entries (each having the keys of a configuration file)
+    :rtype: list
+    :raises ValueError: If the manifest is malformed or a template is invalid
+    """
+
+    with open(manifest_file) as f:
+        content = f.read()
+
+    try:
+        entries = json.loads(content)
+    except json.JSONDecodeError:
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    if isinstance(entries, dict) and "projects" in entries:
+        return resolve_templates(entries)
+
+    return entries if isinstance(entries, list) else [entries]
+
+
+def _rule_errors(values, rules):
+    """
+    Checks the values against the validation rules.
+
+    :param values: Values to be checked (key: value)
+    :type values: dict
+    :param rules: Validation rules (key: (compiled pattern, description of the rule))
+    :type rules: dict
+    :return: Messages describing the violated rules
+    :rtype: list
+    """
+
+    errors = []
+
+    for key, (pattern, description) in rules.items():
+        value = values.get(key)
+
+        if value is None:
+            continue
+
+        # Store IDs are numeric, so they are accepted as JSON numbers as well
+        if isinstance(value, int) and not isinstance(value, bool):
+            value = str(value)
+
+        if not isinstance(value, str) or not pattern.fullmatch(value):
+            errors.append(f"{key} {value!r} is invalid, expected {description}")
+
+    return errors
+
+
+def _certificate_errors(key, certificates):
+    """
+    Checks a list of SHA certificate fingerprints.
+
+    :param key: Key of the list, used in the messages
+    :type key: str
+    :param certificates: SHA certificate fingerprints
+    :type certificates: list
+    :return: Messages describing the violated rules
+    :rtype: list
+    """
+
+    if certificates is None:
+        return []
+
+    if not isinstance(certificates, list):
+        return [f"{key} must be a list"]
+
+    pattern, description = SHA_CERTIFICATE_RULE
+
+    return [
+        f"{key}[{i}] {certificate!r} is invalid, expected {description}"
+        for i, certificate in enumerate(certificates)
+        if not isinstance(certificate, str) or not pattern.fullmatch(certificate)
+    ]
+
+
+def validate_entry(entry):
+    """
+    Validates the configuration of a single project against the rules described
+    by the command line arguments.
+
+    :param entry: Project configuration (argument: value)
+    :type entry: dict
+    :return: Messages describing the violated rules
+    :rtype: list
+    """
+
+    if not isinstance(entry, dict):
+        return [f"expected a configuration object, got {type(entry).__name__}"]
+
+    errors = []
+
+    if not entry.get("gcp_project_id"):
+        errors.append("gcp_project_id is missing")
+
+    errors.extend(_rule_errors(entry, CONFIGURATION_RULES))
+
+    if not entry.get("ios_bundle_id") and any(
+        entry.get(a) for a in ("ios_app_name", "app_store_id", "ios_config_path")
+    ):
+        errors.append(
+            "ios_bundle_id is missing, but ios_app_name, app_store_id or "
+            "ios_config_path is specified"
+        )
+
+    for key in MERGED_KEYS:
+        values = entry.get(key)
+
+        if values is not None and not (
+            isinstance(values, dict)
+            and all(isinstance(v, str) for v in values.values())
+        ):
+            errors.append(f"{key} must be an object of strings")
+        elif key == "labels" and values:
+            (key_pattern, key_rule), (value_pattern, value_rule) = LABEL_RULES
+
+            for name, value in values.items():
+                if not key_pattern.fullmatch(name):
+                    errors.append(f"label {name!r} is invalid, expected {key_rule}")
+                elif not value_pattern.fullmatch(value):
+                    errors.append(
+                        f"value {value!r} of the label {name!r} is invalid, "
+                        f"expected {value_rule}"
+                    )
+
+    errors.extend(
+        _certificate_errors(
+            "android_sha_certificates", entry.get("android_sha_certificates")
+        )
+    )
+
+    for list_name, (package_key, rules) in APP_LIST_RULES.items():
+        apps = entry.get(list_name)
+
+        if apps is None:
+            continue
+
+        if not isinstance(apps, list):
+            errors.append(f"{list_name} must be a list")
+            continue
+
+        for i, app in enumerate(apps):
+            if not isinstance(app, dict):
+                errors.append(f"{list_name}[{i}] must be an object")
+            elif not app.get(package_key):
+                errors.append(f"{list_name}[{i}].{package_key} is missing")
+            else:
+                errors.extend(
+                    f"{list_name}[{i}].{error}" for error in _rule_errors(app, rules)
+                )
+                errors.extend(
+                    f"{list_name}[{i}].{error}"
+                    for error in _certificate_errors(
+                        "sha_certificates", app.get("sha_certificates")
+                    )
+                )
+
+    return errors
+
+
+def validate_manifest(entries):
+    """
+    Validates all the entries of a manifest in a single pass - each of them
+    against the rules described by the command line arguments, and all of them
+    against each other, as GCP project IDs and package names (per platform) must
+    not repeat across the entries. All the errors are reported at once.
+
+    :param entries: Manifest entries (each having the keys of a configuration file)
+    :type entries: list
+    :return: Messages describing all the errors, each prefixed by the number of
+        the entry (and its project ID)
+    :rtype: list
+    """
+
+    errors = []
+    seen = {}
+
+    def prefix(i, entry):
+        project_id = entry.get("gcp_project_id") if isinstance(entry, dict) else None
+        return f"Entry {i + 1}" + (f" ({project_id})" if project_id else "")
+
+    for i, entry in enumerate(entries):
+        entry_errors = validate_entry(entry)
+        errors.extend(f"{prefix(i, entry)}: {error}" for error in entry_errors)
+
+        if not isinstance(entry, dict):
+            continue
+
+        keys = [("gcp_project_id", entry.get("gcp_project_id"))]
+
+        try:
+            keys.extend(
+                (f"{app['app_type'].name.lower()} package", app["package_name"])
+                for app in collect_apps(entry)
+            )
+        except (AttributeError, TypeError):
+            # Malformed application lists have already been reported
+            pass
+
+        for key in keys:
+            if not isinstance(key[1], str) or not key[1]:
+                continue
+
+            if key in seen:
+                errors.append(
+                    f"{prefix(i, entry)}: {key[0]} {key[1]!r} is already used by "
+                    f"entry {seen[key] + 1}"
+                )
+            else:
+                seen[key] = i
+
+    return errors
+
+
+def collect_apps(arguments):
+    """
+    Collects all the applications to be added to a single project. Besides
+    the single Android/iOS application described by the top-level arguments,
+    any number of applications per platform (e.g. flavors such as prod, staging
+    and dev) can be listed within the android_apps and ios_apps lists, e.g.
+    {"package": "com.app.dev", "app_name": "Dev", "config_path": "dev/",
+    "sha_certificates": [...]} or
+    {"bundle_id": "com.app.dev", "app_name": "Dev", "app_store_id": "1", ...}.
+
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :return: Applications (app_type, package_name, app_name, store_id, config_path,
+        sha_certificates)
+    :rtype: list
+    """
+
+    apps = []
+
+    android_apps = list(arguments.get("android_apps") or [])
+    ios_apps = list(arguments.get("ios_apps") or [])
+
+    if arguments.get("android_package"):
+        android_apps.insert(
+            0,
+            dict(
+                package=arguments.get("android_package"),
+                app_name=arguments.get("android_app_name"),
+                config_path=arguments.get("android_config_path"),
+                sha_certificates=arguments.get("android_sha_certificates"),
+            ),
+        )
+
+    if arguments.get("ios_bundle_id"):
+        ios_apps.insert(
+            0,
+            dict(
+                bundle_id=arguments.get("ios_bundle_id"),
+                app_name=arguments.get("ios_app_name"),
+                app_store_id=arguments.get("app_store_id"),
+                config_path=arguments.get("ios_config_path"),
+            ),
+        )
+
+    for app in android_apps:
+        apps.append(
+            dict(
+                app_type=ApplicationType.ANDROID,
+                package_name=app.get("package"),
+                app_name=app.get("app_name"),
+                store_id=None,
+                config_path=app.get("config_path"),
+                sha_certificates=list(app.get("sha_certificates") or []),
+            )
+        )
+
+    for app in ios_apps:
+        apps.append(
+            dict(
+                app_type=ApplicationType.IOS,
+                package_name=app.get("bundle_id"),
+                app_name=app.get("app_name"),
+                store_id=app.get("app_store_id"),
+                config_path=app.get("config_path"),
+                sha_certificates=[],
+            )
+        )
+
+    return apps
+
+
+def app_results(apps, app_ids):
+    """
+    Summarizes the applications added to a single project.
+
+    :param apps: Applications as returned by collect_apps
+    :type apps: list
+    :param app_ids: IDs of the created applications, in the same order
+    :type app_ids: list
+    :return: IDs of the first Android and iOS applications (android_app_id,
+        ios_app_id) and a list of all the applications (apps)
+    :rtype: dict
+    """
+
+    result = dict(
+        android_app_id=None,
+        ios_app_id=None,
+        apps=[
+            dict(
+                app_type=app["app_type"].name,
+                package_name=app["package_name"],
+                app_id=i,
+            )
+            for app, i in zip(apps, app_ids)
+        ],
+    )
+
+    for app, app_id in zip(apps, app_ids):
+        key = f"{app['app_type'].name.lower()}_app_id"
+        result[key] = result[key] or app_id
+
+    return result
+
+
+def shard_of(project_id, shard_count):
+    """
+    Determines the shard a project belongs to - the same on every host and in
+    every run, as it is based on a CRC-32 hash of the project ID.
+
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param shard_count: Number of shards
+    :type shard_count: int
+    :return: Index of the shard (starting with 0)
+    :rtype: int
+    """
+
+    return zlib.crc32(project_id.encode("utf-8")) % shard_count
+
+
+def shard_entries(entries, shard_index, shard_count):
+    """
+    Selects the manifest entries belonging to a single shard.
+
+    :param entries: Manifest entries (each having the keys of a configuration file)
+    :type entries: list
+    :param shard_index: Index of the shard (starting with 0)
+    :type shard_index: int
+    :param shard_count: Number of shards
+    :type shard_count: int
+    :return: Entries of the shard, in manifest order
+    :rtype: list
+    """
+
+    if shard_count <= 1:
+        return entries
+
+    return [
+        e for e in entries if shard_of(e["gcp_project_id"], shard_count) == shard_index
+    ]
@@ -0,0 +1,1820 @@
+import contextvars
+import functools
+import io
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .common import (
+    DEFAULT_MAX_WORKERS,
+    ApplicationType,
+    OperationTimeoutError,
+    check_response,
+)
+from .transport import DEFAULT_POOL_MAXSIZE, FIREBASE_BASE_URL, GCP_CRM_BASE_URL
+from .manifest import (
+    app_results,
+    app_step,
+    certificate_step,
+    collect_apps,
+    load_manifest,
+    shard_entries,
+    validate_entry,
+)
+from .state import ResourceIndex, StateStore, file_checksum, write_artifact
+from .steps import (
+    Call,
+    Gather,
+    Sleep,
+    add_app_to_firebase_project,
+    call,
+    resolve_app_id,
+    run_steps,
+    track_operation,
+    wait_for_firebase_project,
+    wait_for_operation,
+)
+
+
+class AsyncGCPClient:
+    """
+    Represents an asyncio counterpart of GCPClient, exposing the same operations
+    as coroutines.
+
+    The steps of the pipelines are shared with the synchronous engine, only the
+    effects they yield are performed differently - HTTP calls are delegated to the
+    pooled session of the wrapped GCPClient and run within a bounded thread pool,
+    while all the waiting (polling) is done with asyncio.sleep, so a single event
+    loop can drive a large number of in-flight project setups. The number of
+    concurrently provisioned projects is bounded by a semaphore and each of the
+    setups can be cancelled as a regular task.
+    """
+
+    def __init__(
+        self,
+        gcp_client,
+        max_concurrency=DEFAULT_MAX_WORKERS,
+        max_http_workers=DEFAULT_POOL_MAXSIZE,
+        state_store=None,
+        resource_index=None,
+    ):
+        """
+        Initializes asynchronous client based on an existing GCP client.
+
+        :param gcp_client: Client whose credentials and HTTP session are used
+        :type gcp_client: GCPClient
+        :param max_concurrency: Maximum number of concurrently provisioned projects
+        :type max_concurrency: int
+        :param max_http_workers: Maximum number of concurrently executed HTTP calls
+        :type max_http_workers: int
+        :param state_store: State store making the pipelines resumable (optional)
+        :type state_store: StateStore
+        :param resource_index: Index of the already existing resources (optional)
+        :type resource_index: ResourceIndex
+        """
+
+        self.gcp_client = gcp_client
+        self.state_store = state_store
+        self.resource_index = resource_index or ResourceIndex()
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_http_workers)
+        self._semaphore = None
+
+    async def _call(self, func, *args, **kwargs):
+        """
+        Runs a blocking GCP client call within the HTTP thread pool.
+
+        :param func: Blocking callable to be run
+        :type func: callable
+        :return: Result of the callable
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        # The call runs within a copy of the current context, so its measurements
+        # are attributed to the currently executed pipeline step
+        return await loop.run_in_executor(
+            self._executor,
+            contextvars.copy_context().run,
+            functools.partial(func, *args, **kwargs),
+        )
+
+    async def _perform(self, effect):
+        """
+        Performs a single effect yielded by a step without blocking the event loop.
+        Concurrent steps run as separate tasks, each within a copy of the current
+        context.
+
+        :param effect: Effect yielded by a step
+        :type effect: Call, Sleep or Gather
+        :return: Result of the effect
+        """
+
+        import asyncio
+
+        if isinstance(effect, Call):
+            return await self._call(effect.func, *effect.args, **effect.kwargs)
+
+        if isinstance(effect, Sleep):
+            if effect.backoff.expired:
+                raise OperationTimeoutError(
+                    f"Timed out waiting for {effect.description}"
+                )
+
+            return await asyncio.sleep(effect.backoff.next_delay())
+
+        return list(await asyncio.gather(*(self._run(s) for s in effect.steps)))
+
+    async def _run(self, steps):
+        """
+        Runs a step generator as a coroutine. See steps.drive for details.
+
+        :param steps: Step generator
+        :type steps: generator
+        :return: Result of the step
+        """
+
+        send, value = steps.send, None
+
+        while True:
+            try:
+                effect = send(value)
+            except StopIteration as stop:
+                return stop.value
+
+            try:
+                send, value = steps.send, await self._perform(effect)
+            except BaseException as err:
+                send, value = steps.throw, err
+
+    async def create_gcp_project(
+        self, gcp_project_id, project_name=None, parent=None, labels=None, tags=None
+    ):
+        """
+        Creates a new Google Cloud Platform project.
+        See GCPClient.create_gcp_project for details.
+
+        :param gcp_project_id: Google Cloud Platform project ID
+        :type gcp_project_id: str
+        :param project_name: Google Cloud Platform project name (optional)
+        :type project_name: str
+        :param parent: Parent folder or organization, e.g. folders/123 (optional)
+        :type parent: str
+        :param labels: Labels of the project (optional)
+        :type labels: dict
+        :param tags: Tags bound to the project (optional)
+        :type tags: dict
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        return await self._call(
+            self.gcp_client.create_gcp_project,
+            gcp_project_id=gcp_project_id,
+            project_name=project_name,
+            parent=parent,
+            labels=labels,
+            tags=tags,
+        )
+
+    async def finalize_default_location(self, fb_project_id, location_id):
+        """
+        Sets the default resource location of a Firebase project.
+        See GCPClient.finalize_default_location for details.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param location_id: Location ID, e.g. us-central
+        :type location_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        return await self._call(
+            self.gcp_client.finalize_default_location,
+            fb_project_id=fb_project_id,
+            location_id=location_id,
+        )
+
+    async def add_firebase_to_gcp_project(self, gcp_project_id):
+        """
+        Adds Firebase functionality to an existing Google Cloud Platform project.
+        See GCPClient.add_firebase_to_gcp_project for details.
+
+        :param gcp_project_id: Google Cloud Platform project ID
+        :type gcp_project_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        return await self._call(
+            self.gcp_client.add_firebase_to_gcp_project,
+            gcp_project_id=gcp_project_id,
+        )
+
+    async def add_app_to_firebase_project(
+        self,
+        fb_project_id,
+        package_name,
+        app_name=None,
+        store_id=None,
+        app_type=ApplicationType.ANDROID,
+        wait_until_active=True,
+    ):
+        """
+        Adds an Android/iOS application to an existing Firebase project without
+        blocking the event loop while waiting for the project / application.
+        See GCPClient.add_app_to_firebase_project for details.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :param app_name: Name of the Android/iOS application (optional)
+        :type app_name: str
+        :param store_id: ID of the App Store (optional)
+        :type store_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param wait_until_active: Whether to wait for the Firebase project to become
+            ACTIVE first
+        :type wait_until_active: bool
+        :return: Application ID
+        :rtype: str
+        """
+
+        return await self._run(
+            add_app_to_firebase_project(
+                self.gcp_client,
+                fb_project_id,
+                package_name,
+                app_name,
+                store_id,
+                app_type,
+                wait_until_active,
+            )
+        )
+
+    async def _resolve_app_id(self, response, fb_project_id, app_type, package_name):
+        """
+        Resolves ID of a created application, as a coroutine.
+        See GCPClient._resolve_app_id for details.
+
+        :param response: HTTP Response object returned by the create API call
+        :type response: requests.Response
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :return: Application ID
+        :rtype: str
+        """
+
+        return await self._run(
+            resolve_app_id(
+                self.gcp_client, response, fb_project_id, app_type, package_name
+            )
+        )
+
+    async def wait_for_operation(self, response, base_url):
+        """
+        Waits until the long-running operation returned by an API call is done.
+        See GCPClient.wait_for_operation for details.
+
+        :param response: HTTP Response object returned by the API call
+        :type response: requests.Response
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: Result of the operation, or None if there is no operation to wait for
+        :rtype: dict
+        """
+
+        return await self._run(wait_for_operation(self.gcp_client, response, base_url))
+
+    async def track_operation(self, operation, base_url):
+        """
+        Waits (without blocking the event loop) until a single operation is done.
+        See OperationTracker.wait for details.
+
+        :param operation: Operation returned by an API call
+        :type operation: dict
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: Response of the operation (e.g. the created resource)
+        :rtype: dict
+        """
+
+        return await self._run(
+            track_operation(self.gcp_client.operation_tracker, operation, base_url)
+        )
+
+    async def wait_for_firebase_project(self, fb_project_id):
+        """
+        Waits (without blocking the event loop) until the Firebase project with
+        the specified ID is completely set-up.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        """
+
+        await self._run(wait_for_firebase_project(self.gcp_client, fb_project_id))
+
+    async def download_app_configuration(
+        self,
+        fb_project_id,
+        app_id,
+        app_type=ApplicationType.ANDROID,
+        path=None,
+    ):
+        """
+        Downloads locally configuration file for Android/iOS application.
+        See GCPClient.download_app_configuration for details.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param path: Path marking where the configuration file will be downloaded
+        :type path: str
+        :return: Path of the saved configuration file
+        :rtype: str
+        """
+
+        return await self._call(
+            self.gcp_client.download_app_configuration,
+            fb_project_id=fb_project_id,
+            app_id=app_id,
+            app_type=app_type,
+            path=path,
+        )
+
+    async def run_operation_step(self, project_id, step, base_url, start, exists=False):
+        """
+        Runs a single step of a project pipeline which starts a long-running
+        operation, and waits for the operation, as a coroutine.
+        See run_operation_step for details.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        :param base_url: Base URL of the API which starts the operation
+        :type base_url: str
+        :param start: Callable starting the operation and returning the HTTP Response
+        :type start: callable
+        :param exists: Whether the resource created by the step is known to exist
+        :type exists: bool
+        """
+
+        await self._run(
+            operation_step(
+                self.gcp_client,
+                self.state_store,
+                project_id,
+                step,
+                base_url,
+                start,
+                exists,
+            )
+        )
+
+    async def provision_app(self, project_id, app):
+        """
+        Adds a single Android/iOS application to an ACTIVE Firebase project and
+        downloads its configuration artifact, as a coroutine.
+        See provision_app for details.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param app: Application as returned by collect_apps
+        :type app: dict
+        :return: Application ID
+        :rtype: str
+        """
+
+        return await self._run(
+            app_steps(
+                self.gcp_client, project_id, app, self.state_store, self.resource_index
+            )
+        )
+
+    async def provision_project(self, arguments):
+        """
+        Performs the automated workflow for a single project described by the
+        provided arguments, as a coroutine. See provision_project for details.
+
+        :param arguments: Project configuration (argument: value)
+        :type arguments: dict
+        :return: IDs of the created applications (android_app_id, ios_app_id, apps)
+        :rtype: dict
+        """
+
+        return await self._run(
+            project_steps(
+                self.gcp_client, arguments, self.state_store, self.resource_index
+            )
+        )
+
+    async def run_entry(self, entry):
+        """
+        Provisions a single manifest entry once a concurrency slot is free and
+        captures the outcome instead of propagating errors.
+
+        :param entry: Project configuration (argument: value)
+        :type entry: dict
+        :return: Result of the project pipeline
+        :rtype: dict
+        """
+
+        import asyncio
+
+        project_id = entry.get("gcp_project_id")
+        result = dict(gcp_project_id=project_id, status="succeeded", error=None)
+
+        async with self._semaphore:
+            started = time.monotonic()
+
+            try:
+                with self.gcp_client.instrumentation.step(
+                    project_id, "provision_project"
+                ):
+                    result.update(await self.provision_project(entry))
+            except asyncio.CancelledError:
+                logging.warning(
+                    "Provisioning of the project %s was cancelled", project_id
+                )
+                raise
+            except Exception as err:
+                logging.exception(
+                    "Provisioning of the project %s has failed", project_id
+                )
+                result.update(status="failed", error=repr(err))
+
+            result["duration_seconds"] = round(time.monotonic() - started, 3)
+
+        return result
+
+    async def run(self, entries):
+        """
+        Provisions all the manifest entries concurrently, with at most
+        max_concurrency projects being provisioned at the same time.
+
+        :param entries: Manifest entries (each having the keys of a configuration file)
+        :type entries: list
+        :return: Results of all the project pipelines, in manifest order
+        :rtype: list
+        """
+
+        import asyncio
+
+        # Created here, so it is bound to the running event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        logging.info(
+            "Provisioning %s projects with up to %s concurrent asyncio pipelines ...",
+            len(entries),
+            self.max_concurrency,
+        )
+
+        return await asyncio.gather(*(self.run_entry(e) for e in entries))
+
+    def close(self):
+        """
+        Shuts down the HTTP thread pool of the asynchronous client.
+        """
+
+        self._executor.shutdown(wait=False)
+
+
+def operation_step(
+    gcp_client,
+    state_store,
+    project_id,
+    step,
+    base_url,
+    start,
+    exists=False,
+):
+    """
+    Runs a single step of a project pipeline which starts a long-running
+    operation, and waits for the operation. If a state store is used, completed
+    steps are skipped and in-flight operations of an interrupted run are resumed
+    instead of being started again. A step whose resource already exists (409)
+    is completed as well, any other failure is raised, so the step stays pending.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param step: Name of the step
+    :type step: str
+    :param base_url: Base URL of the API which starts the operation
+    :type base_url: str
+    :param start: Callable starting the operation and returning the HTTP Response
+    :type start: callable
+    :param exists: Whether the resource created by the step is known to exist
+    :type exists: bool
+    """
+
+    record = state_store.get(project_id, step) if state_store else None
+
+    if record and record["status"] == StateStore.COMPLETED:
+        logging.info("Skipping completed step %s of the project %s", step, project_id)
+        return
+
+    if exists:
+        logging.info(
+            "Skipping step %s of the project %s, already exists", step, project_id
+        )
+
+        if state_store:
+            state_store.complete(project_id, step, operation=None)
+
+        return
+
+    operation_name = record["data"].get("operation") if record else None
+
+    with gcp_client.instrumentation.step(project_id, step):
+        if operation_name:
+            logging.info(
+                "Resuming operation %s of the project %s", operation_name, project_id
+            )
+            yield from track_operation(
+                gcp_client.operation_tracker, {"name": operation_name}, base_url
+            )
+        else:
+            response = check_response(
+                (yield call(start)),
+                f"Step {step} of the project {project_id}",
+                accepted=(409,),
+            )
+
+            if response.ok:
+                operation = response.json()
+                operation_name = operation.get("name")
+
+                if state_store:
+                    state_store.start(project_id, step, operation=operation_name)
+
+                yield from track_operation(
+                    gcp_client.operation_tracker, operation, base_url
+                )
+            else:
+                logging.info(
+                    "Skipping step %s of the project %s, already exists",
+                    step,
+                    project_id,
+                )
+
+    if state_store:
+        state_store.complete(project_id, step, operation=operation_name)
+
+
+def run_operation_step(
+    gcp_client,
+    state_store,
+    project_id,
+    step,
+    base_url,
+    start,
+    exists=False,
+):
+    """
+    Runs a single step of a project pipeline which starts a long-running
+    operation, and waits for the operation. See operation_step for details.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param step: Name of the step
+    :type step: str
+    :param base_url: Base URL of the API which starts the operation
+    :type base_url: str
+    :param start: Callable starting the operation and returning the HTTP Response
+    :type start: callable
+    :param exists: Whether the resource created by the step is known to exist
+    :type exists: bool
+    """
+
+    run_steps(
+        operation_step(
+            gcp_client, state_store, project_id, step, base_url, start, exists
+        )
+    )
+
+
+def app_steps(gcp_client, project_id, app, state_store=None, resource_index=None):
+    """
+    Adds a single Android/iOS application to an ACTIVE Firebase project and
+    downloads its configuration artifact. If a state store is used, an already
+    created application is reused and an unchanged artifact is not downloaded
+    again.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param app: Application as returned by collect_apps
+    :type app: dict
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources (optional)
+    :type resource_index: ResourceIndex
+    :return: Application ID
+    :rtype: str
+    """
+
+    created = (
+        state_store.completed(project_id, app_step(app, "app")) if state_store else None
+    )
+    existing = resource_index.app_id(project_id, app) if resource_index else None
+
+    if created or existing:
+        app_id = created["app_id"] if created else existing
+        logging.info("Reusing the previously created application %s", app_id)
+    else:
+        # Steps 3 and 5: Configure an Android/iOS app in the Firebase project
+        app_id = yield from add_app_to_firebase_project(
+            gcp_client,
+            fb_project_id=project_id,
+            package_name=app["package_name"],
+            app_name=app["app_name"],
+            store_id=app["store_id"],
+            app_type=app["app_type"],
+            wait_until_active=False,
+        )
+
+        if state_store:
+            state_store.complete(project_id, app_step(app, "app"), app_id=app_id)
+
+    downloaded = (
+        state_store.completed(project_id, app_step(app, "config"))
+        if state_store
+        else None
+    )
+
+    if downloaded and file_checksum(downloaded["path"]) == downloaded["sha256"]:
+        logging.info("Configuration artifact %s is up to date", downloaded["path"])
+        return app_id
+
+    # Steps 4 and 6: Download the Android/iOS app configuration and store it locally
+    with gcp_client.instrumentation.step(project_id, "download_config"):
+        file_path = yield call(
+            gcp_client.download_app_configuration,
+            fb_project_id=project_id,
+            app_id=app_id,
+            app_type=app["app_type"],
+            path=app["config_path"],
+        )
+
+    if state_store:
+        state_store.complete(
+            project_id,
+            app_step(app, "config"),
+            path=file_path,
+            sha256=file_checksum(file_path),
+        )
+
+    return app_id
+
+
+def provision_app(gcp_client, project_id, app, state_store=None, resource_index=None):
+    """
+    Adds a single Android/iOS application to an ACTIVE Firebase project and
+    downloads its configuration artifact. See app_steps for details.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param app: Application as returned by collect_apps
+    :type app: dict
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources (optional)
+    :type resource_index: ResourceIndex
+    :return: Application ID
+    :rtype: str
+    """
+
+    return run_steps(
+        app_steps(gcp_client, project_id, app, state_store, resource_index)
+    )
+
+
+def certificate_steps(gcp_client, project_id, apps, app_ids, state_store=None):
+    """
+    Adds the SHA certificate fingerprints of all the Android applications of a
+    single project. Each fingerprint is a step of its own, so a rerun adds only
+    the missing ones, and fingerprints which an application already has (409)
+    are skipped. Fingerprints are added one by one, paced by the rate limiter
+    of the client, as they all count against the same mutation quota.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param apps: Applications as returned by collect_apps
+    :type apps: list
+    :param app_ids: IDs of the applications, in the same order
+    :type app_ids: list
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    """
+
+    certificates = [
+        (certificate_step(app, sha_hash), app_id, sha_hash)
+        for app, app_id in zip(apps, app_ids)
+        for sha_hash in app["sha_certificates"]
+    ]
+    pending = [
+        certificate
+        for certificate in certificates
+        if not (state_store and state_store.completed(project_id, certificate[0]))
+    ]
+
+    if not pending:
+        if certificates:
+            logging.info(
+                "Skipping completed step add_sha_certificates of the project %s",
+                project_id,
+            )
+        return
+
+    with gcp_client.instrumentation.step(project_id, "add_sha_certificates"):
+        for step, app_id, sha_hash in pending:
+            response = check_response(
+                (
+                    yield call(
+                        gcp_client.add_sha_certificate, project_id, app_id, sha_hash
+                    )
+                ),
+                f"Adding of the certificate {sha_hash} to application {app_id}",
+                accepted=(409,),
+            )
+
+            if response.status_code == 409:
+                logging.info(
+                    "Application %s already has the certificate %s", app_id, sha_hash
+                )
+
+            if state_store:
+                state_store.complete(project_id, step, app_id=app_id)
+
+
+def add_sha_certificates(gcp_client, project_id, apps, app_ids, state_store=None):
+    """
+    Adds the SHA certificate fingerprints of all the Android applications of a
+    single project. See certificate_steps for details.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param apps: Applications as returned by collect_apps
+    :type apps: list
+    :param app_ids: IDs of the applications, in the same order
+    :type app_ids: list
+    :param state_store: State store of the run (optional)
+    :type state_store: StateStore
+    """
+
+    run_steps(certificate_steps(gcp_client, project_id, apps, app_ids, state_store))
+
+
+def project_steps(gcp_client, arguments, state_store=None, resource_index=None):
+    """
+    Performs the automated workflow for a single project described by the
+    provided arguments (the same keys accepted through command line arguments
+    or an external configuration file). Parent, labels and tags are set when
+    the GCP project is created. Once the Firebase project is ACTIVE, all of its
+    Android and iOS applications are added concurrently, along with finalizing
+    of the default location, and SHA certificates of the Android applications
+    are added once all of them exist.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :param state_store: State store making the workflow resumable (optional)
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources, used for
+        skipping of their creation (optional)
+    :type resource_index: ResourceIndex
+    :return: IDs of the created applications (android_app_id, ios_app_id, apps)
+    :rtype: dict
+    """
+
+    project_id = arguments.get("gcp_project_id")
+    apps = collect_apps(arguments)
+    index = resource_index or ResourceIndex()
+
+    # Step 1: Create a GCP project
+    yield from operation_step(
+        gcp_client,
+        state_store,
+        project_id,
+        "create_project",
+        gcp_client.crm_base_url,
+        lambda: gcp_client.create_gcp_project(
+            gcp_project_id=project_id,
+            project_name=arguments.get("gcp_project_name"),
+            parent=arguments.get("parent"),
+            labels=arguments.get("labels"),
+            tags=arguments.get("tags"),
+        ),
+        exists=index.has_gcp_project(project_id),
+    )
+
+    # Step 2: Add Firebase to the created GCP project
+    yield from operation_step(
+        gcp_client,
+        state_store,
+        project_id,
+        "add_firebase",
+        gcp_client.firebase_base_url,
+        lambda: gcp_client.add_firebase_to_gcp_project(gcp_project_id=project_id),
+        exists=index.has_firebase_project(project_id),
+    )
+
+    # A single check that the Firebase project is ACTIVE is shared by all the apps
+    with gcp_client.instrumentation.step(project_id, "wait_for_active"):
+        yield from wait_for_firebase_project(gcp_client, project_id)
+
+    # Steps 3-6: Configure the apps and download their configuration concurrently,
+    # as registrations of the apps are independent of each other. Each app runs
+    # within a copy of the current context, so its steps belong to the project span.
+    # The default location is finalized concurrently with the apps.
+    steps = [
+        app_steps(gcp_client, project_id, app, state_store, resource_index)
+        for app in apps
+    ]
+    location_id = arguments.get("default_location")
+
+    if location_id:
+        steps.append(
+            operation_step(
+                gcp_client,
+                state_store,
+                project_id,
+                "finalize_location",
+                gcp_client.firebase_base_url,
+                lambda: gcp_client.finalize_default_location(project_id, location_id),
+                index.has_default_location(project_id),
+            )
+        )
+
+    app_ids = (yield Gather(steps))[: len(apps)]
+
+    yield from certificate_steps(gcp_client, project_id, apps, app_ids, state_store)
+
+    return app_results(apps, app_ids)
+
+
+def provision_project(gcp_client, arguments, state_store=None, resource_index=None):
+    """
+    Performs the automated workflow for a single project described by the
+    provided arguments. See project_steps for details.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :param state_store: State store making the workflow resumable (optional)
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources, used for
+        skipping of their creation (optional)
+    :type resource_index: ResourceIndex
+    :return: IDs of the created applications (android_app_id, ios_app_id, apps)
+    :rtype: dict
+    """
+
+    return run_steps(project_steps(gcp_client, arguments, state_store, resource_index))
+
+
+class BatchRunner:
+    """
+    Represents a runner which provisions multiple projects concurrently.
+    All the project pipelines share a single GCPClient (and its credentials),
+    while the number of concurrently executed pipelines is bounded.
+    """
+
+    def __init__(
+        self,
+        gcp_client,
+        max_workers=DEFAULT_MAX_WORKERS,
+        state_store=None,
+        resource_index=None,
+        pipeline=None,
+    ):
+        """
+        Initializes batch runner with a shared GCP client and a size of the
+        worker pool.
+
+        :param gcp_client: Client shared by all the project pipelines
+        :type gcp_client: GCPClient
+        :param max_workers: Maximum number of concurrently executed pipelines
+        :type max_workers: int
+        :param state_store: State store making the pipelines resumable (optional)
+        :type state_store: StateStore
+        :param resource_index: Index of the already existing resources (optional)
+        :type resource_index: ResourceIndex
+        :param pipeline: Pipeline executed for each project, with the signature of
+            provision_project (defaults to provision_project)
+        :type pipeline: callable
+        """
+
+        self.gcp_client = gcp_client
+        self.max_workers = max_workers
+        self.state_store = state_store
+        self.resource_index = resource_index
+        self.pipeline = pipeline or provision_project
+
+    def run_entry(self, entry):
+        """
+        Provisions a single manifest entry and captures the outcome instead of
+        propagating errors, so a failed project does not affect the others.
+
+        :param entry: Project configuration (argument: value)
+        :type entry: dict
+        :return: Result of the project pipeline
+        :rtype: dict
+        """
+
+        project_id = entry.get("gcp_project_id")
+        result = dict(gcp_project_id=project_id, status="succeeded", error=None)
+        started = time.monotonic()
+
+        try:
+            with self.gcp_client.instrumentation.step(
+                project_id, self.pipeline.__name__
+            ):
+                result.update(
+                    self.pipeline(
+                        self.gcp_client,
+                        entry,
+                        self.state_store,
+                        self.resource_index,
+                    )
+                )
+        except Exception as err:
+            logging.exception("Provisioning of the project %s has failed", project_id)
+            result.update(status="failed", error=repr(err))
+
+        result["duration_seconds"] = round(time.monotonic() - started, 3)
+
+        return result
+
+    def run(self, entries):
+        """
+        Provisions all the manifest entries with a bounded worker pool.
+
+        :param entries: Manifest entries (each having the keys of a configuration file)
+        :type entries: list
+        :return: Results of all the project pipelines, in manifest order
+        :rtype: list
+        """
+
+        logging.info(
+            "Running %s for %s projects with up to %s concurrent pipelines ...",
+            self.pipeline.__name__,
+            len(entries),
+            self.max_workers,
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.run_entry, entries))
+
+        failed = sum(1 for r in results if r["status"] == "failed")
+
+        logging.info(
+            "Finished %s for %s of %s projects (%s failed)",
+            self.pipeline.__name__,
+            len(results) - failed,
+            len(results),
+            failed,
+        )
+
+        return results
+
+
+class JobServer:
+    """
+    Represents a long-running server executing provisioning jobs - one JSON
+    object per line, having the keys of a configuration file (plus an optional
+    job_id echoed in the result, and an optional mode: provision/fetch-config).
+    Jobs are read from a stream (e.g. the standard input) or accepted on a Unix
+    domain socket, and executed concurrently by a single shared GCP client, so
+    the interpreter, credentials and connection pool stay warm between jobs.
+    The result of each job is written as a single JSON line once it finishes.
+    """
+
+    def __init__(self, gcp_client, max_workers=DEFAULT_MAX_WORKERS, state_store=None):
+        """
+        Initializes job server with a shared GCP client and a size of the worker pool.
+
+        :param gcp_client: Client shared by all the jobs
+        :type gcp_client: GCPClient
+        :param max_workers: Maximum number of concurrently executed jobs
+        :type max_workers: int
+        :param state_store: State store making the jobs resumable (optional)
+        :type state_store: StateStore
+        """
+
+        self.runners = {
+            "provision": BatchRunner(gcp_client, max_workers, state_store),
+            "fetch-config": BatchRunner(
+                gcp_client,
+                max_workers,
+                state_store,
+                pipeline=fetch_project_configs,
+            ),
+        }
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, line, respond):
+        """
+        Parses and validates a single job and submits it for execution. Invalid
+        jobs are answered immediately, without any API call.
+
+        :param line: Job as a line of JSON
+        :type line: str
+        :param respond: Function writing the result of the job
+        :type respond: callable
+        :return: Future of the job result, or None if the job is invalid
+        :rtype: concurrent.futures.Future
+        """
+
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as err:
+            respond(dict(status="invalid", errors=[f"Invalid JSON: {err}"]))
+            return None
+
+        job_id, mode = None, "provision"
+
+        if isinstance(job, dict):
+            job_id = job.pop("job_id", None)
+            mode = job.pop("mode", None) or mode
+
+        errors = validate_entry(job)
+        runner = self.runners.get(mode)
+
+        if runner is None:
+            errors.append(
+                f"Unknown mode {mode}, expected one of: {', '.join(self.runners)}"
+            )
+
+        if errors:
+            respond(dict(job_id=job_id, status="invalid", errors=errors))
+            return None
+
+        # The result is written by the job itself, so it is written once the
+        # future is done
+        def execute():
+            respond(dict(job_id=job_id, **runner.run_entry(job)))
+
+        return self.executor.submit(execute)
+
+    def serve_stream(self, input_stream, output_stream):
+        """
+        Executes the jobs read from a stream until its end, writing the results
+        into another stream.
+
+        :param input_stream: Stream of the jobs (one JSON object per line)
+        :type input_stream: io.TextIOBase
+        :param output_stream: Stream of the results (one JSON object per line)
+        :type output_stream: io.TextIOBase
+        """
+
+        lock = threading.Lock()
+
+        def respond(result):
+            with lock:
+                output_stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output_stream.flush()
+
+        # Only the jobs still running are kept, so a long-lived stream (e.g. a
+        # socket connection) does not accumulate the futures of finished jobs
+        pending = set()
+        pending_lock = threading.Lock()
+
+        def finished(future):
+            with pending_lock:
+                pending.discard(future)
+
+        for line in input_stream:
+            future = self.submit(line, respond) if line.strip() else None
+
+            if future:
+                with pending_lock:
+                    pending.add(future)
+
+                future.add_done_callback(finished)
+
+        with pending_lock:
+            remaining = list(pending)
+
+        for future in remaining:
+            future.result()
+
+    def serve_socket(self, socket_path):
+        """
+        Accepts jobs on a Unix domain socket until interrupted. Each connection
+        sends any number of jobs and receives their results, and is closed once
+        the connecting side has stopped sending and all its jobs have finished.
+
+        :param socket_path: Path of the socket
+        :type socket_path: str
+        """
+
+        import socketserver
+
+        job_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                job_server.serve_stream(
+                    io.TextIOWrapper(self.rfile, encoding="utf-8"),
+                    io.TextIOWrapper(self.wfile, encoding="utf-8"),
+                )
+
+        # A socket left behind by a previous (killed) server is replaced
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+            logging.info("Accepting jobs on %s", socket_path)
+
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                logging.info("Server has been interrupted")
+            finally:
+                os.remove(socket_path)
+
+    def close(self):
+        """
+        Waits for the submitted jobs to finish and releases the worker pool.
+        """
+
+        self.executor.shutdown(wait=True)
+
+
+def fetch_project_configs(gcp_client, arguments, state_store=None, resource_index=None):
+    """
+    Downloads configuration artifacts of the already existing Android and iOS
+    applications of a single project (steps 4 and 6 only), concurrently. The
+    applications are described by the same keys as for provisioning.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :param state_store: Not used, accepted for compatibility with provision_project
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources, used instead
+        of listing the applications of the project (optional)
+    :type resource_index: ResourceIndex
+    :return: IDs of the applications (android_app_id, ios_app_id, apps)
+    :rtype: dict
+    """
+
+    project_id = arguments.get("gcp_project_id")
+    apps = collect_apps(arguments)
+
+    def fetch_config(app):
+        app_id = resource_index.app_id(project_id, app) if resource_index else None
+        app_id = app_id or gcp_client._fetch_app_id(
+            project_id, app["app_type"], app["package_name"]
+        )
+
+        if not app_id:
+            raise LookupError(
+                f"Application {app['package_name']} does not exist "
+                f"within the project {project_id}"
+            )
+
+        with gcp_client.instrumentation.step(project_id, "download_config"):
+            gcp_client.download_app_configuration(
+                fb_project_id=project_id,
+                app_id=app_id,
+                app_type=app["app_type"],
+                path=app["config_path"],
+            )
+
+        return app_id
+
+    contexts = [contextvars.copy_context() for _ in apps]
+
+    with ThreadPoolExecutor(max_workers=max(len(apps), 1)) as executor:
+        app_ids = list(
+            executor.map(
+                lambda context, app: context.run(fetch_config, app),
+                contexts,
+                apps,
+            )
+        )
+
+    return app_results(apps, app_ids)
+
+
+def teardown_project(gcp_client, arguments, state_store=None, resource_index=None):
+    """
+    Tears down a single project - deletes the whole GCP project or, with the apps
+    teardown scope, removes its Android and iOS applications (those listed by the
+    configuration, or all of them if none is listed) concurrently. Projects and
+    applications which do not exist (anymore) are skipped. Recorded steps of the
+    torn down resources are removed from the state store. A project whose deletion
+    is refused as inaccessible is skipped (with the skipped status), as Cloud
+    Resource Manager refuses the projects the caller may not delete the same way
+    as the missing ones. A failed deletion of the
+    project (or listing of its applications) is raised, while each application
+    which could not be removed is reported and fails the project once the others
+    are done.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :param state_store: State store of the provisioning runs (optional)
+    :type state_store: StateStore
+    :param resource_index: Unused, accepted for the signature of the pipelines
+    :type resource_index: ResourceIndex
+    :return: Outcome of the teardown (deleted, or removed_apps and failed_apps,
+        along with the skipped status if the project is inaccessible, or the
+        failed status if any of the applications was not removed)
+    :rtype: dict
+    """
+
+    project_id = arguments.get("gcp_project_id")
+
+    if (arguments.get("teardown_scope") or "project") == "project":
+        with gcp_client.instrumentation.step(project_id, "delete_project"):
+            response = gcp_client.delete_gcp_project(project_id)
+
+            # Missing (or already deleted) projects are reported as inaccessible,
+            # but so are the projects the caller lacks the permission to delete
+            if response is not None and response.status_code in (403, 404):
+                logging.info(
+                    "Project %s does not exist or is not accessible, skipping",
+                    project_id,
+                )
+                return dict(
+                    deleted=False,
+                    status="skipped",
+                    error=f"Project is missing or not accessible "
+                    f"({response.status_code})",
+                )
+
+            check_response(response, f"Deletion of the project {project_id}")
+            gcp_client.wait_for_operation(response, gcp_client.crm_base_url)
+
+        if state_store:
+            state_store.forget(project_id)
+
+        return dict(deleted=True)
+
+    listed = {(a["app_type"], a["package_name"]) for a in collect_apps(arguments)}
+    apps = [
+        dict(
+            app_type=app_type,
+            package_name=app.get("packageName") or app.get("bundleId"),
+            app_id=app["appId"],
+        )
+        for app_type in ApplicationType
+        for app in gcp_client.list_apps(project_id, app_type, raise_on_error=True)
+    ]
+    apps = [
+        a for a in apps if not listed or (a["app_type"], a["package_name"]) in listed
+    ]
+
+    def remove(app):
+        result = dict(
+            app_type=app["app_type"].name,
+            package_name=app["package_name"],
+            app_id=app["app_id"],
+            error=None,
+        )
+
+        try:
+            with gcp_client.instrumentation.step(project_id, "remove_app"):
+                response = gcp_client.remove_app(
+                    project_id, app["app_id"], app["app_type"]
+                )
+                check_response(response, f"Removal of the application {app['app_id']}")
+                gcp_client.wait_for_operation(response, gcp_client.firebase_base_url)
+        except Exception as err:
+            logging.exception(
+                "Removal of the application %s of the project %s has failed",
+                app["app_id"],
+                project_id,
+            )
+            result["error"] = repr(err)
+            return result
+
+        if state_store:
+            state_store.forget(
+                project_id, [app_step(app, "app"), app_step(app, "config")]
+            )
+
+        return result
+
+    contexts = [contextvars.copy_context() for _ in apps]
+
+    with ThreadPoolExecutor(max_workers=max(len(apps), 1)) as executor:
+        results = list(
+            executor.map(
+                lambda context, app: context.run(remove, app),
+                contexts,
+                apps,
+            )
+        )
+
+    outcome = dict(
+        removed_apps=[r for r in results if r["error"] is None],
+        failed_apps=[r for r in results if r["error"] is not None],
+    )
+
+    if outcome["failed_apps"]:
+        outcome.update(
+            status="failed",
+            error=f"{len(outcome['failed_apps'])} of {len(results)} applications "
+            f"could not be removed",
+        )
+
+    return outcome
+
+
+def teardown_targets(gcp_client, arguments):
+    """
+    Determines the projects to be torn down - those of the manifest (or of its
+    shard), --projects or the project configuration, or else the active GCP
+    projects matching the --project_prefix and --project_labels filters.
+
+    :param gcp_client: Client used for the search of the projects
+    :type gcp_client: GCPClient
+    :param arguments: Parsed arguments and options (argument: value)
+    :type arguments: dict
+    :return: Configurations of the projects (each having at least gcp_project_id)
+    :rtype: list
+    """
+
+    if arguments.get("manifest"):
+        return shard_entries(
+            load_manifest(arguments["manifest"]),
+            int(arguments.get("shard_index") or 0),
+            int(arguments.get("shard_count") or 1),
+        )
+
+    if arguments.get("projects"):
+        return [
+            dict(gcp_project_id=p.strip())
+            for p in arguments["projects"].split(",")
+            if p.strip()
+        ]
+
+    if arguments.get("gcp_project_id"):
+        return [arguments]
+
+    prefix = arguments.get("project_prefix") or ""
+    labels = dict(
+        label.strip().split("=", 1)
+        for label in (arguments.get("project_labels") or "").split(",")
+        if label.strip()
+    )
+
+    if not prefix and not labels:
+        raise ValueError(
+            "Projects to be torn down must be specified by a manifest, --projects, "
+            "--gcp_project_id, --project_prefix or --project_labels"
+        )
+
+    query = " ".join(
+        ["state:ACTIVE"]
+        + ([f"id:{prefix}*"] if prefix else [])
+        + [f"labels.{key}:{value}" for key, value in labels.items()]
+    )
+
+    # Results of the search are verified, so a loosely matching query never
+    # causes deletion of an unrelated project
+    return [
+        dict(gcp_project_id=p["projectId"])
+        for p in gcp_client.search_gcp_projects(query)
+        if p["projectId"].startswith(prefix)
+        and all(p.get("labels", {}).get(k) == v for k, v in labels.items())
+    ]
+
+
+def plan_project(
+    arguments,
+    crm_base_url=GCP_CRM_BASE_URL,
+    firebase_base_url=FIREBASE_BASE_URL,
+    state_store=None,
+    resource_index=None,
+):
+    """
+    Plans the automated workflow for a single project without sending any
+    request - its steps, the step each of them waits for, and the API calls each
+    of them sends. Steps completed according to the state store, or creating
+    resources known to exist, are marked as skipped.
+
+    :param arguments: Project configuration (argument: value)
+    :type arguments: dict
+    :param crm_base_url: Base URL of the Cloud Resource Manager API
+    :type crm_base_url: str
+    :param firebase_base_url: Base URL of the Firebase Management API
+    :type firebase_base_url: str
+    :param state_store: State store of the previous runs (optional)
+    :type state_store: StateStore
+    :param resource_index: Index of the already existing resources (optional)
+    :type resource_index: ResourceIndex
+    :return: Planned steps (step, depends_on, calls, skipped), where each call is
+        a tuple (call name, HTTP method, URL, whether it is polled)
+    :rtype: list
+    """
+
+    project_id = arguments.get("gcp_project_id")
+    index = resource_index or ResourceIndex()
+
+    def skipped(step, exists):
+        record = state_store.get(project_id, step) if state_store else None
+
+        if record and record["status"] == StateStore.COMPLETED:
+            return "completed"
+
+        return "exists" if exists else None
+
+    fb_project_url = f"{firebase_base_url}/projects/{project_id}"
+
+    steps = [
+        dict(
+            step="create_project",
+            depends_on=None,
+            calls=[
+                ("crm.projects.create", "POST", f"{crm_base_url}/projects", False),
+                ("operations.get", "GET", f"{crm_base_url}/{{operation}}", True),
+            ],
+            skipped=skipped("create_project", index.has_gcp_project(project_id)),
+        ),
+        dict(
+            step="add_firebase",
+            depends_on="create_project",
+            calls=[
+                (
+                    "firebase.projects.addFirebase",
+                    "POST",
+                    f"{fb_project_url}:addFirebase",
+                    False,
+                ),
+                ("operations.get", "GET", f"{firebase_base_url}/{{operation}}", True),
+            ],
+            skipped=skipped("add_firebase", index.has_firebase_project(project_id)),
+        ),
+        dict(
+            step="wait_for_active",
+            depends_on="add_firebase",
+            calls=[("firebase.projects.get", "GET", fb_project_url, True)],
+            skipped=None,
+        ),
+    ]
+
+    if arguments.get("default_location"):
+        steps.append(
+            dict(
+                step="finalize_location",
+                depends_on="wait_for_active",
+                calls=[
+                    (
+                        "firebase.defaultLocation.finalize",
+                        "POST",
+                        f"{fb_project_url}/defaultLocation:finalize",
+                        False,
+                    ),
+                    (
+                        "operations.get",
+                        "GET",
+                        f"{firebase_base_url}/{{operation}}",
+                        True,
+                    ),
+                ],
+                skipped=skipped(
+                    "finalize_location", index.has_default_location(project_id)
+                ),
+            )
+        )
+
+    apps = collect_apps(arguments)
+
+    # Applications are added concurrently, once the Firebase project is ACTIVE
+    for app in apps:
+        url_part = f"{app['app_type'].name.lower()}Apps"
+        create_step = app_step(app, "app")
+
+        steps.append(
+            dict(
+                step=create_step,
+                depends_on="wait_for_active",
+                calls=[
+                    (
+                        f"firebase.{url_part}.create",
+                        "POST",
+                        f"{fb_project_url}/{url_part}",
+                        False,
+                    ),
+                    (
+                        "operations.get",
+                        "GET",
+                        f"{firebase_base_url}/{{operation}}",
+                        True,
+                    ),
+                ],
+                skipped=skipped(create_step, index.app_id(project_id, app)),
+            )
+        )
+
+        config_step = app_step(app, "config")
+        downloaded = (
+            state_store.completed(project_id, config_step) if state_store else None
+        )
+
+        steps.append(
+            dict(
+                step=config_step,
+                depends_on=create_step,
+                calls=[
+                    (
+                        f"firebase.{url_part}.getConfig",
+                        "GET",
+                        f"{fb_project_url}/{url_part}/{{app_id}}/config",
+                        False,
+                    )
+                ],
+                skipped=(
+                    "up to date"
+                    if downloaded
+                    and file_checksum(downloaded["path"]) == downloaded["sha256"]
+                    else None
+                ),
+            )
+        )
+
+    # SHA certificates of all the Android applications are added by a single step
+    certified = [app for app in apps if app["sha_certificates"]]
+    added = all(
+        skipped(certificate_step(app, sha_hash), False)
+        for app in certified
+        for sha_hash in app["sha_certificates"]
+    )
+
+    if certified:
+        steps.append(
+            dict(
+                step="add_sha_certificates",
+                depends_on=", ".join(app_step(app, "app") for app in certified),
+                calls=[
+                    (
+                        "firebase.androidApps.sha.create",
+                        "POST",
+                        f"{fb_project_url}/androidApps/{{app_id}}/sha",
+                        False,
+                    )
+                    for app in certified
+                    for _ in app["sha_certificates"]
+                ],
+                skipped="completed" if added else None,
+            )
+        )
+
+    return steps
+
+
+def print_plan(project_id, steps):
+    """
+    Prints a planned workflow of a single project as a call graph.
+
+    :param project_id: GCP/Firebase project ID
+    :type project_id: str
+    :param steps: Planned steps as returned by plan_project
+    :type steps: list
+    """
+
+    executed = [s for s in steps if not s["skipped"]]
+
+    print(
+        f"Project {project_id}: {len(executed)} of {len(steps)} steps, "
+        f"{sum(len(s['calls']) for s in executed)} API calls"
+    )
+
+    for step in steps:
+        depends_on = f" (after {step['depends_on']})" if step["depends_on"] else ""
+        skipped = f" - skipped, {step['skipped']}" if step["skipped"] else ""
+
+        print(f"  {step['step']}{depends_on}{skipped}")
+
+        if step["skipped"]:
+            continue
+
+        for name, method, url, polled in step["calls"]:
+            print(f"    {method} {url} [{name}{', polled' if polled else ''}]")
+
+
+def export_app_configurations(
+    gcp_client,
+    project_ids,
+    export_path,
+    max_workers=DEFAULT_MAX_WORKERS,
+):
+    """
+    Exports configuration artifacts of all the Android and iOS applications within
+    the Firebase projects - into a directory tree (<project ID>/<android|ios>/
+    <package name or bundle ID>/<app ID>/<file name>) or, if the path ends with
+    .zip, into a single archive of the same structure. The app ID (with colons
+    replaced by underscores) keeps apart the applications sharing a package name
+    or bundle ID. Applications of all the projects are listed and their artifacts
+    downloaded concurrently, with a bounded worker pool.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param project_ids: Firebase project IDs
+    :type project_ids: list
+    :param export_path: Path of the export directory or .zip archive
+    :type export_path: str
+    :param max_workers: Maximum number of concurrent API calls
+    :type max_workers: int
+    :return: Result of each exported application (project_id, app_type,
+        package_name, app_id, path, status, error)
+    :rtype: list
+    """
+
+    archive = export_path.endswith(".zip")
+    listed_apps = []
+    results = []
+
+    logging.info(
+        "Exporting configuration artifacts of %s projects to %s ...",
+        len(project_ids),
+        export_path,
+    )
+
+    def list_apps(project_id, app_type):
+        key = "packageName" if app_type == ApplicationType.ANDROID else "bundleId"
+
+        return [
+            (project_id, app_type, app.get("appId"), app.get(key))
+            for app in gcp_client.list_apps(project_id, app_type, raise_on_error=True)
+        ]
+
+    def fetch_config(project_id, app_type, app_id, package_name):
+        filename, content = gcp_client.fetch_app_configuration(
+            project_id, app_id, app_type
+        )
+
+        return (
+            f"{project_id}/{app_type.name.lower()}/{package_name}/"
+            f"{app_id.replace(':', '_')}/{filename}",
+            content,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Applications of both platforms of all the projects are listed first
+        futures = {
+            executor.submit(list_apps, project_id, app_type): (project_id, app_type)
+            for project_id in project_ids
+            for app_type in ApplicationType
+        }
+
+        for future in as_completed(futures):
+            project_id, app_type = futures[future]
+
+            try:
+                listed_apps.extend(future.result())
+            except Exception as err:
+                logging.error(
+                    "Listing of %s applications within the project %s has failed",
+                    app_type.name.lower(),
+                    project_id,
+                    exc_info=err,
+                )
+                results.append(
+                    dict(
+                        project_id=project_id,
+                        app_type=app_type.name,
+                        package_name=None,
+                        app_id=None,
+                        path=None,
+                        status="failed",
+                        error=repr(err),
+                    )
+                )
+
+        futures = {executor.submit(fetch_config, *app): app for app in listed_apps}
+
+        # The archive is written into a temporary file which then replaces the
+        # target, so a failed export never leaves a partial archive behind
+        temp_path = f"{export_path}.{os.getpid()}.tmp"
+        zip_file = (
+            zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) if archive else None
+        )
+
+        try:
+            # Artifacts are saved by a single thread, as they get downloaded
+            for future in as_completed(futures):
+                project_id, app_type, app_id, package_name = futures[future]
+                result = dict(
+                    project_id=project_id,
+                    app_type=app_type.name,
+                    package_name=package_name,
+                    app_id=app_id,
+                    path=None,
+                    status="succeeded",
+                    error=None,
+                )
+
+                try:
+                    path, content = future.result()
+
+                    if archive:
+                        zip_file.writestr(path, content)
+                    else:
+                        path = os.path.join(export_path, *path.split("/"))
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        write_artifact(path, content)
+
+                    result["path"] = path
+                except Exception as err:
+                    logging.error(
+                        "Export of the configuration artifact of application %s "
+                        "has failed",
+                        app_id,
+                        exc_info=err,
+                    )
+                    result.update(status="failed", error=repr(err))
+
+                results.append(result)
+        except BaseException:
+            if archive:
+                zip_file.close()
+                os.remove(temp_path)
+
+            raise
+
+        if archive:
+            zip_file.close()
+            os.replace(temp_path, export_path)
+
+    failed = sum(1 for r in results if r["status"] == "failed")
+
+    logging.info(
+        "Exported %s of %s configuration artifacts (%s failed) to %s",
+        len(results) - failed,
+        len(results),
+        failed,
+        export_path,
+    )
+
+    return results
+
+
+def write_report(results, report_file, items_key="projects"):
+    """
+    Saves results of the project pipelines locally as a JSON report.
+
+    :param results: Results of the project pipelines
+    :type results: list
+    :param report_file: Path of the report file
+    :type report_file: str
+    :param items_key: Key of the results within the report
+    :type items_key: str
+    """
+
+    failed = sum(1 for r in results if r["status"] == "failed")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+
+    report = {
+        "total": len(results),
+        "succeeded": len(results) - failed - skipped,
+        "failed": failed,
+        "skipped": skipped,
+        items_key: results,
+    }
+
+    with open(report_file, "w", encoding="utf-8") as outfile:
+        json.dump(report, outfile, ensure_ascii=False, indent=4)
+
+    logging.info("Batch report saved as %s", report_file)
@@ -0,0 +1,496 @@
+import logging
+import random
+import threading
+import time
+
+from .common import OperationTimeoutError
+
+# Default polling of long-running operations and resources being set-up - initial
+# and maximum delay between two checks, growth factor of the delay (all in seconds)
+# and overall deadline of the waiting
+DEFAULT_POLL_INITIAL_DELAY = 0.5
+DEFAULT_POLL_MAX_DELAY = 10.0
+DEFAULT_POLL_MULTIPLIER = 2.0
+DEFAULT_POLL_DEADLINE = 600.0
+
+# Default retry policy of API calls - maximum number of attempts, initial and maximum
+# delay between two attempts and overall time budget of a single API call (in seconds)
+DEFAULT_RETRY_MAX_ATTEMPTS = 8
+DEFAULT_RETRY_INITIAL_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 32.0
+DEFAULT_RETRY_BUDGET = 120.0
+
+# Default client-side rate limits (requests per minute) per API family and method
+# class, kept below the per-minute quotas of the Cloud Resource Manager and Firebase
+# Management APIs - mutations (create, add, remove) and reads (get, list, polling)
+DEFAULT_RATE_LIMITS = {
+    "crm.mutation": 60,
+    "crm.read": 600,
+    "firebase.mutation": 60,
+    "firebase.read": 600,
+}
+
+# Adaptive rate limiting - factor by which the rate is lowered after a 429 response,
+# and a share of the configured rate recovered after each successful response
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+RATE_LIMIT_RECOVERY_SHARE = 0.01
+
+# HTTP methods which can be safely repeated
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Transient status codes - rate limiting and server-side errors
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Status codes which are expected to be transient right after creation of a resource,
+# until the resource (or its permissions) propagates - e.g. Firebase project right
+# after creation of the GCP project
+EVENTUAL_CONSISTENCY_STATUS_CODES = {403, 404}
+
+
+class Backoff:
+    """
+    Represents a capped exponential backoff with jitter, used for polling of
+    long-running operations and resources being set-up, limited by an overall
+    deadline.
+    """
+
+    def __init__(
+        self,
+        initial_delay=DEFAULT_POLL_INITIAL_DELAY,
+        max_delay=DEFAULT_POLL_MAX_DELAY,
+        multiplier=DEFAULT_POLL_MULTIPLIER,
+        deadline=DEFAULT_POLL_DEADLINE,
+    ):
+        """
+        Initializes backoff and starts measuring time against its deadline.
+
+        :param initial_delay: Delay before the second check (in seconds)
+        :type initial_delay: float
+        :param max_delay: Maximum delay between two checks (in seconds)
+        :type max_delay: float
+        :param multiplier: Growth factor of the delay
+        :type multiplier: float
+        :param deadline: Overall deadline (in seconds), None for no deadline
+        :type deadline: float
+        """
+
+        self._delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.deadline_at = time.monotonic() + deadline if deadline else None
+
+    @property
+    def expired(self):
+        """
+        Whether the overall deadline of the backoff has passed.
+
+        :rtype: bool
+        """
+
+        return self.deadline_at is not None and time.monotonic() >= self.deadline_at
+
+    def next_delay(self):
+        """
+        Calculates delay before the next check and grows the delay for the
+        following one. Half of the delay is randomized (jitter), so checks of
+        resources created at the same time get spread out.
+
+        :return: Delay before the next check (in seconds)
+        :rtype: float
+        """
+
+        delay = min(self._delay, self.max_delay)
+        self._delay = delay * self.multiplier
+        delay = delay / 2 + random.uniform(0, delay / 2)
+
+        if self.deadline_at is not None:
+            delay = max(min(delay, self.deadline_at - time.monotonic()), 0)
+
+        return delay
+
+    def sleep(self, description):
+        """
+        Blocks until the next check, unless the overall deadline has passed.
+
+        :param description: Description of the awaited resource (for errors)
+        :type description: str
+        """
+
+        if self.expired:
+            raise OperationTimeoutError(f"Timed out waiting for {description}")
+
+        time.sleep(self.next_delay())
+
+
+class RetryPolicy:
+    """
+    Represents a retry policy of API calls. Only transient failures are retried
+    (rate limiting, server-side errors and connection errors), optionally with
+    the additional status codes expected right after creation of a resource.
+    Non-idempotent requests (POST) are retried only when the server has surely
+    not processed them. Delays grow exponentially with full jitter, honor the
+    Retry-After header and are limited by an overall time budget.
+    """
+
+    def __init__(
+        self,
+        max_attempts=DEFAULT_RETRY_MAX_ATTEMPTS,
+        initial_delay=DEFAULT_RETRY_INITIAL_DELAY,
+        max_delay=DEFAULT_RETRY_MAX_DELAY,
+        budget=DEFAULT_RETRY_BUDGET,
+        extra_status_codes=(),
+    ):
+        """
+        Initializes retry policy.
+
+        :param max_attempts: Maximum number of attempts (including the first one)
+        :type max_attempts: int
+        :param initial_delay: Base delay before the first retry (in seconds)
+        :type initial_delay: float
+        :param max_delay: Maximum delay between two attempts (in seconds)
+        :type max_delay: float
+        :param budget: Overall time budget of a single API call (in seconds)
+        :type budget: float
+        :param extra_status_codes: Additional status codes to be retried, e.g.
+            EVENTUAL_CONSISTENCY_STATUS_CODES
+        :type extra_status_codes: iterable
+        """
+
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.extra_status_codes = set(extra_status_codes)
+        self.status_codes = TRANSIENT_STATUS_CODES | self.extra_status_codes
+
+    def with_status_codes(self, extra_status_codes):
+        """
+        Derives a policy which additionally retries the specified status codes.
+
+        :param extra_status_codes: Additional status codes to be retried
+        :type extra_status_codes: iterable
+        :return: Derived retry policy
+        :rtype: RetryPolicy
+        """
+
+        return RetryPolicy(
+            max_attempts=self.max_attempts,
+            initial_delay=self.initial_delay,
+            max_delay=self.max_delay,
+            budget=self.budget,
+            extra_status_codes=self.extra_status_codes | set(extra_status_codes),
+        )
+
+    def is_retryable(self, method, response=None, error=None):
+        """
+        Decides whether a failed attempt of an API call can be retried.
+
+        :param method: HTTP method name
+        :type method: str
+        :param response: HTTP Response of the attempt (if any)
+        :type response: requests.Response
+        :param error: Error raised by the attempt (if any)
+        :type error: Exception
+        :return: True if the attempt can be retried, else False
+        :rtype: bool
+        """
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        if error is not None:
+            # Failures of non-idempotent requests are retried only if the
+            # connection has not even been established, as otherwise the request
+            # may have been processed (e.g. the connection was dropped later on)
+            return idempotent or self.is_connect_error(error)
+
+        if response.status_code not in self.status_codes:
+            return False
+
+        # Rejected (rate limited, unavailable or not yet permitted) requests have
+        # not been processed
+        return (
+            idempotent
+            or response.status_code in (429, 503)
+            or response.status_code in self.extra_status_codes
+        )
+
+    @staticmethod
+    def is_connect_error(error):
+        """
+        Decides whether a request has failed while establishing the connection,
+        i.e. before anything was sent to the server.
+
+        :param error: Error raised by the request
+        :type error: Exception
+        :return: True if the connection has not been established, else False
+        :rtype: bool
+        """
+
+        import requests
+        import urllib3
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+
+        if not isinstance(error, requests.exceptions.ConnectionError):
+            return False
+
+        # Connection failures are wrapped by urllib3, with the original error
+        # as the reason
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+
+        return isinstance(
+            reason,
+            (
+                urllib3.exceptions.NewConnectionError,
+                urllib3.exceptions.ConnectTimeoutError,
+            ),
+        )
+
+    def delay(self, attempt, response=None):
+        """
+        Calculates delay before the next attempt - the one requested by the
+        server through the Retry-After header, else an exponentially growing
+        delay with full jitter.
+
+        :param attempt: Number of the failed attempt (starting with 1)
+        :type attempt: int
+        :param response: HTTP Response of the failed attempt (if any)
+        :type response: requests.Response
+        :return: Delay before the next attempt (in seconds)
+        :rtype: float
+        """
+
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+
+        if retry_after:
+            import email.utils
+
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                pass
+
+            # Older versions of Python return None instead of raising on a date
+            # which cannot be parsed
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                retry_at = None
+
+            if retry_at is not None:
+                return max(retry_at.timestamp() - time.time(), 0)
+
+            logging.warning("Ignoring malformed Retry-After header: %s", retry_after)
+
+        return random.uniform(
+            0, min(self.initial_delay * 2 ** (attempt - 1), self.max_delay)
+        )
+
+
+class TokenBucket:
+    """
+    Represents a thread-safe token bucket limiting the rate of requests. The
+    rate is lowered multiplicatively when the API signals that a quota has been
+    exceeded, and recovered additively with each successful request, so the
+    throughput stays close to the quota ceiling instead of oscillating.
+    """
+
+    def __init__(self, rate, burst_seconds=10.0):
+        """
+        Initializes a full token bucket.
+
+        :param rate: Maximum (and initial) rate of requests per second
+        :type rate: float
+        :param burst_seconds: Size of the bucket, as a number of seconds worth of
+            requests which can be sent at once
+        :type burst_seconds: float
+        """
+
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(rate * burst_seconds, 1.0)
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """
+        Adds the tokens accumulated since the last update (lock must be held).
+        """
+
+        now = time.monotonic()
+        self.tokens = min(
+            self.tokens + (now - self._updated_at) * self.rate, self.capacity
+        )
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Blocks until a token is available and takes it.
+        """
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                if self.tokens >= 1:
+                    self.tokens = self.tokens - 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def penalize(self):
+        """
+        Lowers the rate after the API has signalled an exceeded quota (429) and
+        drops the accumulated burst.
+        """
+
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate * RATE_LIMIT_DECREASE_FACTOR, self.max_rate / 100)
+            self.tokens = min(self.tokens, 0)
+
+    def reward(self):
+        """
+        Recovers a part of the rate after a successful request.
+        """
+
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(
+                    self.rate + self.max_rate * RATE_LIMIT_RECOVERY_SHARE,
+                    self.max_rate,
+                )
+
+
+class RateLimiter:
+    """
+    Represents a client-side rate limiter with a separate token bucket per API
+    family (Cloud Resource Manager, Firebase) and method class (mutations,
+    reads/polls), shared by all the API calls of a client.
+    """
+
+    def __init__(self, api_families, rate_limits=None):
+        """
+        Initializes rate limiter.
+
+        :param api_families: Base URLs of the rate limited APIs, keyed by API
+            family name (crm, firebase)
+        :type api_families: dict
+        :param rate_limits: Rate limits in requests per minute, keyed by API family
+            and method class (e.g. firebase.read), defaults to DEFAULT_RATE_LIMITS
+        :type rate_limits: dict
+        """
+
+        self.api_families = api_families
+        self.buckets = {
+            key: TokenBucket(rate / 60)
+            for key, rate in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+
+    @staticmethod
+    def parse(rate_limits):
+        """
+        Parses rate limits specified through command line.
+
+        :param rate_limits: Rate limits, e.g. "firebase.read=300,crm.mutation=30"
+        :type rate_limits: str
+        :return: Rate limits in requests per minute (e.g. firebase.read: 300)
+        :rtype: dict
+        :raises ValueError: If a rate limit is malformed, of an unknown API family
+            and method class, or not a positive number
+        """
+
+        parsed = {}
+
+        for item in (rate_limits or "").split(","):
+            if not item.strip():
+                continue
+
+            key, separator, value = item.partition("=")
+            key = key.strip()
+
+            if not separator:
+                raise ValueError(f"Expected key=value, got {item.strip()}")
+
+            if key not in DEFAULT_RATE_LIMITS:
+                raise ValueError(
+                    f"Unknown rate limit {key}, expected one of: "
+                    f"{', '.join(DEFAULT_RATE_LIMITS)}"
+                )
+
+            try:
+                parsed[key] = float(value)
+            except ValueError:
+                raise ValueError(
+                    f"Rate limit of {key} is not a number: {value.strip()}"
+                ) from None
+
+            if parsed[key] <= 0:
+                raise ValueError(f"Rate limit of {key} must be positive")
+
+        return parsed
+
+    def _bucket(self, url, method):
+        """
+        Finds the token bucket of an API call.
+
+        :param url: Target URL
+        :type url: str
+        :param method: HTTP method name
+        :type method: str
+        :return: Token bucket of the call, or None if the call is not rate limited
+        :rtype: TokenBucket
+        """
+
+        method_class = "read" if method.upper() in ("GET", "HEAD") else "mutation"
+
+        for family, base_url in self.api_families.items():
+            if url.startswith(base_url):
+                return self.buckets.get(f"{family}.{method_class}")
+
+        return None
+
+    def acquire(self, url, method):
+        """
+        Blocks until the API call can be sent without exceeding its rate limit.
+
+        :param url: Target URL
+        :type url: str
+        :param method: HTTP method name
+        :type method: str
+        """
+
+        bucket = self._bucket(url, method)
+
+        if bucket:
+            bucket.acquire()
+
+    def feedback(self, url, method, response):
+        """
+        Adapts the rate of the API call's bucket according to its response.
+
+        :param url: Target URL
+        :type url: str
+        :param method: HTTP method name
+        :type method: str
+        :param response: HTTP Response of the call
+        :type response: requests.Response
+        """
+
+        bucket = self._bucket(url, method)
+
+        if bucket and response is not None:
+            if response.status_code == 429:
+                logging.warning(
+                    "Quota exceeded, lowering the rate of %s %s", method.upper(), url
+                )
+                bucket.penalize()
+            elif response.ok:
+                bucket.reward()
@@ -0,0 +1,654 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import plistlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import DEFAULT_MAX_WORKERS, ApplicationType
+from .manifest import app_step, collect_apps
+
+# Default time (in seconds) for which a cached configuration artifact is used without
+# checking the remote one, and default size bound of the artifact cache (in bytes)
+DEFAULT_ARTIFACT_CACHE_TTL = 3600.0
+DEFAULT_ARTIFACT_CACHE_MAX_SIZE = 100 * 1024 * 1024
+
+# Maximum number of project IDs searched for by a single discovery query
+DISCOVERY_QUERY_SIZE = 50
+
+# Time (in seconds) for which a write waits for the other processes sharing the
+# state file to release its lock, instead of failing
+STATE_STORE_BUSY_TIMEOUT = 30.0
+
+
+class ResourceIndex:
+    """
+    Represents an in-memory index of already existing resources - GCP projects,
+    Firebase projects and their Android/iOS applications - built by a single
+    discovery phase of calls limited to the projects of a manifest, so that only
+    the missing steps of the manifest get planned and executed.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty resource index.
+        """
+
+        self.gcp_projects = set()
+        self.firebase_projects = set()
+        self.located_projects = set()
+        self.apps = {}
+
+    @classmethod
+    def discover(cls, gcp_client, project_ids, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Discovers the existing resources relevant to the specified projects.
+
+        :param gcp_client: Client used for all the GCP/Firebase API calls
+        :type gcp_client: GCPClient
+        :param project_ids: IDs of the projects to be provisioned
+        :type project_ids: list
+        :param max_workers: Maximum number of concurrently discovered projects
+        :type max_workers: int
+        :return: Index of the existing resources
+        :rtype: ResourceIndex
+        """
+
+        index = cls()
+        wanted = sorted(set(project_ids))
+
+        # Only the projects of the manifest are searched for (a chunk of them per
+        # query), and projects which are not ACTIVE (e.g. DELETE_REQUESTED) are
+        # treated as missing
+        for start in range(0, len(wanted), DISCOVERY_QUERY_SIZE):
+            chunk = wanted[start : start + DISCOVERY_QUERY_SIZE]
+            query = " OR ".join(f"id:{project_id}" for project_id in chunk)
+
+            index.gcp_projects.update(
+                p.get("projectId")
+                for p in gcp_client.search_gcp_projects(query)
+                if p.get("projectId") in chunk and p.get("state") == "ACTIVE"
+            )
+
+        # Firebase projects (and their applications) are fetched only for the
+        # existing GCP projects of the manifest
+        def index_project(project_id):
+            response = gcp_client._fetch_firebase_project(project_id)
+
+            if response is None or not response.ok:
+                return
+
+            fb_project = response.json()
+
+            if fb_project.get("state") != "ACTIVE":
+                return
+
+            index.firebase_projects.add(project_id)
+
+            if fb_project.get("resources", {}).get("locationId"):
+                index.located_projects.add(project_id)
+
+            for app in gcp_client.search_apps(project_id):
+                platform = app.get("platform")
+
+                if platform in ApplicationType.__members__:
+                    key = (project_id, platform, app.get("namespace"))
+                    index.apps[key] = app.get("appId")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(index_project, sorted(index.gcp_projects)))
+
+        logging.info(
+            "Discovered %s GCP projects, %s Firebase projects and %s applications out of %s requested projects",
+            len(index.gcp_projects),
+            len(index.firebase_projects),
+            len(index.apps),
+            len(wanted),
+        )
+
+        return index
+
+    def has_gcp_project(self, project_id):
+        """
+        :param project_id: GCP project ID
+        :type project_id: str
+        :return: Whether the GCP project already exists
+        :rtype: bool
+        """
+
+        return project_id in self.gcp_projects
+
+    def has_firebase_project(self, project_id):
+        """
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :return: Whether Firebase has already been added to the project
+        :rtype: bool
+        """
+
+        return project_id in self.firebase_projects
+
+    def has_default_location(self, project_id):
+        """
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :return: Whether the default location of the project is already finalized
+        :rtype: bool
+        """
+
+        return project_id in self.located_projects
+
+    def app_id(self, project_id, app):
+        """
+        Fetches ID of an already existing application.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param app: Application as returned by collect_apps
+        :type app: dict
+        :return: ID of the already existing application, or None
+        :rtype: str
+        """
+
+        return self.apps.get((project_id, app["app_type"].name, app["package_name"]))
+
+    def plan(self, entries):
+        """
+        Plans the missing creation steps of each of the manifest entries
+        (configuration artifacts are downloaded for all the applications).
+
+        :param entries: Manifest entries (each having the keys of a configuration file)
+        :type entries: list
+        :return: Missing steps per project ID
+        :rtype: dict
+        """
+
+        plan = {}
+
+        for entry in entries:
+            project_id = entry.get("gcp_project_id")
+            steps = []
+
+            if not self.has_gcp_project(project_id):
+                steps.append("create_project")
+
+            if not self.has_firebase_project(project_id):
+                steps.append("add_firebase")
+
+            if entry.get("default_location") and not self.has_default_location(
+                project_id
+            ):
+                steps.append("finalize_location")
+
+            for app in collect_apps(entry):
+                if not self.app_id(project_id, app):
+                    steps.append(app_step(app, "app"))
+
+            plan[project_id] = steps
+
+        return plan
+
+
+class StateStore:
+    """
+    Represents a persistent local store (SQLite file) of the provisioning state,
+    keyed by project ID. It records completed steps, names of the long-running
+    operations, application IDs and configuration artifact checksums, so reruns
+    skip completed steps and resume in-flight operations instead of redoing the
+    work. Safe for concurrent use by multiple project pipelines (threads) and by
+    multiple processes sharing the same file - each write is a single autocommit
+    statement, waiting for the others to finish while the file is locked.
+    """
+
+    # Statuses of a single step of a project pipeline
+    STARTED, COMPLETED = "started", "completed"
+
+    def __init__(self, state_file):
+        """
+        Opens up (and creates, if needed) the state store.
+
+        :param state_file: Path to the SQLite file
+        :type state_file: str
+        """
+
+        self._lock = threading.Lock()
+
+        # Autocommit mode, so each recorded step survives a crash of the run
+        self._connection = sqlite3.connect(
+            state_file,
+            timeout=STATE_STORE_BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                "project_id TEXT NOT NULL, "
+                "step TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "PRIMARY KEY (project_id, step))"
+            )
+
+    def get(self, project_id, step):
+        """
+        Fetches the recorded state of a single step of a project pipeline.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        :return: Status and data of the step, or None if the step is not recorded
+        :rtype: dict
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, data FROM steps WHERE project_id = ? AND step = ?",
+                (project_id, step),
+            ).fetchone()
+
+        return dict(status=row[0], data=json.loads(row[1])) if row else None
+
+    def completed(self, project_id, step):
+        """
+        Fetches data of a step, if the step has already been completed.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        :return: Data of the completed step, or None if the step is not completed
+        :rtype: dict
+        """
+
+        record = self.get(project_id, step)
+
+        return record["data"] if record and record["status"] == self.COMPLETED else None
+
+    def _record(self, project_id, step, status, data):
+        """
+        Records (inserts or replaces) the state of a single step.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        :param status: Status of the step (STARTED, COMPLETED)
+        :type status: str
+        :param data: Data of the step (operation name, application ID, etc.)
+        :type data: dict
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?)",
+                (project_id, step, status, json.dumps(data), time.time()),
+            )
+
+    def start(self, project_id, step, **data):
+        """
+        Records a step as started, e.g. together with its in-flight operation.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        """
+
+        self._record(project_id, step, self.STARTED, data)
+
+    def complete(self, project_id, step, **data):
+        """
+        Records a step as completed, together with its outcome.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param step: Name of the step
+        :type step: str
+        """
+
+        self._record(project_id, step, self.COMPLETED, data)
+
+    def forget(self, project_id, steps=None):
+        """
+        Removes the recorded steps of a project, e.g. once it has been torn down,
+        so a following run provisions it from scratch.
+
+        :param project_id: GCP/Firebase project ID
+        :type project_id: str
+        :param steps: Names of the steps to be removed (defaults to all the steps)
+        :type steps: list
+        """
+
+        with self._lock:
+            if steps is None:
+                self._connection.execute(
+                    "DELETE FROM steps WHERE project_id = ?", (project_id,)
+                )
+            else:
+                self._connection.executemany(
+                    "DELETE FROM steps WHERE project_id = ? AND step = ?",
+                    [(project_id, step) for step in steps],
+                )
+
+    def close(self):
+        """
+        Closes the state store.
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+class ArtifactCache:
+    """
+    Represents a local content-addressed cache of configuration artifacts, keyed
+    by project and application ID. Artifacts fetched within the TTL are served
+    without any API call, older ones are refreshed (conditionally, if the API
+    provides an ETag) and rewritten only when the remote content has changed.
+    The cache is bounded in size - the least recently used artifacts are evicted.
+    Safe for concurrent use by multiple threads and processes.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        ttl=DEFAULT_ARTIFACT_CACHE_TTL,
+        max_size=DEFAULT_ARTIFACT_CACHE_MAX_SIZE,
+    ):
+        """
+        Opens up (and creates, if needed) the artifact cache.
+
+        :param cache_dir: Path to the cache directory
+        :type cache_dir: str
+        :param ttl: Time (in seconds) for which a cached artifact is used without
+            checking the remote one
+        :type ttl: float
+        :param max_size: Maximum total size of the cached artifacts (in bytes)
+        :type max_size: int
+        """
+
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(cache_dir, "index.db"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "project_id TEXT NOT NULL, "
+                "app_id TEXT NOT NULL, "
+                "filename TEXT NOT NULL, "
+                "sha256 TEXT NOT NULL, "
+                "etag TEXT, "
+                "fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (project_id, app_id))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "sha256 TEXT PRIMARY KEY, "
+                "size INTEGER NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+
+    def _object_path(self, sha256):
+        """
+        Builds path of a cached artifact based on its content checksum.
+
+        :param sha256: SHA-256 checksum of the artifact
+        :type sha256: str
+        :return: Path of the cached artifact
+        :rtype: str
+        """
+
+        return os.path.join(self.cache_dir, "objects", sha256[:2], sha256)
+
+    def get(self, project_id, app_id):
+        """
+        Fetches the cached artifact of an application.
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :return: File name, content, ETag and freshness (whether fetched within the
+            TTL) of the artifact, or None if the artifact is not cached
+        :rtype: dict
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT filename, sha256, etag, fetched_at FROM entries "
+                "WHERE project_id = ? AND app_id = ?",
+                (project_id, app_id),
+            ).fetchone()
+
+            if not row:
+                return None
+
+            self._connection.execute(
+                "UPDATE objects SET accessed_at = ? WHERE sha256 = ?",
+                (time.time(), row[1]),
+            )
+
+        try:
+            with open(self._object_path(row[1]), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            # Evicted (e.g. by another process) in the meantime
+            return None
+
+        return dict(
+            filename=row[0],
+            content=content,
+            etag=row[2],
+            fresh=time.time() - row[3] < self.ttl,
+        )
+
+    def put(self, project_id, app_id, filename, content, etag=None):
+        """
+        Caches the artifact of an application, and evicts the least recently used
+        artifacts if the cache exceeds its size.
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param filename: File name of the artifact
+        :type filename: str
+        :param content: Content of the artifact
+        :type content: bytes
+        :param etag: ETag of the artifact provided by the API (optional)
+        :type etag: str
+        """
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(sha256)
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        write_artifact(object_path, content)
+
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?)",
+                (sha256, len(content), now),
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (project_id, app_id, filename, sha256, etag, now),
+            )
+
+        self._evict()
+
+    def touch(self, project_id, app_id):
+        """
+        Marks the cached artifact of an application as fetched right now, i.e.
+        the remote artifact is known to be unchanged.
+
+        :param project_id: Firebase project ID
+        :type project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "UPDATE entries SET fetched_at = ? WHERE project_id = ? AND app_id = ?",
+                (time.time(), project_id, app_id),
+            )
+
+    def _evict(self):
+        """
+        Evicts the least recently used artifacts, until the cache fits its size.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT sha256, size FROM objects ORDER BY accessed_at DESC"
+            ).fetchall()
+
+            total_size = 0
+            evicted = []
+
+            for sha256, size in rows:
+                total_size = total_size + size
+
+                if total_size > self.max_size:
+                    evicted.append(sha256)
+
+            for sha256 in evicted:
+                self._connection.execute(
+                    "DELETE FROM entries WHERE sha256 = ?", (sha256,)
+                )
+                self._connection.execute(
+                    "DELETE FROM objects WHERE sha256 = ?", (sha256,)
+                )
+
+        for sha256 in evicted:
+            logging.debug("Evicting cached configuration artifact %s", sha256)
+
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._object_path(sha256))
+
+    def close(self):
+        """
+        Closes the artifact cache.
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+def file_checksum(file_path):
+    """
+    Calculates SHA-256 checksum of a local file.
+
+    :param file_path: Path of the file
+    :type file_path: str
+    :return: Hexadecimal checksum, or None if the file does not exist
+    :rtype: str
+    """
+
+    if not os.path.exists(file_path):
+        return None
+
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def validate_artifact(content, app_type):
+    """
+    Validates content of a configuration artifact by parsing it, without any
+    re-serialization.
+
+    :param content: Content of the configuration artifact
+    :type content: bytes
+    :param app_type: Type of application (Android, iOS)
+    :type app_type: ApplicationType
+    :raises ValueError: If the content is not a valid JSON (Android) or plist (iOS)
+    """
+
+    try:
+        if app_type == ApplicationType.ANDROID:
+            json.loads(content)
+        else:
+            plistlib.loads(content)
+    except Exception as err:
+        raise ValueError(
+            f"Invalid {app_type.name.lower()} configuration artifact: {err}"
+        ) from err
+
+
+def format_artifact(content, app_type):
+    """
+    Reformats content of a configuration artifact - Android JSON gets indented,
+    iOS plist gets re-serialized.
+
+    :param content: Content of the configuration artifact
+    :type content: bytes
+    :param app_type: Type of application (Android, iOS)
+    :type app_type: ApplicationType
+    :return: Reformatted content
+    :rtype: bytes
+    """
+
+    if app_type == ApplicationType.ANDROID:
+        return json.dumps(json.loads(content), ensure_ascii=False, indent=4).encode(
+            "utf-8"
+        )
+
+    return plistlib.dumps(plistlib.loads(content))
+
+
+def write_artifact(file_path, content):
+    """
+    Saves content of a configuration artifact locally. The file is written only if
+    its content has changed, and replaced atomically, so it is never left partially
+    written.
+
+    :param file_path: Path of the file
+    :type file_path: str
+    :param content: Content of the file
+    :type content: bytes
+    :return: Whether the file has been written
+    :rtype: bool
+    """
+
+    if file_checksum(file_path) == hashlib.sha256(content).hexdigest():
+        return False
+
+    # Unique within the directory of the file (so it can be renamed), and created
+    # with the same permissions as a directly written file
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(temp_path, "xb") as outfile:
+            outfile.write(content)
+
+        os.replace(temp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+
+        raise
+
+    return True
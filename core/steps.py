@@ -0,0 +1,287 @@
+import contextvars
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import ApplicationType, check_response
+
+# Steps of the project pipelines are written once, as generators which yield the
+# effects they need (blocking API calls, waiting between checks, running other
+# steps concurrently) and receive their results. Each of the engines only performs
+# the effects - run_steps with threads and time.sleep, AsyncGCPClient within an
+# asyncio event loop - so both of them execute exactly the same step logic.
+
+# Runs a blocking callable (typically an API call) and sends back its result
+Call = namedtuple("Call", ["func", "args", "kwargs"])
+
+# Waits until the next check of an awaited resource, according to its backoff
+Sleep = namedtuple("Sleep", ["backoff", "description"])
+
+# Runs the steps concurrently and sends back the list of their results
+Gather = namedtuple("Gather", ["steps"])
+
+
+def call(func, *args, **kwargs):
+    """
+    Creates an effect running a blocking callable.
+
+    :param func: Blocking callable to be run
+    :type func: callable
+    :return: Effect to be yielded by a step
+    :rtype: Call
+    """
+
+    return Call(func, args, kwargs)
+
+
+def drive(steps, perform):
+    """
+    Drives a step generator until it is finished, performing each of the yielded
+    effects by the provided function. Errors of the effects are raised within the
+    step, so it can handle them (and its spans record them) as regular errors.
+
+    :param steps: Step generator
+    :type steps: generator
+    :param perform: Function performing a single effect and returning its result
+    :type perform: callable
+    :return: Result of the step
+    """
+
+    send, value = steps.send, None
+
+    while True:
+        try:
+            effect = send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        try:
+            send, value = steps.send, perform(effect)
+        except BaseException as err:
+            send, value = steps.throw, err
+
+
+def perform(effect):
+    """
+    Performs a single effect by blocking the current thread. Concurrent steps run
+    in a thread pool, each within a copy of the current context, so their spans
+    belong to the span of the current step.
+
+    :param effect: Effect yielded by a step
+    :type effect: Call, Sleep or Gather
+    :return: Result of the effect
+    """
+
+    if isinstance(effect, Call):
+        return effect.func(*effect.args, **effect.kwargs)
+
+    if isinstance(effect, Sleep):
+        return effect.backoff.sleep(effect.description)
+
+    if not effect.steps:
+        return []
+
+    contexts = [contextvars.copy_context() for _ in effect.steps]
+
+    with ThreadPoolExecutor(max_workers=len(effect.steps)) as executor:
+        return list(
+            executor.map(
+                lambda context, steps: context.run(run_steps, steps),
+                contexts,
+                effect.steps,
+            )
+        )
+
+
+def run_steps(steps):
+    """
+    Runs a step generator within the current thread.
+
+    :param steps: Step generator
+    :type steps: generator
+    :return: Result of the step
+    """
+
+    return drive(steps, perform)
+
+
+def track_operation(tracker, operation, base_url):
+    """
+    Waits until a single long-running operation is done.
+
+    :param tracker: Tracker whose backoff settings are used
+    :type tracker: OperationTracker
+    :param operation: Operation returned by an API call
+    :type operation: dict
+    :param base_url: Base URL of the API which has started the operation
+    :type base_url: str
+    :return: Response of the operation (e.g. the created resource)
+    :rtype: dict
+    """
+
+    backoff = tracker.backoff()
+    name = operation.get("name")
+
+    while not operation.get("done"):
+        yield Sleep(backoff, f"operation {name}")
+        operation = yield call(tracker._refresh, operation, base_url)
+
+    logging.info("Operation %s is done", name)
+
+    return tracker.result(operation)
+
+
+def wait_for_operation(gcp_client, response, base_url):
+    """
+    Waits until the long-running operation returned by an API call is done.
+    Responses without an operation (e.g. a project which already exists) are
+    only logged, as the following steps check the state of the resources.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param response: HTTP Response object returned by the API call
+    :type response: requests.Response
+    :param base_url: Base URL of the API which has started the operation
+    :type base_url: str
+    :return: Result of the operation, or None if there is no operation to wait for
+    :rtype: dict
+    """
+
+    if response is None or not response.ok:
+        logging.warning(
+            "No operation to wait for, API call has returned: %s",
+            response.text if response is not None else None,
+        )
+        return None
+
+    return (
+        yield from track_operation(
+            gcp_client.operation_tracker, response.json(), base_url
+        )
+    )
+
+
+def wait_for_firebase_project(gcp_client, fb_project_id):
+    """
+    Waits (with capped exponential backoff) until the Firebase project with
+    the specified ID is completely set-up, i.e. until applications can be
+    added to it.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param fb_project_id: Firebase project ID
+    :type fb_project_id: str
+    """
+
+    backoff = gcp_client.operation_tracker.backoff()
+
+    while not (yield call(gcp_client._is_firebase_project_active, fb_project_id)):
+        yield Sleep(backoff, f"Firebase project {fb_project_id} to become ACTIVE")
+
+
+def resolve_app_id(gcp_client, response, fb_project_id, app_type, package_name):
+    """
+    Resolves ID of a created application - from the result of its create
+    operation or, if the application already exists (409), by its package name /
+    bundle ID. Any other failure of the create API call is raised.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param response: HTTP Response object returned by the create API call
+    :type response: requests.Response
+    :param fb_project_id: Firebase project ID
+    :type fb_project_id: str
+    :param app_type: Type of application (Android, iOS)
+    :type app_type: ApplicationType
+    :param package_name: Android package name / iOS bundle ID
+    :type package_name: str
+    :return: Application ID
+    :rtype: str
+    """
+
+    response = check_response(
+        response,
+        f"Creation of the {app_type.name} application {package_name}",
+        accepted=(409,),
+    )
+
+    # The created application (and its ID) is the result of the create operation
+    if response.ok:
+        app = yield from track_operation(
+            gcp_client.operation_tracker, response.json(), gcp_client.firebase_base_url
+        )
+
+        if app.get("appId"):
+            return app["appId"]
+
+    # If the application already exists (or the operation has not returned it),
+    # the ID is looked up by the package name / bundle ID, waiting for the
+    # application to become listed if needed
+    backoff = gcp_client.operation_tracker.backoff()
+    fetch_app_id = call(gcp_client._fetch_app_id, fb_project_id, app_type, package_name)
+    app_id = yield fetch_app_id
+
+    while not app_id:
+        yield Sleep(backoff, f"{app_type.name} application {package_name}")
+        app_id = yield fetch_app_id
+
+    return app_id
+
+
+def add_app_to_firebase_project(
+    gcp_client,
+    fb_project_id,
+    package_name,
+    app_name=None,
+    store_id=None,
+    app_type=ApplicationType.ANDROID,
+    wait_until_active=True,
+):
+    """
+    Adds an Android/iOS application to an existing Firebase project.
+    See GCPClient.add_app_to_firebase_project for details.
+
+    :param gcp_client: Client used for all the GCP/Firebase API calls
+    :type gcp_client: GCPClient
+    :param fb_project_id: Firebase project ID
+    :type fb_project_id: str
+    :param package_name: Android package name / iOS bundle ID
+    :type package_name: str
+    :param app_name: Name of the Android/iOS application (optional)
+    :type app_name: str
+    :param store_id: ID of the App Store (optional)
+    :type store_id: str
+    :param app_type: Type of application (Android, iOS)
+    :type app_type: ApplicationType
+    :param wait_until_active: Whether to wait for the Firebase project to become
+        ACTIVE first (can be skipped if the state was already checked)
+    :type wait_until_active: bool
+    :return: Application ID
+    :rtype: str
+    """
+
+    instrumentation = gcp_client.instrumentation
+
+    # A conditional-waiting mechanism which ensures that the previously
+    # created Firebase project is completely set-up, else applications
+    # cannot be added to it
+    if wait_until_active:
+        with instrumentation.step(fb_project_id, "wait_for_active"):
+            yield from wait_for_firebase_project(gcp_client, fb_project_id)
+
+    with instrumentation.step(fb_project_id, "create_app"):
+        response = yield call(
+            gcp_client._create_app,
+            fb_project_id,
+            package_name,
+            app_name,
+            store_id,
+            app_type,
+        )
+
+    with instrumentation.step(fb_project_id, "wait_for_app"):
+        return (
+            yield from resolve_app_id(
+                gcp_client, response, fb_project_id, app_type, package_name
+            )
+        )
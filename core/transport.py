@@ -0,0 +1,1722 @@
+import base64
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .common import (
+    ApplicationType,
+    OperationError,
+    RedactedHeaders,
+    check_response,
+)
+from .retry import (
+    DEFAULT_POLL_DEADLINE,
+    DEFAULT_POLL_INITIAL_DELAY,
+    DEFAULT_POLL_MAX_DELAY,
+    DEFAULT_POLL_MULTIPLIER,
+    EVENTUAL_CONSISTENCY_STATUS_CODES,
+    Backoff,
+    RateLimiter,
+    RetryPolicy,
+)
+from .instrumentation import Instrumentation
+from .state import format_artifact, validate_artifact, write_artifact
+from .steps import (
+    add_app_to_firebase_project,
+    resolve_app_id,
+    run_steps,
+    track_operation,
+    wait_for_firebase_project,
+    wait_for_operation,
+)
+
+# The HTTP and auth libraries (requests, google-auth, google-auth-oauthlib) are
+# imported lazily by the code paths which need them, see main.py
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where the token cache is not locked
+    fcntl = None
+
+# Base URLs used for each of the GCP/Firebase API calls
+GCP_CRM_BASE_URL = "https://cloudresourcemanager.googleapis.com/v3"
+FIREBASE_BASE_URL = "https://firebase.googleapis.com/v1beta1"
+
+# Path for writing/reading of the GCP access/refresh token info
+TOKEN_PATH = "token.json"
+
+# If modifying these scopes, delete the file token.json.
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+# Access tokens are refreshed this long (in seconds) before they expire, and a failed
+# background refresh is retried after the delay (in seconds)
+DEFAULT_TOKEN_REFRESH_MARGIN = 300.0
+TOKEN_REFRESH_RETRY_DELAY = 30.0
+
+# Default sizes of the HTTP connection pool shared by all the API calls
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 16
+
+# Default timeouts (in seconds) of establishing a connection and of waiting for
+# the response of a single HTTP request
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+
+
+def utcnow():
+    """
+    Fetches the current UTC time, comparable with expiry of the credentials.
+
+    :return: Current UTC time (without timezone info)
+    :rtype: datetime.datetime
+    """
+
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class CredentialManager:
+    """
+    Represents thread-safe credentials shared by all the API calls (and threads)
+    of a run. The access token is refreshed proactively by a background thread
+    before it expires, and on demand by a single thread at a time - the other
+    threads wait for its result instead of refreshing again.
+
+    Supported credentials:
+        * OAuth client secrets - the authorized user logs in once, and the tokens
+          are cached in token.json (written atomically, locked across processes)
+        * Authorized user file
+        * Service account key
+        * Application Default Credentials (if no credentials file is provided)
+    """
+
+    def __init__(
+        self,
+        credentials_file=None,
+        token_path=TOKEN_PATH,
+        scopes=None,
+        refresh_margin=DEFAULT_TOKEN_REFRESH_MARGIN,
+        access_token=None,
+    ):
+        """
+        Initializes credentials based on the provided credentials file.
+
+        :param credentials_file: Path to the credentials JSON file obtained from
+            GCP (optional, Application Default Credentials are used if not provided)
+        :type credentials_file: str
+        :param token_path: Path of the token cache of an OAuth authorized user
+        :type token_path: str
+        :param scopes: OAuth scopes (defaults to SCOPES)
+        :type scopes: list
+        :param refresh_margin: Time before expiry (in seconds) when the access
+            token gets refreshed
+        :type refresh_margin: float
+        :param access_token: Static access token, used instead of any credentials
+            and never refreshed, e.g. with a local API emulator (optional)
+        :type access_token: str
+        """
+
+        self.credentials_file = credentials_file
+        self.token_path = token_path
+        self.scopes = scopes or SCOPES
+        self.refresh_margin = refresh_margin
+
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._refresher = None
+        self._uses_token_cache = False
+
+        if access_token:
+            from google.oauth2.credentials import Credentials
+
+            self.credentials = Credentials(token=access_token)
+        else:
+            self.credentials = self._load()
+
+    def _load(self):
+        """
+        Loads the credentials - based on the type of the credentials file.
+
+        The code is based on the official Google Cloud Platform documentation.
+        Reference: https://developers.google.com/docs/api/quickstart/python
+
+        :return: Loaded credentials
+        :rtype: google.auth.credentials.Credentials
+        """
+
+        import google.auth
+        from google.oauth2 import service_account
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        if not self.credentials_file:
+            logging.info("Using Application Default Credentials")
+            credentials, _ = google.auth.default(scopes=self.scopes)
+            return credentials
+
+        with open(self.credentials_file) as f:
+            info = json.load(f)
+
+        if info.get("type") == "service_account":
+            logging.info("Using service account %s", info.get("client_email"))
+            return service_account.Credentials.from_service_account_info(
+                info, scopes=self.scopes
+            )
+
+        if info.get("type") == "authorized_user":
+            return Credentials.from_authorized_user_info(info, self.scopes)
+
+        # OAuth client secrets - the file token.json stores the user's access and
+        # refresh tokens, and is created automatically when the authorization flow
+        # completes for the first time. The lock makes concurrent processes wait
+        # for a single login instead of each one letting the user log in.
+        self._uses_token_cache = True
+
+        with self._token_cache_lock():
+            credentials = self._read_token_cache()
+
+            if not credentials:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_file,
+                    self.scopes,
+                )
+
+                credentials = flow.run_local_server(port=0)
+
+                # Save the credentials for the next run
+                self._write_token_cache(credentials)
+
+        return credentials
+
+    @contextlib.contextmanager
+    def _token_cache_lock(self):
+        """
+        Locks the token cache exclusively across processes (as a context manager).
+        """
+
+        if fcntl is None:
+            yield
+        else:
+            with open(f"{self.token_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_token_cache(self):
+        """
+        Reads the cached credentials of the authorized user.
+
+        :return: Cached credentials, or None if there are no usable ones
+        :rtype: google.oauth2.credentials.Credentials
+        """
+
+        from google.oauth2.credentials import Credentials
+
+        if not os.path.exists(self.token_path):
+            return None
+
+        credentials = Credentials.from_authorized_user_file(
+            self.token_path, self.scopes
+        )
+
+        # Expired credentials are usable only if they can be refreshed
+        if not credentials.valid and not credentials.refresh_token:
+            return None
+
+        return credentials
+
+    def _write_token_cache(self, credentials):
+        """
+        Caches credentials of the authorized user - atomically, so concurrent
+        readers never see a partially written file.
+
+        :param credentials: Credentials of the authorized user
+        :type credentials: google.oauth2.credentials.Credentials
+        """
+
+        directory = os.path.dirname(os.path.abspath(self.token_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".token-", suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "w") as token:
+                token.write(credentials.to_json())
+
+            os.replace(temp_path, self.token_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _expires_in(self, credentials):
+        """
+        Calculates remaining lifetime of the access token of the credentials.
+
+        :param credentials: Credentials
+        :type credentials: google.auth.credentials.Credentials
+        :return: Remaining lifetime (in seconds), 0 if there is no access token
+            yet, or None if the access token never expires
+        :rtype: float
+        """
+
+        if not credentials.token:
+            return 0
+
+        if credentials.expiry is None:
+            return None
+
+        return (credentials.expiry - utcnow()).total_seconds()
+
+    def _needs_refresh(self, credentials):
+        """
+        Checks whether the access token of the credentials is missing or about to
+        expire.
+
+        :param credentials: Credentials
+        :type credentials: google.auth.credentials.Credentials
+        :return: Whether the access token needs to be refreshed
+        :rtype: bool
+        """
+
+        expires_in = self._expires_in(credentials)
+
+        return expires_in is not None and expires_in <= self.refresh_margin
+
+    @property
+    def token(self):
+        """
+        Fetches a fresh access token - refreshed first if it is about to expire.
+
+        :return: Access token
+        :rtype: str
+        """
+
+        if self._needs_refresh(self.credentials):
+            self.refresh()
+
+        return self.credentials.token
+
+    def refresh(self, stale_token=None):
+        """
+        Refreshes the access token, unless it has already been refreshed by
+        another thread (or, when using the token cache, by another process).
+
+        :param stale_token: Access token rejected by the API (optional) - the
+            token is refreshed only if it is still the current one
+        :type stale_token: str
+        """
+
+        with self._lock:
+            if stale_token is not None:
+                if self.credentials.token != stale_token:
+                    return
+            elif not self._needs_refresh(self.credentials):
+                return
+
+            if not self._uses_token_cache:
+                self._refresh()
+                return
+
+            with self._token_cache_lock():
+                cached = self._read_token_cache()
+
+                if (
+                    cached
+                    and cached.token != stale_token
+                    and not self._needs_refresh(cached)
+                ):
+                    logging.info("Using the access token refreshed by another process")
+                    self.credentials = cached
+                    return
+
+                self._refresh()
+                self._write_token_cache(self.credentials)
+
+    def _refresh(self):
+        """
+        Obtains a new access token.
+        """
+
+        from google.auth.transport.requests import Request
+
+        logging.info("Refreshing the access token ...")
+        self.credentials.refresh(Request())
+
+    def _refresh_periodically(self):
+        """
+        Refreshes the access token shortly before it expires, until closed.
+        """
+
+        while not self._closed.is_set():
+            expires_in = self._expires_in(self.credentials)
+
+            if expires_in is None:
+                return
+
+            # At least a second between two checks, even for very short-lived tokens
+            delay = max(expires_in - self.refresh_margin, 1.0)
+
+            if self._closed.wait(delay):
+                return
+
+            try:
+                self.refresh()
+            except Exception as err:
+                logging.warning(
+                    "Refreshing of the access token has failed (%s), retrying in %ss",
+                    err,
+                    TOKEN_REFRESH_RETRY_DELAY,
+                )
+
+                if self._closed.wait(TOKEN_REFRESH_RETRY_DELAY):
+                    return
+
+    def start(self):
+        """
+        Starts refreshing the access token proactively in the background.
+        """
+
+        if self._refresher is None:
+            self._refresher = threading.Thread(
+                target=self._refresh_periodically,
+                name="credential-refresher",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def close(self):
+        """
+        Stops the background refreshing of the access token.
+        """
+
+        self._closed.set()
+
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+
+class GCPClient:
+    """
+    Represents a client for communication with Google Cloud Platform and Firebase APIs.
+
+    Currently supported operations:
+        * Authorization / Authentication
+        * Creation of a Google Cloud Platform project
+        * Addition of Firebase to an existing Google Cloud Platform project
+        * Addition of Android application to an existing Firebase project
+        * Addition of iOS application to an existing Firebase project
+        * Download of configuration artifact associated with an existing Android application
+        * Download of configuration artifact associated with an existing iOS application
+    """
+
+    def _obtain_credentials(self, credentials_file, access_token=None):
+        """
+        Obtains credentials shared by all the API calls of this client based on
+        provided credentials (in a form of JSON file), and starts refreshing
+        their access token in the background.
+
+        :param credentials_file: Path to the credentials JSON file obtained from
+            GCP (optional, Application Default Credentials are used if not provided)
+        :type credentials_file: str
+        :param access_token: Static access token used instead of the credentials
+            file (optional)
+        :type access_token: str
+        """
+
+        self.credentials = CredentialManager(
+            credentials_file, access_token=access_token
+        )
+        self.credentials.start()
+
+    def _open_session(self, pool_connections, pool_maxsize, pool_block):
+        """
+        Opens up a long-lived HTTP session whose connection pool is shared by all
+        the API calls (and threads) of this client, so established TCP/TLS
+        connections get reused instead of being opened for every call.
+
+        :param pool_connections: Number of per-host connection pools to be cached
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of connections kept alive per host
+        :type pool_maxsize: int
+        :param pool_block: Whether to block when no free connection is available
+            instead of opening a new (discarded) one
+        :type pool_block: bool
+        """
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+
+        # Retries are performed per API call according to its retry policy
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,
+        )
+
+        # Binds the connection pool to API calls sent to URLs starting with HTTPS
+        # (or HTTP, e.g. when using a local API emulator)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __init__(
+        self,
+        credentials_file,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        pool_block=False,
+        keep_alive=True,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        crm_base_url=GCP_CRM_BASE_URL,
+        firebase_base_url=FIREBASE_BASE_URL,
+        poll_deadline=DEFAULT_POLL_DEADLINE,
+        retry_policy=None,
+        rate_limits=None,
+        raw_artifacts=False,
+        validate_artifacts=False,
+        artifact_cache=None,
+        access_token=None,
+        events=None,
+        max_spans=None,
+    ):
+        """
+        Initializes Google Cloud Platform client by setting the access / refresh
+        token info based on the provided credentials obtained from Google Cloud Platform
+        in a form of a JSON file, and by opening up a pooled HTTP session.
+
+        :param credentials_file: Path to the credentials JSON file obtained from GCP
+        :type credentials_file: str
+        :param pool_connections: Number of per-host connection pools to be cached
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of connections kept alive per host
+        :type pool_maxsize: int
+        :param pool_block: Whether to block when no free connection is available
+        :type pool_block: bool
+        :param keep_alive: Whether connections are kept alive between API calls
+        :type keep_alive: bool
+        :param connect_timeout: Timeout of establishing a connection (in seconds)
+        :type connect_timeout: float
+        :param read_timeout: Timeout of waiting for a response (in seconds)
+        :type read_timeout: float
+        :param crm_base_url: Base URL of the Cloud Resource Manager API
+        :type crm_base_url: str
+        :param firebase_base_url: Base URL of the Firebase Management API
+        :type firebase_base_url: str
+        :param poll_deadline: Maximum time (in seconds) spent waiting for a single
+            long-running operation or resource to be completed
+        :type poll_deadline: float
+        :param retry_policy: Default retry policy of the API calls (optional)
+        :type retry_policy: RetryPolicy
+        :param rate_limits: Rate limits in requests per minute, keyed by API family
+            and method class, e.g. firebase.read (optional)
+        :type rate_limits: dict
+        :param raw_artifacts: Whether configuration artifacts are saved exactly as
+            provided by Firebase instead of being reformatted
+        :type raw_artifacts: bool
+        :param validate_artifacts: Whether configuration artifacts are validated
+            before being saved
+        :type validate_artifacts: bool
+        :param artifact_cache: Cache of the configuration artifacts (optional)
+        :type artifact_cache: ArtifactCache
+        :param access_token: Static access token used instead of the credentials
+            file, e.g. with a local API emulator (optional)
+        :type access_token: str
+        :param events: Stream of the progress events (optional)
+        :type events: EventStream
+        :param max_spans: Maximum number of the most recent measured spans kept
+            (unlimited by default)
+        :type max_spans: int
+        """
+
+        self._obtain_credentials(credentials_file, access_token)
+        self._open_session(pool_connections, pool_maxsize, pool_block)
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.raw_artifacts = raw_artifacts
+        self.validate_artifacts = validate_artifacts
+        self.artifact_cache = artifact_cache
+        self.crm_base_url = crm_base_url
+        self.firebase_base_url = firebase_base_url
+        self.operation_tracker = OperationTracker(self, deadline=poll_deadline)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.events = events
+        self.instrumentation = Instrumentation(events=events, max_spans=max_spans)
+        self.rate_limiter = RateLimiter(
+            dict(crm=crm_base_url, firebase=firebase_base_url),
+            rate_limits,
+        )
+
+        # Calls sent right after creation of a resource also retry the statuses
+        # returned until the resource propagates
+        self.propagation_retry_policy = self.retry_policy.with_status_codes(
+            EVENTUAL_CONSISTENCY_STATUS_CODES
+        )
+
+    def connection_stats(self):
+        """
+        Counts connections opened by the pooled HTTP session and requests that
+        were sent over an already opened (reused) connection.
+
+        :return: Connection statistics (opened, reused, requests)
+        :rtype: dict
+        """
+
+        opened = requests_sent = 0
+
+        # The same adapter may be mounted for multiple URL prefixes
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+
+            for key in pools.keys():
+                pool = pools.get(key)
+
+                if pool:
+                    opened += pool.num_connections
+                    requests_sent += pool.num_requests
+
+        return dict(
+            opened=opened,
+            reused=max(requests_sent - opened, 0),
+            requests=requests_sent,
+        )
+
+    def close(self):
+        """
+        Closes the pooled HTTP session together with all of its connections and
+        stops refreshing of the credentials (and closes the artifact cache and
+        the event stream).
+        """
+
+        self.session.close()
+        self.credentials.close()
+
+        if self.artifact_cache:
+            self.artifact_cache.close()
+
+        if self.events:
+            self.events.close()
+
+    def _execute_api_call(
+        self,
+        url,
+        method,
+        query_params=None,
+        body=None,
+        retry_policy=None,
+        call_name=None,
+        headers=None,
+    ):
+        """
+        Performs an HTTP request to the specified URL based on provided HTTP
+        method name and (optionally) query parameters and/or request body.
+        Failed attempts are retried according to the retry policy.
+
+        :param url: Target URL
+        :type url: str
+        :param method: HTTP method name (POST, GET, PUT, etc.)
+        :type method: str
+        :param query_params: Query parameters
+        :type query_params: dict
+        :param body: Request body
+        :type body: dict
+        :param retry_policy: Retry policy of the call (defaults to the one of the client)
+        :type retry_policy: RetryPolicy
+        :param call_name: Name of the API call, used by instrumentation (defaults
+            to the HTTP method name and URL)
+        :type call_name: str
+        :param headers: Additional HTTP headers (optional)
+        :type headers: dict
+        :return: HTTP Response (the last one, if all the attempts have failed), or
+            None if the request could not be sent at all
+        :rtype: requests.Response
+        """
+
+        import requests
+
+        policy = retry_policy or self.retry_policy
+
+        # Each request sent to Google Cloud Platform / Firebase API requires
+        # auth (bearer token, set for each attempt) and content-type headers
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+
+        # Consequence of the specified Content-Type header (application/json)
+        body = json.dumps(body) if body else None
+
+        # Messages are formatted only if actually logged, never with credentials
+        logging.debug(
+            "Performing HTTP request %s %s (headers: %s, query parameters: %s, "
+            "request body: %s) ...",
+            method.upper(),
+            url,
+            RedactedHeaders(headers),
+            query_params,
+            body,
+        )
+
+        started = time.monotonic()
+        attempt = 0
+        reauthorized = False
+
+        while True:
+            attempt = attempt + 1
+            response = error = None
+
+            # Each attempt uses the current access token, which may have been
+            # refreshed in the meantime
+            token = self.credentials.token
+            headers["Authorization"] = f"Bearer {token}"
+
+            self.rate_limiter.acquire(url, method)
+
+            try:
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    params=query_params,
+                    data=body,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+
+                self.rate_limiter.feedback(url, method, response)
+
+                if response.ok:
+                    break
+
+                # The access token has been revoked or has expired prematurely, so
+                # it is refreshed (by a single thread) and the request sent again
+                if response.status_code == 401 and not reauthorized:
+                    self.credentials.refresh(stale_token=token)
+                    reauthorized = True
+                    continue
+            except requests.exceptions.RequestException as err:
+                error = err
+
+            if attempt >= policy.max_attempts or not policy.is_retryable(
+                method, response, error
+            ):
+                break
+
+            delay = policy.delay(attempt, response)
+
+            # The time budget of the call would be exceeded by waiting
+            if time.monotonic() - started + delay > policy.budget:
+                break
+
+            logging.warning(
+                "Attempt %s of %s %s has failed (%s), retrying in %.2fs ...",
+                attempt,
+                method.upper(),
+                url,
+                response.status_code if response is not None else error,
+                delay,
+            )
+
+            time.sleep(delay)
+
+        self.instrumentation.record_call(
+            name=call_name or f"{method.upper()} {url}",
+            latency=time.monotonic() - started,
+            status=response.status_code if response is not None else None,
+            attempts=attempt,
+            bytes_sent=len(body) if body else 0,
+            bytes_received=len(response.content) if response is not None else 0,
+        )
+
+        if error is not None:
+            logging.error(
+                "HTTP request %s %s (query parameters: %s) has failed",
+                method.upper(),
+                url,
+                query_params,
+                exc_info=error,
+            )
+
+        return response
+
+    def create_gcp_project(
+        self, gcp_project_id, project_name=None, parent=None, labels=None, tags=None
+    ):
+        """
+        Creates a new Google Cloud Platform project configured with the
+        help of the provided keyword arguments. Parent, labels and tags are set
+        by the same request, so no follow-up call is needed.
+
+        Reference:
+        https://cloud.google.com/resource-manager/reference/rest/v3/projects/create
+
+        :param gcp_project_id: Google Cloud Platform project ID
+        :type gcp_project_id: str
+        :param project_name: Google Cloud Platform project name (optional)
+        :type project_name: str
+        :param parent: Parent folder or organization, e.g. folders/123 (optional)
+        :type parent: str
+        :param labels: Labels of the project (optional)
+        :type labels: dict
+        :param tags: Tags bound to the project - keys: namespaced names of the tag
+            keys; values: short names of the tag values (optional)
+        :type tags: dict
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        body = dict(projectId=gcp_project_id)
+
+        if project_name:
+            body["displayName"] = project_name
+
+        if parent:
+            body["parent"] = parent
+
+        if labels:
+            body["labels"] = labels
+
+        if tags:
+            body["tags"] = tags
+
+        logging.info("Creating Google Cloud Platform project: %s ...", body)
+
+        return self._execute_api_call(
+            url=f"{self.crm_base_url}/projects",
+            method="post",
+            body=body,
+            call_name="crm.projects.create",
+        )
+
+    def add_firebase_to_gcp_project(self, gcp_project_id):
+        """
+        Adds Firebase functionality to an existing Google Cloud Platform project,
+        i.e. creates a new Firebase project and binds it with an existing Google
+        Cloud Platform project based on the provided project ID.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/addFirebase
+
+        :param gcp_project_id: Google Cloud Platform project ID
+        :type gcp_project_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info(
+            "Adding Firebase functionality to a Google Cloud Platform project %s ...",
+            gcp_project_id,
+        )
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{gcp_project_id}:addFirebase",
+            method="post",
+            body={},
+            retry_policy=self.propagation_retry_policy,
+            call_name="firebase.projects.addFirebase",
+        )
+
+    def finalize_default_location(self, fb_project_id, location_id):
+        """
+        Sets the default Google Cloud Platform resource location of a Firebase
+        project. Once set, the location cannot be changed.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.defaultLocation/finalize
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param location_id: Location ID, e.g. us-central
+        :type location_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info(
+            "Finalizing default location %s of the Firebase project %s ...",
+            location_id,
+            fb_project_id,
+        )
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}/defaultLocation:finalize",
+            method="post",
+            body=dict(locationId=location_id),
+            call_name="firebase.defaultLocation.finalize",
+        )
+
+    def add_sha_certificate(self, fb_project_id, app_id, sha_hash):
+        """
+        Adds a SHA certificate fingerprint to an Android application.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps.sha/create
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Android application ID
+        :type app_id: str
+        :param sha_hash: SHA-1 or SHA-256 fingerprint (hexadecimal, optionally
+            colon-separated)
+        :type sha_hash: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        sha_hash = sha_hash.replace(":", "").lower()
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}/androidApps/{app_id}/sha",
+            method="post",
+            body=dict(
+                shaHash=sha_hash,
+                certType="SHA_1" if len(sha_hash) == 40 else "SHA_256",
+            ),
+            call_name="firebase.androidApps.sha.create",
+        )
+
+    def get_operation(self, operation_name, base_url):
+        """
+        Fetches the latest state of a long-running operation.
+
+        References:
+            * https://cloud.google.com/resource-manager/reference/rest/v3/operations/get
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/operations/get
+
+        :param operation_name: Name of the operation (operations/...)
+        :type operation_name: str
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info("Fetching state of the operation %s ...", operation_name)
+
+        return self._execute_api_call(
+            url=f"{base_url}/{operation_name}",
+            method="get",
+            call_name="operations.get",
+        )
+
+    def wait_for_operation(self, response, base_url):
+        """
+        Waits until the long-running operation returned by an API call is done.
+        Responses without an operation (e.g. a project which already exists) are
+        only logged, as the following steps check the state of the resources.
+
+        :param response: HTTP Response object returned by the API call
+        :type response: requests.Response
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: Result of the operation, or None if there is no operation to wait for
+        :rtype: dict
+        """
+
+        return run_steps(wait_for_operation(self, response, base_url))
+
+    def _fetch_firebase_project(self, fb_project_id):
+        """
+        Fetches a Firebase project with the specified ID.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/get
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info("Fetching info for the Firebase project %s ...", fb_project_id)
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}",
+            method="get",
+            call_name="firebase.projects.get",
+        )
+
+    def add_app_to_firebase_project(
+        self,
+        fb_project_id,
+        package_name,
+        app_name=None,
+        store_id=None,
+        app_type=ApplicationType.ANDROID,
+        wait_until_active=True,
+    ):
+        """
+        Adds an Android/iOS application to an existing Firebase project.
+
+        References:
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/create
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/create
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :param app_name: Name of the Android/iOS application (optional)
+        :type app_name: str
+        :param store_id: ID of the App Store (optional)
+        :type store_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param wait_until_active: Whether to wait for the Firebase project to become
+            ACTIVE first (can be skipped if the state was already checked)
+        :type wait_until_active: bool
+        :return: Application ID
+        :rtype: str
+        """
+
+        return run_steps(
+            add_app_to_firebase_project(
+                self,
+                fb_project_id,
+                package_name,
+                app_name,
+                store_id,
+                app_type,
+                wait_until_active,
+            )
+        )
+
+    def _resolve_app_id(self, response, fb_project_id, app_type, package_name):
+        """
+        Resolves ID of a created application - from the result of its create
+        operation or, if the application already exists (409), by its package
+        name / bundle ID. Any other failure of the create API call is raised.
+
+        :param response: HTTP Response object returned by the create API call
+        :type response: requests.Response
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :return: Application ID
+        :rtype: str
+        """
+
+        return run_steps(
+            resolve_app_id(self, response, fb_project_id, app_type, package_name)
+        )
+
+    def wait_for_firebase_project(self, fb_project_id):
+        """
+        Waits (with capped exponential backoff) until the Firebase project with
+        the specified ID is completely set-up, i.e. until applications can be
+        added to it.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        """
+
+        run_steps(wait_for_firebase_project(self, fb_project_id))
+
+    def _is_firebase_project_active(self, fb_project_id):
+        """
+        Checks whether the Firebase project with the specified ID is completely
+        set-up, i.e. whether applications can be added to it.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :return: True if the Firebase project is in ACTIVE state, else False
+        :rtype: bool
+        """
+
+        response = self._fetch_firebase_project(fb_project_id)
+
+        # A new Firebase project is not visible (403/404) until it propagates, so
+        # a failed fetch is only checked again later
+        if response is None or not response.ok:
+            logging.info(
+                "Firebase project %s is not available yet: %s",
+                fb_project_id,
+                response.status_code if response is not None else None,
+            )
+            return False
+
+        fb_project = response.json()
+
+        return bool(
+            fb_project
+            and fb_project.get("projectId") == fb_project_id
+            and fb_project.get("state") == "ACTIVE"
+        )
+
+    def _create_app(self, fb_project_id, package_name, app_name, store_id, app_type):
+        """
+        Sends the request for creation of an Android/iOS application within an
+        existing (and ACTIVE) Firebase project.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :param app_name: Name of the Android/iOS application (optional)
+        :type app_name: str
+        :param store_id: ID of the App Store (optional)
+        :type store_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        target_url = f"{self.firebase_base_url}/projects/{fb_project_id}"
+
+        # Handle the URL and body parts according to type of the application to be added
+        if app_type == ApplicationType.ANDROID:
+            target_url = target_url + "/androidApps"
+            body = dict(packageName=package_name)
+        else:
+            target_url = target_url + "/iosApps"
+            body = dict(bundleId=package_name)
+
+            if store_id:
+                body["appStoreId"] = store_id
+
+        if app_name:
+            body["displayName"] = app_name
+
+        logging.info(
+            "Adding %s application %s to the Firebase project %s ...",
+            app_type.name,
+            body,
+            fb_project_id,
+        )
+
+        return self._execute_api_call(
+            url=target_url,
+            method="post",
+            body=body,
+            retry_policy=self.propagation_retry_policy,
+            call_name=f"firebase.{app_type.name.lower()}Apps.create",
+        )
+
+    def _fetch_app_id(self, fb_project_id, app_type, package_name):
+        """
+        Fetches ID of the application of the given application type with the
+        specified package name / bundle ID within the specified Firebase project.
+        Pages of the application list are fetched only until the application is
+        found.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param package_name: Android package name / iOS bundle ID
+        :type package_name: str
+        :return: Application ID, or None if the application is not listed yet
+        :rtype: str
+        """
+
+        key = "packageName" if app_type == ApplicationType.ANDROID else "bundleId"
+
+        for app in self.list_apps(fb_project_id, app_type):
+            if app.get(key) == package_name:
+                return app.get("appId")
+
+        return None
+
+    def list_apps(
+        self, fb_project_id, app_type=ApplicationType.ANDROID, raise_on_error=False
+    ):
+        """
+        Lists all the Android or iOS applications within a Firebase project with
+        specified ID, following the pagination of the API.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_type: Type of applications to be listed (Android, iOS)
+        :type app_type: ApplicationType
+        :param raise_on_error: Whether a failed page fetch is raised (as
+            APICallError) instead of ending the listing
+        :type raise_on_error: bool
+        :return: Generator of the applications
+        :rtype: generator
+        """
+
+        return self._paginate(
+            lambda page_token: self._fetch_apps_of_firebase_project(
+                fb_project_id=fb_project_id,
+                app_type=app_type,
+                page_token=page_token,
+            ),
+            "apps",
+            raise_on_error,
+        )
+
+    @staticmethod
+    def _paginate(fetch_page, items_key, raise_on_error=False):
+        """
+        Follows the pagination of a list API (pageToken / nextPageToken), yielding
+        the listed items page by page. A failed page fetch ends the listing,
+        unless it is raised.
+
+        :param fetch_page: Callable fetching a single page (by its page token)
+            and returning the HTTP Response
+        :type fetch_page: callable
+        :param items_key: Key of the listed items within a page
+        :type items_key: str
+        :param raise_on_error: Whether a failed page fetch is raised (as
+            APICallError) instead of ending the listing
+        :type raise_on_error: bool
+        :return: Generator of the listed items
+        :rtype: generator
+        """
+
+        page_token = None
+
+        while True:
+            response = fetch_page(page_token)
+
+            if raise_on_error:
+                check_response(response, f"Listing of {items_key}")
+
+            page = response.json() if response is not None and response.ok else {}
+
+            yield from page.get(items_key, [])
+
+            page_token = page.get("nextPageToken")
+
+            if not page_token:
+                break
+
+    def _list(
+        self, url, items_key, query_params=None, call_name=None, raise_on_error=False
+    ):
+        """
+        Lists all the items of a list API with the specified URL.
+
+        :param url: URL of the list API
+        :type url: str
+        :param items_key: Key of the listed items within a page
+        :type items_key: str
+        :param query_params: Additional query parameters (optional)
+        :type query_params: dict
+        :param call_name: Name of the API call, used by instrumentation (optional)
+        :type call_name: str
+        :param raise_on_error: Whether a failed page fetch is raised (as
+            APICallError) instead of ending the listing
+        :type raise_on_error: bool
+        :return: Generator of the listed items
+        :rtype: generator
+        """
+
+        return self._paginate(
+            lambda page_token: self._execute_api_call(
+                url=url,
+                method="get",
+                query_params={
+                    **(query_params or {}),
+                    **({"pageToken": page_token} if page_token else {}),
+                }
+                or None,
+                call_name=call_name,
+            ),
+            items_key,
+            raise_on_error,
+        )
+
+    def search_gcp_projects(self, query=None):
+        """
+        Lists all the Google Cloud Platform projects visible to the caller,
+        optionally matching the specified query.
+
+        Reference:
+        https://cloud.google.com/resource-manager/reference/rest/v3/projects/search
+
+        :param query: Search query, e.g. "labels.env:test" (optional)
+        :type query: str
+        :return: Generator of the projects
+        :rtype: generator
+        """
+
+        logging.info("Searching Google Cloud Platform projects (query: %s) ...", query)
+
+        return self._list(
+            url=f"{self.crm_base_url}/projects:search",
+            items_key="projects",
+            call_name="crm.projects.search",
+            query_params={"query": query} if query else None,
+        )
+
+    def list_firebase_projects(self, raise_on_error=False):
+        """
+        Lists all the Firebase projects accessible to the caller.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/list
+
+        :param raise_on_error: Whether a failed page fetch is raised (as
+            APICallError) instead of ending the listing
+        :type raise_on_error: bool
+        :return: Generator of the Firebase projects
+        :rtype: generator
+        """
+
+        logging.info("Listing Firebase projects ...")
+
+        return self._list(
+            url=f"{self.firebase_base_url}/projects",
+            items_key="results",
+            call_name="firebase.projects.list",
+            raise_on_error=raise_on_error,
+        )
+
+    def delete_gcp_project(self, gcp_project_id):
+        """
+        Requests deletion of a Google Cloud Platform project - the project is
+        marked for deletion (DELETE_REQUESTED) and deleted permanently after a
+        grace period, during which it can be restored.
+
+        Reference:
+        https://cloud.google.com/resource-manager/reference/rest/v3/projects/delete
+
+        :param gcp_project_id: Google Cloud Platform project ID
+        :type gcp_project_id: str
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info("Deleting Google Cloud Platform project %s ...", gcp_project_id)
+
+        return self._execute_api_call(
+            url=f"{self.crm_base_url}/projects/{gcp_project_id}",
+            method="delete",
+            call_name="crm.projects.delete",
+        )
+
+    def remove_app(self, fb_project_id, app_id, app_type=ApplicationType.ANDROID):
+        """
+        Removes an Android/iOS application from a Firebase project.
+
+        References:
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/remove
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/remove
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        url_part = f"{app_type.name.lower()}Apps"
+
+        logging.info(
+            "Removing %s application %s from the Firebase project %s ...",
+            app_type.name,
+            app_id,
+            fb_project_id,
+        )
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}/{url_part}/{app_id}:remove",
+            method="post",
+            body=dict(allowMissing=True),
+            call_name=f"firebase.{url_part}.remove",
+        )
+
+    def list_available_projects(self):
+        """
+        Lists all the Google Cloud Platform projects to which Firebase can be added.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/availableProjects/list
+
+        :return: Generator of the project info (project: projects/{id}, ...)
+        :rtype: generator
+        """
+
+        logging.info("Listing projects available for Firebase ...")
+
+        return self._list(
+            url=f"{self.firebase_base_url}/availableProjects",
+            items_key="projectInfo",
+            call_name="firebase.availableProjects.list",
+        )
+
+    def search_apps(self, fb_project_id):
+        """
+        Lists all the applications (of all the platforms) within a Firebase
+        project with specified ID, within a single paginated listing.
+
+        Reference:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects/searchApps
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :return: Generator of the application info (platform, appId, namespace, ...)
+        :rtype: generator
+        """
+
+        logging.info(
+            "Searching applications within the Firebase project %s ...", fb_project_id
+        )
+
+        return self._list(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}:searchApps",
+            items_key="apps",
+            call_name="firebase.projects.searchApps",
+        )
+
+    def _fetch_apps_of_firebase_project(
+        self,
+        fb_project_id,
+        app_type=ApplicationType.ANDROID,
+        page_token=None,
+        page_size=None,
+    ):
+        """
+        Fetches a single page of the Android or iOS applications within a Firebase
+        project with specified ID.
+
+        References:
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/list
+        https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/list
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_type: Type of applications to be fetched (Android, iOS)
+        :type app_type: ApplicationType
+        :param page_token: Token of the page to be fetched (optional)
+        :type page_token: str
+        :param page_size: Maximum number of applications per page (optional)
+        :type page_size: int
+        :return: HTTP Response object
+        :rtype: requests.Response
+        """
+
+        logging.info(
+            "Fetching %s applications within the Firebase project %s ...",
+            app_type,
+            fb_project_id,
+        )
+
+        query_params = {}
+
+        if page_token:
+            query_params["pageToken"] = page_token
+
+        if page_size:
+            query_params["pageSize"] = page_size
+
+        return self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}/{app_type.name.lower()}Apps",
+            method="get",
+            query_params=query_params or None,
+            call_name=f"firebase.{app_type.name.lower()}Apps.list",
+        )
+
+    def _fetch_app_configuration(self, fb_project_id, app_id, app_type, etag=None):
+        """
+        Fetches configuration artifact of Android/iOS application - conditionally,
+        if the ETag of an already fetched artifact is provided.
+
+        References:
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.androidApps/getConfig
+            * https://firebase.google.com/docs/projects/api/reference/rest/v1beta1/projects.iosApps/getConfig
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param etag: ETag of the already fetched artifact (optional)
+        :type etag: str
+        :return: File name, decoded content (None if the artifact has not been
+            modified since the ETag) and ETag of the configuration artifact
+        :rtype: tuple
+        :raises APICallError: If the configuration artifact could not be fetched
+        """
+
+        url_part = "androidApps" if app_type == ApplicationType.ANDROID else "iosApps"
+
+        logging.info(
+            "Fetching configuration info for %s application %s ...",
+            app_type.name.lower(),
+            app_id,
+        )
+
+        response = self._execute_api_call(
+            url=f"{self.firebase_base_url}/projects/{fb_project_id}/{url_part}/{app_id}/config",
+            method="get",
+            retry_policy=self.propagation_retry_policy,
+            call_name=f"firebase.{url_part}.getConfig",
+            headers={"If-None-Match": etag} if etag else None,
+        )
+
+        check_response(
+            response,
+            f"Fetching of the configuration of {app_type.name.lower()} application "
+            f"{app_id}",
+        )
+
+        if response.status_code == 304:
+            return None, None, etag
+
+        r = response.json()
+
+        # Decode the Base64-encoded content of the configuration artifact
+        return (
+            r.get("configFilename"),
+            base64.b64decode(r.get("configFileContents")),
+            response.headers.get("ETag"),
+        )
+
+    def _cached_app_configuration(self, fb_project_id, app_id, app_type):
+        """
+        Fetches configuration artifact of Android/iOS application through the
+        artifact cache (if used) - a fresh cached artifact is used without any API
+        call, a stale one is refreshed.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :return: File name and decoded content of the configuration artifact
+        :rtype: tuple
+        """
+
+        cache = self.artifact_cache
+        cached = cache.get(fb_project_id, app_id) if cache else None
+
+        if cached and cached["fresh"]:
+            logging.info("Using cached configuration info for application %s", app_id)
+            return cached["filename"], cached["content"]
+
+        filename, content, etag = self._fetch_app_configuration(
+            fb_project_id,
+            app_id,
+            app_type,
+            etag=cached["etag"] if cached else None,
+        )
+
+        if content is None:
+            logging.info("Configuration info for application %s is unchanged", app_id)
+            cache.touch(fb_project_id, app_id)
+            return cached["filename"], cached["content"]
+
+        if cache:
+            cache.put(fb_project_id, app_id, filename, content, etag)
+
+        return filename, content
+
+    def fetch_app_configuration(
+        self,
+        fb_project_id,
+        app_id,
+        app_type=ApplicationType.ANDROID,
+    ):
+        """
+        Fetches configuration artifact for Android/iOS application, ready to be
+        saved - validated and reformatted according to the client settings.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :return: File name and content of the configuration artifact
+        :rtype: tuple
+        """
+
+        filename, content = self._cached_app_configuration(
+            fb_project_id, app_id, app_type
+        )
+
+        if self.validate_artifacts:
+            validate_artifact(content, app_type)
+
+        # Unless saved as provided, the artifact is reformatted (Android JSON
+        # indented, iOS plist re-serialized)
+        if not self.raw_artifacts:
+            content = format_artifact(content, app_type)
+
+        return filename, content
+
+    def download_app_configuration(
+        self,
+        fb_project_id,
+        app_id,
+        app_type=ApplicationType.ANDROID,
+        path=None,
+    ):
+        """
+        Downloads locally configuration file for Android/iOS application.
+        The file is replaced atomically, and only if its content has changed.
+
+        :param fb_project_id: Firebase project ID
+        :type fb_project_id: str
+        :param app_id: Application ID
+        :type app_id: str
+        :param app_type: Type of application (Android, iOS)
+        :type app_type: ApplicationType
+        :param path: Path marking where the configuration file will be downloaded
+        :type path: str
+        :return: Path of the saved configuration file
+        :rtype: str
+        """
+
+        # Handle the empty paths and paths ending/not ending with slash ('/')
+        path = path if path else ""
+        path = path if (path.endswith("/") or path == "") else f"{path}/"
+
+        filename, content = self.fetch_app_configuration(
+            fb_project_id, app_id, app_type
+        )
+
+        # Use the file name and extension provided with response from API
+        file_path = f"{path}{filename}"
+        changed = write_artifact(file_path, content)
+
+        if self.events:
+            self.events.emit(
+                "artifact_ready",
+                project_id=fb_project_id,
+                app_id=app_id,
+                app_type=app_type.name,
+                path=os.path.abspath(file_path),
+                sha256=hashlib.sha256(content).hexdigest(),
+                changed=changed,
+            )
+
+        if changed:
+            logging.info(
+                "Configuration info for %s application %s saved as %s",
+                app_type.name.lower(),
+                app_id,
+                file_path,
+            )
+        else:
+            logging.info(
+                "Configuration info for %s application %s is unchanged in %s",
+                app_type.name.lower(),
+                app_id,
+                file_path,
+            )
+
+        return file_path
+
+
+class OperationTracker:
+    """
+    Represents a tracker of long-running operations (operations/* resources)
+    returned by the GCP/Firebase APIs. Operations are polled directly with a
+    capped exponential backoff with jitter, limited by an overall deadline.
+    """
+
+    def __init__(
+        self,
+        gcp_client,
+        initial_delay=DEFAULT_POLL_INITIAL_DELAY,
+        max_delay=DEFAULT_POLL_MAX_DELAY,
+        multiplier=DEFAULT_POLL_MULTIPLIER,
+        deadline=DEFAULT_POLL_DEADLINE,
+    ):
+        """
+        Initializes operation tracker.
+
+        :param gcp_client: Client used for fetching of the operations
+        :type gcp_client: GCPClient
+        :param initial_delay: Delay before the second check (in seconds)
+        :type initial_delay: float
+        :param max_delay: Maximum delay between two checks (in seconds)
+        :type max_delay: float
+        :param multiplier: Growth factor of the delay
+        :type multiplier: float
+        :param deadline: Overall deadline of a single wait (in seconds)
+        :type deadline: float
+        """
+
+        self.gcp_client = gcp_client
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.deadline = deadline
+
+    def backoff(self):
+        """
+        Creates a new backoff with the settings of this tracker.
+
+        :return: Backoff whose deadline starts now
+        :rtype: Backoff
+        """
+
+        return Backoff(
+            initial_delay=self.initial_delay,
+            max_delay=self.max_delay,
+            multiplier=self.multiplier,
+            deadline=self.deadline,
+        )
+
+    @staticmethod
+    def result(operation):
+        """
+        Extracts the result of a finished operation.
+
+        :param operation: Finished operation
+        :type operation: dict
+        :return: Response of the operation (e.g. the created resource)
+        :rtype: dict
+        """
+
+        if operation.get("error"):
+            raise OperationError(
+                f"Operation {operation.get('name')} has failed: {operation['error']}"
+            )
+
+        return operation.get("response", {})
+
+    def _refresh(self, operation, base_url):
+        """
+        Fetches the latest state of an operation. Failed fetches keep the last
+        known state, so the operation gets checked again later.
+
+        :param operation: Last known state of the operation
+        :type operation: dict
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: Latest known state of the operation
+        :rtype: dict
+        """
+
+        response = self.gcp_client.get_operation(operation.get("name"), base_url)
+
+        if response is None or not response.ok:
+            return operation
+
+        return response.json()
+
+    def wait(self, operation, base_url):
+        """
+        Waits until a single operation is done.
+
+        :param operation: Operation returned by an API call
+        :type operation: dict
+        :param base_url: Base URL of the API which has started the operation
+        :type base_url: str
+        :return: Response of the operation (e.g. the created resource)
+        :rtype: dict
+        """
+
+        return run_steps(track_operation(self, operation, base_url))
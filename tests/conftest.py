@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fake_server import FakeAPIServer  # noqa: E402
+from core.main import create_gcp_client  # noqa: E402
+
+# Limits which never throttle the simulated API
+RATE_LIMITS = "crm.mutation=60000,firebase.mutation=60000"
+
+# Polling delay short enough for the operations of the simulated API
+POLL_INITIAL_DELAY = 0.01
+
+
+@pytest.fixture
+def server():
+    server = FakeAPIServer(operation_delay=0.05, consistency_delay=0.02, seed=0)
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture
+def gcp_client(server):
+    gcp_client = create_gcp_client(
+        dict(
+            crm_base_url=server.crm_base_url,
+            firebase_base_url=server.firebase_base_url,
+            access_token="test",
+            rate_limits=RATE_LIMITS,
+        ),
+        None,
+    )
+    gcp_client.operation_tracker.initial_delay = POLL_INITIAL_DELAY
+
+    yield gcp_client
+
+    gcp_client.close()
+
+
+@pytest.fixture
+def entries(tmp_path):
+    def create(count, prefix="test"):
+        result = []
+
+        for i in range(count):
+            path = tmp_path / prefix / str(i)
+            path.mkdir(parents=True)
+
+            result.append(
+                dict(
+                    gcp_project_id=f"{prefix}-project-{i:03d}",
+                    android_package=f"com.{prefix}.app{i}",
+                    android_config_path=str(path) + os.sep,
+                    android_sha_certificates=["a" * 40],
+                    ios_bundle_id=f"com.{prefix}.app{i}",
+                    ios_config_path=str(path) + os.sep,
+                    default_location="us-central",
+                )
+            )
+
+        return result
+
+    return create
@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+import pytest
+
+from core.common import APICallError, ApplicationType
+from core.pipeline import AsyncGCPClient, BatchRunner, run_operation_step
+from core.state import StateStore
+
+ENGINES = ["threads", "asyncio"]
+
+
+def provision(engine, gcp_client, entries, state_store=None):
+    if engine == "asyncio":
+        async_client = AsyncGCPClient(
+            gcp_client, max_concurrency=2, state_store=state_store
+        )
+
+        try:
+            return asyncio.run(async_client.run(entries))
+        finally:
+            async_client.close()
+
+    runner = BatchRunner(gcp_client, max_workers=2, state_store=state_store)
+
+    return runner.run(entries)
+
+
+def run_step(engine, gcp_client, state_store, step, base_url, start):
+    if engine == "asyncio":
+        async_client = AsyncGCPClient(gcp_client, state_store=state_store)
+
+        try:
+            return asyncio.run(
+                async_client.run_operation_step("p1", step, base_url, start)
+            )
+        finally:
+            async_client.close()
+
+    return run_operation_step(gcp_client, state_store, "p1", step, base_url, start)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_provisions_manifest(engine, server, gcp_client, entries):
+    manifest = entries(3)
+
+    results = provision(engine, gcp_client, manifest)
+
+    assert [r["status"] for r in results] == ["succeeded"] * 3
+    assert len(server.apps) == 6
+
+    for entry, result in zip(manifest, results):
+        project_id = entry["gcp_project_id"]
+        firebase_project = server.firebase_projects[project_id]["resource"]
+
+        assert firebase_project["resources"]["locationId"] == "us-central"
+        assert list(server.certificates[result["android_app_id"]]) == ["a" * 40]
+        assert sorted(os.listdir(entry["android_config_path"])) == [
+            "GoogleService-Info.plist",
+            "google-services.json",
+        ]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_resumes_completed_steps(engine, server, gcp_client, entries, tmp_path):
+    manifest = entries(2)
+    state_store = StateStore(str(tmp_path / "state.db"))
+
+    try:
+        first = provision(engine, gcp_client, manifest, state_store)
+        requests = server.stats["requests"]
+        second = provision(engine, gcp_client, manifest, state_store)
+    finally:
+        state_store.close()
+
+    assert [r["android_app_id"] for r in second] == [r["android_app_id"] for r in first]
+    assert len(server.apps) == 4
+    # Only the check that the Firebase projects are ACTIVE is repeated
+    assert server.stats["requests"] - requests == 2
+
+
+def test_engines_run_the_same_steps(server, gcp_client, entries):
+    steps = {}
+
+    for engine in ENGINES:
+        gcp_client.instrumentation.reset()
+        provision(engine, gcp_client, entries(2, prefix=engine))
+        steps[engine] = {
+            name: summary["count"]
+            for name, summary in gcp_client.instrumentation.summary()["steps"].items()
+        }
+
+    assert steps["threads"] == steps["asyncio"]
+    assert steps["threads"]["create_app"] == 4
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_failed_step_stays_pending(engine, server, gcp_client, tmp_path):
+    state_store = StateStore(str(tmp_path / "state.db"))
+    base_url = server.firebase_base_url
+
+    try:
+        with pytest.raises(APICallError) as error:
+            run_step(
+                engine,
+                gcp_client,
+                state_store,
+                "unknown",
+                base_url,
+                lambda: gcp_client._execute_api_call(f"{base_url}/unknown", "post"),
+            )
+
+        assert error.value.status_code == 404
+        assert state_store.get("p1", "unknown") is None
+    finally:
+        state_store.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_existing_resource_completes_step(engine, server, gcp_client, tmp_path):
+    state_store = StateStore(str(tmp_path / "state.db"))
+    base_url = server.crm_base_url
+
+    def start():
+        return gcp_client.create_gcp_project(gcp_project_id="p1")
+
+    try:
+        start()
+        run_step(engine, gcp_client, state_store, "create_project", base_url, start)
+
+        assert state_store.completed("p1", "create_project") is not None
+    finally:
+        state_store.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_failed_app_creation_is_raised(engine, server, gcp_client):
+    response = gcp_client._execute_api_call(
+        f"{server.firebase_base_url}/unknown", "post"
+    )
+    args = (response, "p1", ApplicationType.ANDROID, "com.test.app")
+
+    with pytest.raises(APICallError):
+        if engine == "asyncio":
+            async_client = AsyncGCPClient(gcp_client)
+
+            try:
+                asyncio.run(async_client._resolve_app_id(*args))
+            finally:
+                async_client.close()
+        else:
+            gcp_client._resolve_app_id(*args)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_existing_app_is_reused(engine, server, gcp_client, entries):
+    manifest = entries(1)
+    app_id = provision(engine, gcp_client, manifest)[0]["android_app_id"]
+    args = ("test-project-000", manifest[0]["android_package"])
+
+    if engine == "asyncio":
+        async_client = AsyncGCPClient(gcp_client)
+
+        try:
+            reused = asyncio.run(async_client.add_app_to_firebase_project(*args))
+        finally:
+            async_client.close()
+    else:
+        reused = gcp_client.add_app_to_firebase_project(*args)
+
+    assert reused == app_id
+    assert len(server.apps) == 2
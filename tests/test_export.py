@@ -0,0 +1,51 @@
+import zipfile
+
+from core.pipeline import BatchRunner, export_app_configurations
+
+
+def add_duplicate_app(server, app_id):
+    app = dict(server.apps[app_id])
+    duplicate_id = app_id[:-1] + "x"
+    app["resource"] = dict(app["resource"], appId=duplicate_id)
+    server.apps[duplicate_id] = app
+
+
+def test_exports_apps_sharing_a_package(server, gcp_client, entries, tmp_path):
+    manifest = entries(1)
+    result = BatchRunner(gcp_client).run(manifest)[0]
+    add_duplicate_app(server, result["android_app_id"])
+
+    directory = tmp_path / "export"
+    results = export_app_configurations(
+        gcp_client, ["test-project-000"], str(directory)
+    )
+    archive = tmp_path / "export.zip"
+    export_app_configurations(gcp_client, ["test-project-000"], str(archive))
+
+    paths = sorted(r["path"] for r in results)
+
+    assert [r["status"] for r in results] == ["succeeded"] * 3
+    assert len(set(paths)) == 3
+    assert all(":" not in p.split("export")[-1] for p in paths)
+    assert len(set(zipfile.ZipFile(archive).namelist())) == 3
+    assert len(zipfile.ZipFile(archive).namelist()) == 3
+
+
+def test_failed_listing_is_reported(server, gcp_client, tmp_path):
+    server.error_rate = 1.0
+    gcp_client.retry_policy.max_attempts = 1
+
+    results = export_app_configurations(
+        gcp_client, ["test-project-000"], str(tmp_path / "export")
+    )
+
+    assert sorted(r["app_type"] for r in results) == ["ANDROID", "IOS"]
+    assert [r["status"] for r in results] == ["failed"] * 2
+
+
+def test_missing_project_is_reported(server, gcp_client, tmp_path):
+    results = export_app_configurations(
+        gcp_client, ["missing-project"], str(tmp_path / "export")
+    )
+
+    assert [r["status"] for r in results] == ["failed"] * 2
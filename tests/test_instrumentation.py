@@ -0,0 +1,32 @@
+from core.instrumentation import Instrumentation
+
+
+def test_keeps_only_the_most_recent_spans():
+    instrumentation = Instrumentation(max_spans=10)
+
+    for i in range(100):
+        with instrumentation.step(f"project-{i}", "create_project"):
+            with instrumentation.step(f"project-{i}", "create_app"):
+                instrumentation.record_call(
+                    "crm.projects.create", 0.01 * i, 200, 1, 0, 0
+                )
+
+    summary = instrumentation.summary()
+
+    assert len(instrumentation.spans) == 10
+    assert summary["steps"]["create_project"]["count"] == 100
+    assert summary["calls"]["crm.projects.create"]["count"] == 100
+    assert summary["calls"]["crm.projects.create"]["max"] == 0.99
+    assert abs(summary["calls"]["crm.projects.create"]["p50"] - 0.49) < 0.49 * 0.05
+    assert not instrumentation._trace_ids
+
+
+def test_nested_steps_share_the_trace_of_the_project():
+    instrumentation = Instrumentation()
+
+    with instrumentation.step("project", "provision_project") as parent:
+        with instrumentation.step("project", "create_project") as child:
+            pass
+
+    assert child["trace_id"] == parent["trace_id"]
+    assert child["parent_span_id"] == parent["span_id"]
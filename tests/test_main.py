@@ -0,0 +1,81 @@
+import json
+
+from core.main import run_sharded
+from core.state import StateStore
+
+from conftest import RATE_LIMITS
+
+
+def sharded_arguments(server, entries, tmp_path, **options):
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(entries))
+
+    return dict(
+        manifest=str(manifest_file),
+        processes=2,
+        crm_base_url=server.crm_base_url,
+        firebase_base_url=server.firebase_base_url,
+        access_token="test",
+        rate_limits=RATE_LIMITS,
+        report_file=str(tmp_path / "report.json"),
+        **options,
+    )
+
+
+def test_processes_share_state_file(server, entries, tmp_path):
+    # Partitioned by the CRC-32 hash of the IDs, 4 projects per process
+    manifest = entries(8)
+    state_file = str(tmp_path / "state.db")
+    arguments = sharded_arguments(
+        server,
+        manifest,
+        tmp_path,
+        state_file=state_file,
+        events=str(tmp_path / "events.jsonl"),
+    )
+
+    results = run_sharded(arguments)
+    state_store = StateStore(state_file)
+
+    try:
+        completed = [
+            state_store.completed(e["gcp_project_id"], "add_firebase") for e in manifest
+        ]
+    finally:
+        state_store.close()
+
+    events = [
+        json.loads(line)
+        for path in tmp_path.glob("events.process-*.jsonl")
+        for line in path.read_text().splitlines()
+    ]
+    provisioned = {
+        e["project_id"]
+        for e in events
+        if e["event"] == "step_completed" and e["step"] == "provision_project"
+    }
+
+    assert [r["status"] for r in results] == ["succeeded"] * 8
+    assert None not in completed
+    assert len(list(tmp_path.glob("events.process-*.jsonl"))) == 2
+    assert provisioned == {e["gcp_project_id"] for e in manifest}
+
+
+def test_failed_process_is_reported(server, entries, tmp_path):
+    manifest = entries(4)
+    arguments = sharded_arguments(
+        server,
+        manifest,
+        tmp_path,
+        metrics_report=str(tmp_path / "missing" / "metrics.json"),
+    )
+
+    results = run_sharded(arguments)
+
+    with open(arguments["report_file"], encoding="utf-8") as f:
+        report = json.load(f)
+
+    assert [r["gcp_project_id"] for r in results] == [
+        e["gcp_project_id"] for e in manifest
+    ]
+    assert [r["status"] for r in report["projects"]] == ["failed"] * 4
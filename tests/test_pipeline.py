@@ -0,0 +1,109 @@
+import io
+import json
+
+import pytest
+
+from core.common import APICallError
+from core.manifest import collect_apps
+from core.pipeline import (
+    BatchRunner,
+    JobServer,
+    add_sha_certificates,
+    teardown_project,
+    write_report,
+)
+from core.state import StateStore
+
+
+def test_adds_only_missing_certificates(server, gcp_client, entries, tmp_path):
+    manifest = entries(1)
+    state_store = StateStore(str(tmp_path / "state.db"))
+
+    try:
+        result = BatchRunner(gcp_client, state_store=state_store).run(manifest)[0]
+        manifest[0]["android_sha_certificates"].append("b" * 40)
+        calls = gcp_client.instrumentation.summary()["calls"]
+        added = calls["firebase.androidApps.sha.create"]["count"]
+
+        BatchRunner(gcp_client, state_store=state_store).run(manifest)
+        calls = gcp_client.instrumentation.summary()["calls"]
+    finally:
+        state_store.close()
+
+    assert sorted(server.certificates[result["android_app_id"]]) == ["a" * 40, "b" * 40]
+    assert calls["firebase.androidApps.sha.create"]["count"] == added + 1
+
+
+def test_failed_certificate_is_raised(server, gcp_client, entries):
+    apps = collect_apps(entries(1)[0])[:1]
+
+    with pytest.raises(APICallError):
+        add_sha_certificates(gcp_client, "test-project-000", apps, ["1:1:android:1"])
+
+
+def test_failed_app_removal_is_reported(server, gcp_client, entries, monkeypatch):
+    manifest = entries(1)
+    result = BatchRunner(gcp_client).run(manifest)[0]
+    remove_app = gcp_client.remove_app
+
+    def fail_ios(fb_project_id, app_id, app_type):
+        if app_id == result["ios_app_id"]:
+            return None
+
+        return remove_app(fb_project_id, app_id, app_type)
+
+    monkeypatch.setattr(gcp_client, "remove_app", fail_ios)
+    results = BatchRunner(gcp_client, pipeline=teardown_project).run(
+        [{**manifest[0], "teardown_scope": "apps"}]
+    )
+
+    assert results[0]["status"] == "failed"
+    assert [a["app_id"] for a in results[0]["removed_apps"]] == [
+        result["android_app_id"]
+    ]
+    assert [a["app_id"] for a in results[0]["failed_apps"]] == [result["ios_app_id"]]
+
+
+def test_missing_project_teardown_is_skipped(server, gcp_client):
+    result = teardown_project(gcp_client, dict(gcp_project_id="missing-project"))
+
+    assert result["deleted"] is False
+    assert result["status"] == "skipped"
+
+
+def test_job_server_answers_each_job(server, gcp_client, entries):
+    jobs = [dict(job_id=i, **entry) for i, entry in enumerate(entries(3))]
+    lines = [json.dumps(job) for job in jobs] + ["", "not json"]
+    output = io.StringIO()
+    job_server = JobServer(gcp_client, max_workers=2)
+
+    try:
+        job_server.serve_stream(io.StringIO("\n".join(lines) + "\n"), output)
+    finally:
+        job_server.close()
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert sorted(r["job_id"] for r in results if r["status"] == "succeeded") == [
+        0,
+        1,
+        2,
+    ]
+    assert [r["status"] for r in results if r.get("job_id") is None] == ["invalid"]
+
+
+def test_skipped_projects_are_counted_separately(tmp_path):
+    report_file = str(tmp_path / "report.json")
+    write_report(
+        [
+            dict(gcp_project_id="a", status="succeeded"),
+            dict(gcp_project_id="b", status="skipped"),
+            dict(gcp_project_id="c", status="failed"),
+        ],
+        report_file,
+    )
+
+    with open(report_file, encoding="utf-8") as f:
+        report = json.load(f)
+
+    assert (report["succeeded"], report["skipped"], report["failed"]) == (1, 1, 1)
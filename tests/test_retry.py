@@ -0,0 +1,52 @@
+import pytest
+import requests
+import urllib3
+
+from core.retry import RateLimiter, RetryPolicy
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_retries_non_idempotent_requests_only_before_connecting():
+    policy = RetryPolicy()
+    refused = requests.exceptions.ConnectionError(
+        urllib3.exceptions.MaxRetryError(
+            None, "/", urllib3.exceptions.NewConnectionError(None, "refused")
+        )
+    )
+    dropped = requests.exceptions.ConnectionError(
+        urllib3.exceptions.ProtocolError("Connection aborted.")
+    )
+
+    assert policy.is_retryable("post", error=refused)
+    assert policy.is_retryable("post", error=requests.exceptions.ConnectTimeout())
+    assert not policy.is_retryable("post", error=dropped)
+    assert not policy.is_retryable("post", error=requests.exceptions.ReadTimeout())
+    assert policy.is_retryable("get", error=dropped)
+
+
+def test_falls_back_to_backoff_on_malformed_retry_after():
+    policy = RetryPolicy(initial_delay=1.0, max_delay=1.0)
+
+    assert policy.delay(1, Response(503, {"Retry-After": "7"})) == 7
+    assert 0 <= policy.delay(1, Response(503, {"Retry-After": "soon"})) <= 1.0
+
+
+def test_parses_rate_limits():
+    assert RateLimiter.parse("firebase.read=300, crm.mutation=30,") == {
+        "firebase.read": 300.0,
+        "crm.mutation": 30.0,
+    }
+    assert RateLimiter.parse(None) == {}
+
+
+@pytest.mark.parametrize(
+    "rate_limits", ["firebase.read", "firbase.read=300", "crm.read=fast", "crm.read=0"]
+)
+def test_rejects_invalid_rate_limits(rate_limits):
+    with pytest.raises(ValueError):
+        RateLimiter.parse(rate_limits)
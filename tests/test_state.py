@@ -0,0 +1,19 @@
+from core.pipeline import BatchRunner
+from core.state import ResourceIndex
+
+
+def test_discovers_only_active_projects_of_manifest(server, gcp_client, entries):
+    manifest = entries(3)
+    BatchRunner(gcp_client).run(manifest)
+    gcp_client.wait_for_operation(
+        gcp_client.delete_gcp_project("test-project-001"), gcp_client.crm_base_url
+    )
+
+    index = ResourceIndex.discover(
+        gcp_client, ["test-project-000", "test-project-001", "other-project"]
+    )
+
+    assert index.gcp_projects == {"test-project-000"}
+    assert index.firebase_projects == {"test-project-000"}
+    assert index.located_projects == {"test-project-000"}
+    assert len(index.apps) == 2
@@ -0,0 +1,25 @@
+import pytest
+
+from core.common import APICallError, ApplicationType
+
+
+def test_missing_firebase_project_is_not_active(server, gcp_client):
+    assert not gcp_client._is_firebase_project_active("missing-project")
+
+
+def test_unreachable_firebase_project_is_not_active(gcp_client):
+    gcp_client.firebase_base_url = "http://127.0.0.1:1"
+    gcp_client.retry_policy.max_attempts = 1
+
+    assert not gcp_client._is_firebase_project_active("missing-project")
+
+
+def test_failed_configuration_fetch_is_raised(server, gcp_client):
+    gcp_client.propagation_retry_policy = gcp_client.retry_policy
+
+    with pytest.raises(APICallError) as error:
+        gcp_client._fetch_app_configuration(
+            "missing-project", "1:1:android:1", ApplicationType.ANDROID
+        )
+
+    assert error.value.status_code == 404